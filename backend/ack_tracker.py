@@ -0,0 +1,116 @@
+"""
+Submission Acknowledgment Tracker for SentraTech
+Correlates dashboard ACKs (HTTP handler, bulk response or WebSocket) with waiting proxy requests
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import logging
+
+import request_deadline
+
+logger = logging.getLogger("ack_tracker")
+
+
+class AckTracker:
+    """Futures keyed by submissionId, resolved by whichever ACK path sees the submission first"""
+
+    def __init__(self, timeout_ms: Optional[int] = None, max_early_acks: int = 10000):
+        self.timeout = (timeout_ms or int(os.getenv('PROXY_ACK_TIMEOUT_MS', '2000'))) / 1000  # Convert to seconds
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.registered_at: Dict[str, float] = {}
+
+        # ACKs that arrived before anyone registered (e.g. the dashboard stored the
+        # submission before the forward returned); bounded so it cannot grow without limit
+        self.early_acks: OrderedDict = OrderedDict()
+        self.max_early_acks = max_early_acks
+
+        # ACK statistics
+        self.registered = 0
+        self.acked = 0
+        self.timeouts = 0
+        self.acks_by_source: Dict[str, int] = {}
+        self.total_ack_ms = 0.0
+
+    def register(self, submission_id: str) -> asyncio.Future:
+        """Start waiting for an ACK; call before forwarding so a fast ACK cannot be missed"""
+        future = self.pending.get(submission_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[submission_id] = future
+            self.registered_at[submission_id] = time.time()
+            self.registered += 1
+            source = self.early_acks.pop(submission_id, None)
+            if source is not None:
+                self._complete(submission_id, future, source)
+        return future
+
+    def resolve(self, submission_id: Optional[str], source: str) -> bool:
+        """Mark a submission acknowledged; returns True if a caller was waiting for it"""
+        if not submission_id:
+            return False
+
+        future = self.pending.get(submission_id)
+        if future is None:
+            self.early_acks[submission_id] = source
+            if len(self.early_acks) > self.max_early_acks:
+                self.early_acks.popitem(last=False)
+            return False
+
+        if future.done():
+            return False
+        self._complete(submission_id, future, source)
+        return True
+
+    def _complete(self, submission_id: str, future: asyncio.Future, source: str):
+        future.set_result(source)
+        self.acked += 1
+        self.acks_by_source[source] = self.acks_by_source.get(source, 0) + 1
+        self.total_ack_ms += (time.time() - self.registered_at.get(submission_id, time.time())) * 1000
+        logger.debug(f"ACK for {submission_id} via {source}")
+
+    async def wait(self, submission_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait for the ACK up to the deadline; returns False on timeout"""
+        timeout = timeout or self.timeout
+        remaining = request_deadline.remaining()
+        if remaining is not None:
+            timeout = max(0, min(timeout, remaining))  # Leave the answer to the caller's budget
+
+        future = self.register(submission_id)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"No ACK for {submission_id} within {timeout}s")
+            return False
+        finally:
+            self.discard(submission_id)
+
+    def discard(self, submission_id: str):
+        """Stop tracking a submission (after waiting, or when forwarding failed)"""
+        future = self.pending.pop(submission_id, None)
+        self.registered_at.pop(submission_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ACK correlation statistics"""
+        return {
+            'timeout_ms': self.timeout * 1000,
+            'waiting': len(self.pending),
+            'registered': self.registered,
+            'acked': self.acked,
+            'timeouts': self.timeouts,
+            'acks_by_source': dict(self.acks_by_source),
+            'avg_ack_ms': round(self.total_ack_ms / self.acked, 2) if self.acked else 0,
+            'early_acks_buffered': len(self.early_acks)
+        }
+
+
+# Global ACK tracker instance
+ack_tracker = AckTracker()
+
+__all__ = ['AckTracker', 'ack_tracker']
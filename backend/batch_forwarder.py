@@ -0,0 +1,117 @@
+"""
+Micro-Batching Forwarder for SentraTech
+Coalesces bursts of same-type form submissions into single bulk requests to the dashboard
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger("batch_forwarder")
+
+# send_batch(form_type, items) -> one result dict per item, in order
+SendBatch = Callable[[str, List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+class MicroBatchForwarder:
+    """Collects submissions per form type and flushes them as one upstream call"""
+
+    def __init__(self, send_batch: SendBatch, max_items: Optional[int] = None, max_wait_ms: Optional[int] = None):
+        self.send_batch = send_batch
+        self.max_items = max_items or int(os.getenv('DASHBOARD_BATCH_MAX_ITEMS', '50'))
+        self.max_wait = (max_wait_ms or int(os.getenv('DASHBOARD_BATCH_MAX_WAIT_MS', '25'))) / 1000  # Convert to seconds
+
+        # form_type -> [(item, future)] waiting for the next flush
+        self.pending: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {}
+        self.flush_timers: Dict[str, asyncio.Task] = {}
+        self.inflight: set = set()
+
+        # Batching statistics
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+    async def submit(self, form_type: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue an item for the next batch of its form type and wait for its own result"""
+        future = asyncio.get_running_loop().create_future()
+        batch = self.pending.setdefault(form_type, [])
+        batch.append((item, future))
+
+        if len(batch) >= self.max_items:
+            self._flush(form_type)
+        elif form_type not in self.flush_timers:
+            self.flush_timers[form_type] = asyncio.create_task(self._flush_after_wait(form_type))
+
+        return await future
+
+    async def _flush_after_wait(self, form_type: str):
+        """Flush a partially filled batch once the wait window has elapsed"""
+        await asyncio.sleep(self.max_wait)
+        self.flush_timers.pop(form_type, None)
+        self._flush(form_type)
+
+    def _flush(self, form_type: str):
+        """Detach the pending batch for a form type and send it in the background"""
+        timer = self.flush_timers.pop(form_type, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+
+        batch = self.pending.pop(form_type, [])
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send(form_type, batch))
+        self.inflight.add(task)
+        task.add_done_callback(self.inflight.discard)
+
+    async def _send(self, form_type: str, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """Send one batch upstream and fan the per-item results back to the waiting callers"""
+        items = [item for item, _ in batch]
+        start_time = time.time()
+
+        try:
+            results = await self.send_batch(form_type, items)
+            if len(results) != len(items):
+                raise ValueError(f"Bulk response returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Batch forward failed for {form_type} ({len(items)} items): {str(e)}")
+            self.failed_batches += 1
+            # One dict per waiter: a caller mutating its result must not change the others'
+            results = [{
+                "success": False,
+                "error": f"Batch forward error: {str(e)}",
+                "mode": "dashboard_batch_error"
+            } for _ in items]
+
+        self.batches_sent += 1
+        self.items_sent += len(items)
+        self.largest_batch = max(self.largest_batch, len(items))
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():  # Caller may have gone away
+                future.set_result(result)
+
+        logger.info(f"Forwarded {form_type} batch of {len(items)} in {(time.time() - start_time) * 1000:.2f}ms")
+
+    async def close(self):
+        """Flush everything still queued and wait for in-flight batches (used on shutdown)"""
+        for form_type in list(self.pending.keys()):
+            self._flush(form_type)
+        if self.inflight:
+            await asyncio.gather(*self.inflight, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics"""
+        return {
+            'max_items': self.max_items,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches_sent': self.batches_sent,
+            'items_sent': self.items_sent,
+            'failed_batches': self.failed_batches,
+            'largest_batch': self.largest_batch,
+            'avg_batch_size': round(self.items_sent / self.batches_sent, 2) if self.batches_sent else 0,
+            'upstream_requests_saved': self.items_sent - self.batches_sent,
+            'queued_items': sum(len(batch) for batch in self.pending.values())
+        }
@@ -0,0 +1,149 @@
+"""
+Analytics stats: streaming page views into Python vs the $match/$facet aggregation
+Generates a page_views dataset in a scratch database (5M documents by default) and times both implementations per timeframe
+
+Needs a real MongoDB (the generated data is left in place; rerun with --reuse to skip generation).
+Usage (from backend/):
+    python benchmarks/analytics_stats_aggregation.py --mongo-url mongodb://localhost:27017 [--docs 5000000] [--reuse]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson_dates import date_range  # noqa: E402
+
+HOURS = {"1h": 1, "24h": 24, "7d": 168, "30d": 720}
+DEVICES = ["desktop"] * 6 + ["mobile"] * 3 + ["tablet"]
+
+
+async def generate(collection, docs: int, sessions: int, pages: int, batch_size: int = 10000):
+    """Page views spread over the last 30 days; page popularity is Zipf-like"""
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    span = HOURS["30d"] * 3600
+    paths = [f"/page/{i}" for i in range(pages)]
+    weights = [1 / (rank + 1) for rank in range(pages)]
+    await collection.drop()
+    semaphore = asyncio.Semaphore(4)
+
+    async def insert(batch):
+        async with semaphore:
+            await collection.insert_many(batch, ordered=False)
+
+    tasks = []
+    for start in range(0, docs, batch_size):
+        count = min(batch_size, docs - start)
+        page_paths = rng.choices(paths, weights=weights, k=count)
+        batch = [{
+            "session_id": f"s{rng.randrange(sessions)}",
+            "page_path": page_paths[i],
+            "page_title": "Benchmark page",
+            "referrer": None,
+            "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0",
+            "ip_address": "203.0.113.7",
+            "device_type": rng.choice(DEVICES),
+            "browser": "Chrome",
+            "os": "Windows",
+            "timestamp": now - timedelta(seconds=rng.random() * span)
+        } for i in range(count)]
+        tasks.append(asyncio.create_task(insert(batch)))
+    await asyncio.gather(*tasks)
+
+
+async def legacy_stats(collection, start_time):
+    """The pre-aggregation implementation: every matching document comes back to Python"""
+    unique_sessions = set()
+    device_breakdown = {"desktop": 0, "mobile": 0, "tablet": 0}
+    page_counts = {}
+    total = 0
+    async for pv in collection.find(date_range("timestamp", start_time)):
+        total += 1
+        unique_sessions.add(pv["session_id"])
+        device_breakdown[pv.get("device_type", "desktop")] += 1
+        page_counts[pv.get("page_path", "/")] = page_counts.get(pv.get("page_path", "/"), 0) + 1
+    top_pages = sorted(page_counts.items(), key=lambda x: (-x[1], x[0]))[:5]
+    return total, len(unique_sessions), device_breakdown, top_pages
+
+
+async def aggregated_stats(collection, pipeline):
+    results = await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+    facets = results[0]
+    device_breakdown = {"desktop": 0, "mobile": 0, "tablet": 0}
+    for device in facets["devices"]:
+        device_breakdown[device["_id"]] = device["count"]
+    total = facets["totals"][0]["views"] if facets["totals"] else 0
+    unique = facets["sessions"][0]["unique"] if facets["sessions"] else 0
+    return total, unique, device_breakdown, [(page["_id"], page["views"]) for page in facets["top_pages"]]
+
+
+def plan_stages(explain) -> str:
+    """Stage chain of the winning plan for the $match part (IXSCAN without FETCH = covered)"""
+    stages = explain.get("stages", [{}])
+    cursor = stages[0].get("$cursor", explain) if stages else explain
+    plan = cursor.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)
+    chain = []
+    while plan:
+        chain.append(plan.get("stage", "?"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " <- ".join(chain)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="sentratech_benchmark")
+    parser.add_argument("--docs", type=int, default=5_000_000)
+    parser.add_argument("--sessions", type=int, default=400_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--timeframes", nargs="+", default=["24h", "7d", "30d"], choices=list(HOURS))
+    parser.add_argument("--reuse", action="store_true", help="Keep an existing dataset of the same size")
+    args = parser.parse_args()
+
+    os.environ.setdefault("MONGO_URL", args.mongo_url)
+    from server import AnalyticsService  # noqa: E402  (reads MONGO_URL at import)
+
+    async def run():
+        client = AsyncIOMotorClient(args.mongo_url, tz_aware=True)
+        db = client[args.database]
+        collection = db.page_views
+
+        if not (args.reuse and await collection.estimated_document_count() == args.docs):
+            start = time.perf_counter()
+            await generate(collection, args.docs, args.sessions, args.pages)
+            print(f"generated {args.docs} page views in {time.perf_counter() - start:.1f}s")
+        await collection.create_index([("timestamp", -1), ("session_id", 1), ("device_type", 1), ("page_path", 1)])
+        avg_size = (await db.command("collStats", "page_views")).get("avgObjSize", 0)
+
+        for timeframe in args.timeframes:
+            start_time = datetime.now(timezone.utc) - timedelta(hours=HOURS[timeframe])
+            pipeline = AnalyticsService.stats_pipeline(start_time)
+
+            start = time.perf_counter()
+            legacy = await legacy_stats(collection, start_time)
+            legacy_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            aggregated = await aggregated_stats(collection, pipeline)
+            aggregated_s = time.perf_counter() - start
+
+            explain = await db.command("explain", {"aggregate": "page_views", "pipeline": pipeline, "cursor": {}},
+                                       verbosity="queryPlanner")
+            print(f"{timeframe:>4}: {legacy[0]} views, {legacy[1]} sessions; results match={legacy == aggregated}")
+            print(f"      python loop: {legacy_s * 1000:.0f}ms, ~{legacy[0] * avg_size / 1e6:.1f}MB transferred")
+            print(f"      aggregation: {aggregated_s * 1000:.0f}ms ({legacy_s / aggregated_s:.1f}x), plan {plan_stages(explain)}")
+        client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Candidate and job-application lists: full documents vs server-side projections
+Generates job applications with long interaction/notification histories and compares bytes read from Mongo and response size per page
+
+Bytes read from Mongo is the BSON size of the documents the driver receives; response size is
+the serialized JSON body. Needs a real MongoDB (the generated data is left in place; rerun
+with --reuse to skip generation).
+Usage (from backend/):
+    python benchmarks/candidates_projection.py --mongo-url mongodb://localhost:27017 [--docs 2000] [--interactions 100]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fast_json  # noqa: E402
+from pagination import paginate  # noqa: E402
+from projections import CANDIDATE_SUMMARY_FIELDS, computed_projection, find_projection  # noqa: E402
+
+STATUSES = ["submitted", "under_review", "interview_scheduled", "hired", "rejected"]
+
+
+async def generate(collection, docs: int, interactions: int, batch_size: int = 500):
+    rng = random.Random(7)
+    created = datetime.now(timezone.utc) - timedelta(days=90)
+    await collection.drop()
+    for start in range(0, docs, batch_size):
+        batch = []
+        for i in range(start, min(docs, start + batch_size)):
+            history = rng.randint(interactions // 2, interactions)
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "full_name": f"Candidate {i}",
+                "email": f"candidate{i}@example.com",
+                "phone": "+1 555 0100",
+                "location": "Dhaka, Bangladesh",
+                "position": "Customer Support Specialist",
+                "preferred_shifts": "night",
+                "cover_note": "I have handled inbound support queues for several years. " * 8,
+                "status": rng.choice(STATUSES),
+                "created_at": created + timedelta(minutes=i),
+                "last_updated": created + timedelta(minutes=i, hours=6),
+                "candidate_interactions": [{
+                    "type": "status_change",
+                    "from_status": "submitted",
+                    "to_status": "under_review",
+                    "notes": "Reviewed application and screening answers",
+                    "updated_by": "recruiter@sentratech.net",
+                    "timestamp": created + timedelta(minutes=i, hours=n)
+                } for n in range(history)],
+                "email_notifications": [{
+                    "type": "status_update",
+                    "sent_at": created + timedelta(minutes=i, hours=n),
+                    "success": True
+                } for n in range(history // 4)]
+            })
+        await collection.insert_many(batch, ordered=False)
+
+
+def legacy_candidate(candidate):
+    """The pre-projection formatting: computed in Python from the full document"""
+    return {
+        "id": candidate.get("id"),
+        "name": candidate.get("full_name", f"{candidate.get('first_name', '')} {candidate.get('last_name', '')}"),
+        "email": candidate.get("email"),
+        "phone": candidate.get("phone"),
+        "location": candidate.get("location"),
+        "position": candidate.get("position_applied", candidate.get("position", "Customer Support Specialist")),
+        "status": candidate.get("status", "received"),
+        "experience_years": candidate.get("experience_years"),
+        "created_at": candidate.get("created_at"),
+        "last_updated": candidate.get("last_updated"),
+        "has_interview": bool(candidate.get("interview_event")),
+        "interview_date": candidate.get("interview_event", {}).get("interview_datetime") if candidate.get("interview_event") else None,
+        "email_notifications_count": len(candidate.get("email_notifications", [])),
+        "interactions_count": len(candidate.get("candidate_interactions", []))
+    }
+
+
+def bson_bytes(documents) -> int:
+    return sum(len(bson.encode(document)) for document in documents)
+
+
+async def measure(label: str, fetch, render, pages: int):
+    """Walk `pages` cursor pages; report Mongo bytes, response bytes and time per page"""
+    read = written = 0
+    cursor = None
+    start = time.perf_counter()
+    for _ in range(pages):
+        page = await fetch(cursor)
+        read += bson_bytes(page["items"])
+        written += len(fast_json.dumps(render(page)))
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<40} mongo {read / pages / 1024:8.1f} KiB/page   response {written / pages / 1024:7.1f} KiB/page"
+          f"   {elapsed / pages * 1000:6.1f} ms/page")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="sentratech_benchmark")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--interactions", type=int, default=100, help="Upper bound of history entries per candidate")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--reuse", action="store_true", help="Keep an existing dataset of the same size")
+    args = parser.parse_args()
+
+    async def run():
+        client = AsyncIOMotorClient(args.mongo_url, tz_aware=True)
+        collection = client[args.database].job_applications
+        if not (args.reuse and await collection.estimated_document_count() == args.docs):
+            start = time.perf_counter()
+            await generate(collection, args.docs, args.interactions)
+            print(f"generated {args.docs} job applications in {time.perf_counter() - start:.1f}s")
+        await collection.create_index([("created_at", -1), ("_id", -1)])
+
+        names = list(CANDIDATE_SUMMARY_FIELDS)
+        summary = computed_projection(names, CANDIDATE_SUMMARY_FIELDS, keep=["created_at"])
+
+        print(f"/api/candidates (limit={args.limit})")
+        await measure("before: full documents", lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor
+        ), lambda page: {"candidates": [legacy_candidate(c) for c in page["items"]]}, args.pages)
+        await measure("after: $project with $size", lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor, pipeline=[summary]
+        ), lambda page: {"candidates": [{n: c.get(n) for n in names} for c in page["items"]]}, args.pages)
+        narrow = ["id", "name", "status", "interactions_count"]
+        await measure("after: fields=" + ",".join(narrow), lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor,
+            pipeline=[computed_projection(narrow, CANDIDATE_SUMMARY_FIELDS, keep=["created_at"])]
+        ), lambda page: {"candidates": [{n: c.get(n) for n in narrow} for c in page["items"]]}, args.pages)
+
+        print(f"/api/forms/job-applications (limit={args.limit})")
+        await measure("before: full documents", lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor
+        ), lambda page: {"items": page["items"]}, args.pages)
+        await measure("after: default projection", lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor,
+            projection=find_projection(None, "job_applications")
+        ), lambda page: {"items": page["items"]}, args.pages)
+        await measure("after: fields=full_name,email,status", lambda cursor: paginate(
+            collection, {}, "created_at", limit=args.limit, cursor=cursor,
+            projection=find_projection("full_name,email,status", "job_applications")
+        ), lambda page: {"items": page["items"]}, args.pages)
+        client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
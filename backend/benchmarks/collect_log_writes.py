@@ -0,0 +1,105 @@
+"""
+collect.log writes: open/append/close per request vs the batched rotating writer
+Counts file-system calls made on the event loop thread (Python audit events) and the per-request time spent logging
+
+Usage (from backend/):
+    python benchmarks/collect_log_writes.py [--requests 20000] [--max-mb 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from collect_log_writer import RotatingBatchWriter  # noqa: E402
+
+AUDITED = {"open", "os.mkdir", "os.rename", "os.replace", "os.remove"}
+audit_counts: Counter = Counter()
+audit_thread = None  # Only count calls made on this thread (the event loop)
+
+
+def audit(event, args):
+    if event in AUDITED and threading.get_ident() == audit_thread:
+        audit_counts[event] += 1
+
+
+def legacy_log_collect_line(log_dir, obj):
+    """The per-request implementation this writer replaces"""
+    os.makedirs(log_dir, exist_ok=True)
+    line = json.dumps(obj)
+    with open(os.path.join(log_dir, 'collect.log'), 'a') as f:
+        f.write(line + '\n')
+
+
+def build_record(i):
+    return {
+        "ts": "2025-01-15T10:00:00+00:00",
+        "trace_id": f"trace-{i}",
+        "client_ip": "203.0.113.7",
+        "endpoint": "https://admin.sentratech.net/api/forms/contact-sales",
+        "payload_summary": {"name": "Benchmark", "email": "bench@example.com"},
+        "upstream_status": 200,
+        "upstream_body": '{"success":true,"id":"9b1f"}'
+    }
+
+
+async def measure(name, emit, requests):
+    global audit_thread
+    audit_thread = threading.get_ident()
+    audit_counts.clear()
+    timings = []
+    start_time = time.perf_counter()
+    for i in range(requests):
+        start = time.perf_counter_ns()
+        emit(build_record(i))
+        timings.append(time.perf_counter_ns() - start)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start_time
+    counts = dict(audit_counts)
+    audit_thread = None
+    timings.sort()
+    return {
+        "mode": name,
+        "p50_us": round(timings[len(timings) // 2] / 1000, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99)] / 1000, 1),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "loop_fs_calls": counts
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--max-mb", type=float, default=2.0, help="Rotation size for the batched writer")
+    args = parser.parse_args()
+    sys.addaudithook(audit)
+
+    async def run():
+        legacy_dir = tempfile.mkdtemp(prefix="bench-collect-legacy-")
+        legacy = await measure("per-request", lambda record: legacy_log_collect_line(legacy_dir, record), args.requests)
+
+        writer = RotatingBatchWriter(directory=tempfile.mkdtemp(prefix="bench-collect-batched-"),
+                                     flush_interval_ms=100, max_bytes=int(args.max_mb * 1024 * 1024))
+        batched = await measure("batched", writer.write, args.requests)
+        await writer.close()
+        return legacy, batched, writer
+
+    legacy, batched, writer = asyncio.run(run())
+    stats = writer.get_stats()
+    print(f"requests: {args.requests}")
+    for result in (legacy, batched):
+        print(f"{result['mode']:>12}: p50={result['p50_us']}us p99={result['p99_us']}us "
+              f"elapsed={result['elapsed_ms']}ms fs calls on loop={result['loop_fs_calls']}")
+    print(f"batched writer: {stats['lines_written']} lines in {stats['batches']} write batches, "
+          f"{stats['rotations']} rotations (gzipped), dropped={stats['dropped']}")
+    print(f"rotated segments: {sorted(os.listdir(writer.directory))[:3]}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Local stand-in for the admin dashboard used by the forwarding benchmarks
+Serves /api/forms/* (single and bulk), /health and /ws with injectable latency, error rates and slow-drip bodies
+
+In-process use: wrap create_fake_dashboard(...) in httpx.ASGITransport.
+Standalone (for the live-host load tests, pointed at localhost):
+    python benchmarks/fake_dashboard.py --port 8099 --latency-ms 30 --spike-rate 0.02 --spike-ms 800
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class FakeDashboardConfig:
+    """
+    Behaviour knobs for the fake dashboard
+
+    Latency is lognormal around latency_ms (sigma 0 gives a constant), plus a spike_ms
+    outlier on spike_rate of requests. error_rate answers error_status instead of storing;
+    drip_ms streams each response body in chunks spread over that many milliseconds.
+    """
+
+    def __init__(self, latency_ms: float = 20.0, sigma: float = 0.5, spike_rate: float = 0.0,
+                 spike_ms: float = 500.0, error_rate: float = 0.0, error_status: int = 503,
+                 drip_ms: float = 0.0, drip_chunks: int = 10, bulk_enabled: bool = True,
+                 seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.spike_rate = spike_rate
+        self.spike_ms = spike_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drip_ms = drip_ms
+        self.drip_chunks = drip_chunks
+        self.bulk_enabled = bulk_enabled
+        self.random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """Seconds to hold the next response"""
+        if self.spike_rate and self.random.random() < self.spike_rate:
+            return self.spike_ms / 1000
+        if self.sigma <= 0:
+            return self.latency_ms / 1000
+        return self.random.lognormvariate(math.log(max(self.latency_ms, 0.001)), self.sigma) / 1000
+
+    def should_fail(self) -> bool:
+        return bool(self.error_rate) and self.random.random() < self.error_rate
+
+
+def create_fake_dashboard(config: Optional[FakeDashboardConfig] = None) -> FastAPI:
+    """Build the fake dashboard app; counters are exposed on app.state.stats"""
+    config = config or FakeDashboardConfig()
+    app = FastAPI()
+    stats: Dict[str, Any] = {
+        'requests': 0, 'stored': 0, 'errors': 0, 'bulk_requests': 0,
+        'duplicate_keys': 0, 'health_checks': 0, 'ws_messages': 0
+    }
+    seen_keys = set()
+    app.state.stats = stats
+    app.state.config = config
+
+    async def respond(content: Dict[str, Any], status_code: int = 200):
+        await asyncio.sleep(config.sample_latency())
+        if not config.drip_ms:
+            return JSONResponse(content, status_code=status_code)
+
+        body = JSONResponse(content).body
+        chunk_size = max(1, math.ceil(len(body) / config.drip_chunks))
+        pause = config.drip_ms / 1000 / config.drip_chunks
+
+        async def drip():
+            for start in range(0, len(body), chunk_size):
+                await asyncio.sleep(pause)
+                yield body[start:start + chunk_size]
+
+        return StreamingResponse(drip(), status_code=status_code, media_type="application/json")
+
+    def store(item: Dict[str, Any], key: Optional[str]) -> Dict[str, Any]:
+        if key:
+            if key in seen_keys:
+                stats['duplicate_keys'] += 1
+            seen_keys.add(key)
+        stats['stored'] += 1
+        submission_id = item.get('id') or item.get('submissionId') or str(uuid.uuid4())
+        return {"success": True, "ack": True, "id": submission_id, "submissionId": submission_id,
+                "received_by": "fake-dashboard"}
+
+    @app.get("/health")
+    @app.get("/api/health")
+    async def health():
+        stats['health_checks'] += 1
+        return {"status": "healthy", "service": "fake-dashboard", "timestamp": time.time()}
+
+    @app.post("/api/{path:path}")
+    async def submit(path: str, request: Request):
+        """Any form endpoint; the proxy and collect paths build their URLs differently"""
+        stats['requests'] += 1
+        body = await request.json()
+
+        if config.should_fail():
+            stats['errors'] += 1
+            return await respond({"success": False, "error": "Injected failure"}, config.error_status)
+
+        if path.endswith("/bulk"):
+            if not config.bulk_enabled:
+                return JSONResponse({"detail": "Not Found"}, status_code=404)
+            stats['bulk_requests'] += 1
+            items = body.get("items", [])
+            keys = body.get("idempotencyKeys") or [None] * len(items)
+            return await respond({"results": [store(item, key) for item, key in zip(items, keys)]})
+
+        return await respond(store(body, request.headers.get("idempotency-key")))
+
+    @app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket):
+        """Acknowledge every message that carries a messageId"""
+        await websocket.accept()
+        await websocket.send_json({"type": "connection", "message": "Connected to fake dashboard"})
+        try:
+            while True:
+                message = await websocket.receive_json()
+                stats['ws_messages'] += 1
+                if message.get("messageId"):
+                    await asyncio.sleep(config.sample_latency())
+                    await websocket.send_json({"type": "ack", "messageId": message["messageId"],
+                                               "submissionId": message.get("submissionId")})
+        except WebSocketDisconnect:
+            pass
+
+    return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--spike-rate", type=float, default=0.0)
+    parser.add_argument("--spike-ms", type=float, default=500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--drip-ms", type=float, default=0.0)
+    parser.add_argument("--no-bulk", action="store_true")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_arguments(args) -> FakeDashboardConfig:
+    return FakeDashboardConfig(
+        latency_ms=args.latency_ms, sigma=args.sigma, spike_rate=args.spike_rate, spike_ms=args.spike_ms,
+        error_rate=args.error_rate, error_status=args.error_status, drip_ms=args.drip_ms,
+        bulk_enabled=not args.no_bulk, seed=args.seed
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_fake_dashboard(config_from_arguments(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Throughput benchmark for the /api/forms/* list responses: stdlib JSONResponse vs FastJSONResponse
+Drives the real routes in-process with Mongo replaced by an in-memory collection of realistic documents
+
+The "before" run mounts the pre-orjson handler shape (plain dict return, FastAPI's jsonable_encoder
+and the stdlib JSONResponse). Its documents carry string ids, because jsonable_encoder cannot encode
+ObjectId at all; the "after" run serves real ObjectId documents.
+
+Usage (from backend/, with the usual server environment variables set):
+    python benchmarks/forms_list_json.py [--items 100] [--requests 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+ROUTES = {
+    "/api/forms/demo-requests": "demo_requests",
+    "/api/forms/roi-reports": "roi_reports",
+    "/api/forms/contact-sales": "contact_requests",
+    "/api/forms/newsletter-subscribers": "subscriptions",
+    "/api/forms/job-applications": "job_applications",
+}
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return FakeCursor(self.docs[:count])
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, *args, **kwargs):
+        return FakeCursor(self.docs)
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+
+class FakeDatabase:
+    def __init__(self, docs):
+        self.collection = FakeCollection(docs)
+
+    def __getattr__(self, name):
+        return self.collection
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+def build_docs(count: int, string_ids: bool):
+    created = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    for i in range(count):
+        docs.append({
+            "_id": str(ObjectId()) if string_ids else ObjectId(),
+            "id": str(uuid.uuid4()),
+            "name": f"Benchmark Contact {i}",
+            "email": f"contact{i}@example.com",
+            "company": "Example Logistics Ltd",
+            "phone": "+1 555 0100",
+            "message": "We would like to automate tier-1 support across three regions. " * 4,
+            "call_volume": 25000 + i,
+            "status": "pending",
+            "created_at": (created + timedelta(minutes=i)).isoformat(),
+            "updated_at": created + timedelta(minutes=i)
+        })
+    return docs
+
+
+def legacy_app(docs) -> FastAPI:
+    """Handlers as they were before the orjson layer"""
+    app = FastAPI(default_response_class=JSONResponse)
+
+    async def handler():
+        items = await FakeCollection(docs).find().sort("created_at", -1).to_list(length=100)
+        return {"success": True, "items": items, "total": len(items)}
+
+    for path in ROUTES:
+        app.add_api_route(path, handler, methods=["GET"])
+    return app
+
+
+async def run_mode(name: str, app, requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        paths = list(ROUTES)
+        for path in paths:  # Warm up
+            response = await client.get(path)
+            assert response.status_code == 200 and response.json()["success"], response.text
+
+        start_time = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(paths[i % len(paths)])
+        elapsed = time.perf_counter() - start_time
+        size = len(response.content)
+
+    return {"mode": name, "requests_per_sec": round(requests / elapsed, 1),
+            "ms_per_request": round(elapsed * 1000 / requests, 3), "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    server.db = FakeDatabase(build_docs(args.items, string_ids=False))
+    results = [
+        asyncio.run(run_mode("stdlib", legacy_app(build_docs(args.items, string_ids=True)), args.requests)),
+        asyncio.run(run_mode("orjson", server.app, args.requests)),
+    ]
+
+    print(f"items per response: {args.items}, requests per mode: {args.requests}")
+    for result in results:
+        print(f"{result['mode']:>8}: {result['requests_per_sec']} req/s, "
+              f"{result['ms_per_request']} ms/request, {result['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
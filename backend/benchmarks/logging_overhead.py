@@ -0,0 +1,128 @@
+"""
+Handler-side logging cost: synchronous verbose logging vs the queued key=value pipeline
+Measures the time a proxy handler spends inside logging calls on the event loop thread, writing to a real file
+
+Usage (from backend/):
+    python benchmarks/logging_overhead.py [--requests 20000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_pipeline import DeferredQueueHandler, KeyValueFormatter, SamplingFilter, log_event  # noqa: E402
+
+LEGACY_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def build_submission():
+    return {
+        "id": str(uuid.uuid4()),
+        "full_name": "Benchmark Candidate",
+        "email": "candidate@example.com",
+        "phone": "+1 555 0100",
+        "location": "Dhaka, Bangladesh",
+        "position_applied": "Customer Support Specialist",
+        "preferred_shifts": "morning,evening",
+        "availability_start_date": "2025-02-01",
+        "work_authorization": "authorized",
+        "cover_letter": "I have four years of experience in tier-1 support. " * 10,
+        "source": "careers_page",
+        "timestamp": "2025-01-15T10:00:00+00:00"
+    }
+
+
+def verbose_request(log: logging.Logger, data):
+    """The pre-pipeline pattern: a pretty-printed payload plus one f-string line per field"""
+    log.info(f"Job application proxy request: {json.dumps(data, indent=2)}")
+    for field, value in data.items():
+        log.info(f"Job application {field}: {value}")
+    log.info("Headers: {'Content-Type': 'application/json', 'X-INGEST-KEY': 'key', 'Origin': 'https://sentratech.net'}")
+
+
+def structured_request(log: logging.Logger, data):
+    log_event(log, logging.INFO, "proxy_request", form="job-application", id=data["id"],
+              email=data["email"], position_applied=data["position_applied"], field_count=len(data))
+    log_event(log, logging.INFO, "dashboard_forward", endpoint="/forms/job-application",
+              headers=["Content-Type", "Origin", "X-INGEST-KEY"], field_count=len(data))
+
+
+async def measure(name, log, emit, requests):
+    data = build_submission()
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter_ns()
+        emit(log, data)
+        timings.append(time.perf_counter_ns() - start)
+        await asyncio.sleep(0)  # Yield like a real handler would
+    timings.sort()
+    return {
+        "mode": name,
+        "p50_us": round(timings[len(timings) // 2] / 1000, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99)] / 1000, 1),
+        "total_ms": round(sum(timings) / 1e6, 1)
+    }
+
+
+def sync_logger(path):
+    log = logging.getLogger("bench.sync")
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(LEGACY_FORMAT))
+    log.addHandler(handler)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log, handler
+
+
+def queued_logger(name, path, sample_rates=None):
+    log = logging.getLogger(name)
+    handler = logging.FileHandler(path)
+    handler.setFormatter(KeyValueFormatter())
+    log_queue = queue.Queue(-1)
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rates or {}))
+    log.addHandler(queue_handler)
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return log, listener
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp(prefix="bench-logging-")
+
+    async def run():
+        results = []
+        log, handler = sync_logger(os.path.join(directory, "sync.log"))
+        results.append(await measure("sync verbose", log, verbose_request, args.requests))
+        handler.close()
+
+        for name, emit, rates in (("queued verbose", verbose_request, None),
+                                  ("queued kv", structured_request, None),
+                                  ("queued kv 10%", structured_request, {"bench": 0.1})):
+            log, listener = queued_logger(f"bench.{name.replace(' ', '_')}", os.path.join(directory, f"{name}.log"), rates)
+            results.append(await measure(name, log, emit, args.requests))
+            listener.stop()  # Drains the queue so every mode finishes its writes
+        return results
+
+    results = asyncio.run(run())
+    print(f"requests per mode: {args.requests} (time spent in logging calls on the event loop)")
+    for result in results:
+        print(f"{result['mode']:>15}: p50={result['p50_us']}us p99={result['p99_us']}us total={result['total_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
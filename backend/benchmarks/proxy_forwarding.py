@@ -0,0 +1,171 @@
+"""
+Forwarding benchmark: /api/proxy/* and /api/collect against the local fake dashboard
+Everything runs in-process; the shared DashboardClient talks to the fake through httpx.ASGITransport
+
+Usage (from backend/, with the usual server environment variables set):
+    python benchmarks/proxy_forwarding.py [--requests 1000] [--concurrency 50] [--scenario baseline tail]
+    python benchmarks/proxy_forwarding.py --scenario custom --latency-ms 40 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DASHBOARD_API_KEY", "benchmark-key")  # Upstream is the fake
+
+import server  # noqa: E402
+from dashboard_client import DashboardClient  # noqa: E402
+from submission_wal import SubmissionWAL  # noqa: E402
+from fake_dashboard import FakeDashboardConfig, add_config_arguments, config_from_arguments, create_fake_dashboard  # noqa: E402
+
+SCENARIOS = {
+    "baseline": lambda: FakeDashboardConfig(latency_ms=20, sigma=0.5, seed=1),
+    "tail": lambda: FakeDashboardConfig(latency_ms=20, sigma=0.5, spike_rate=0.02, spike_ms=800, seed=1),
+    "errors": lambda: FakeDashboardConfig(latency_ms=20, sigma=0.5, error_rate=0.05, seed=1),
+    "slow-drip": lambda: FakeDashboardConfig(latency_ms=20, sigma=0.5, drip_ms=1500, seed=1),
+    "outage": lambda: FakeDashboardConfig(latency_ms=5, sigma=0, error_rate=1.0, seed=1),
+}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.inserted = 0
+
+    async def insert_one(self, document):
+        self.inserted += 1
+
+
+class FakeDatabase:
+    """Fallback collections only count inserts"""
+
+    def __init__(self):
+        self.collections = defaultdict(FakeCollection)
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    def inserted(self) -> int:
+        return sum(collection.inserted for collection in self.collections.values())
+
+
+def build_request(target: str, i: int):
+    """(path, json body) for the i-th request against a target"""
+    submission_id = str(uuid.uuid4())
+    email = f"bench{i}@example.com"
+    if target == "collect":
+        return "/api/collect", {"trace_id": f"bench-{submission_id}", "form_type": "contact-sales",
+                                "name": "Bench", "email": email, "company": "Example Ltd"}
+    bodies = {
+        "contact-sales": {"full_name": "Bench", "work_email": email, "company_name": "Example Ltd", "plan_selected": "Growth"},
+        "demo-request": {"name": "Bench", "email": email, "company": "Example Ltd"},
+        "job-application": {"name": "Bench", "email": email, "position": "Support Specialist",
+                            "preferred_shifts": ["morning", "evening"]},
+        "newsletter-signup": {"email": email},
+        "roi-calculator": {"email": email, "country": "Bangladesh", "bundles": 12.6},
+    }
+    return f"/api/proxy/{target}", {"id": submission_id, **bodies[target]}
+
+
+def classify(target: str, response: httpx.Response) -> str:
+    if response.status_code == 504:
+        return "deadline"
+    try:
+        body = response.json()
+    except ValueError:
+        return "error"
+    if target == "collect":
+        if response.status_code == 200 and body.get("ok"):
+            return "forwarded"
+        return "parked" if body.get("error") == "forward_failed" else "error"
+    if body.get("received_by") == "fake-dashboard":
+        return "forwarded"
+    return "fallback" if body.get("success") else "error"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))], 1) if ordered else 0.0
+
+
+async def run_scenario(name: str, config: FakeDashboardConfig, targets, requests: int, concurrency: int):
+    fake = create_fake_dashboard(config)
+
+    # Fresh client per scenario so limiter and hedge state don't leak between runs
+    client = DashboardClient()
+    client._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=fake))
+    server.dashboard_client = client
+    fallback_db = FakeDatabase()
+    server.form_dispatcher.db = fallback_db
+    server.submission_wal = SubmissionWAL(tempfile.mkdtemp(prefix="bench-wal-"))
+
+    latencies = defaultdict(list)
+    outcomes = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    transport = httpx.ASGITransport(app=server.app, client=("127.0.0.1", 5000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as site:
+        async def one(i: int):
+            target = targets[i % len(targets)]
+            path, body = build_request(target, i)
+            async with semaphore:
+                start_time = time.perf_counter()
+                try:
+                    response = await site.post(path, json=body)
+                    outcome = classify(target, response)
+                except httpx.HTTPError:
+                    outcome = "error"
+                group = "collect" if target == "collect" else "proxy"
+                latencies[group].append((time.perf_counter() - start_time) * 1000)
+                outcomes[outcome] += 1
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - start_time
+
+    await client.aclose()
+    forwarding = client.get_stats()
+    parked_records = server.submission_wal.pending
+    server.submission_wal.close()
+
+    print(f"\n== {name}: {requests} requests, concurrency {concurrency}, {round(requests / elapsed, 1)} req/s")
+    for group, values in sorted(latencies.items()):
+        print(f"   {group:>8}: p50={percentile(values, 50)}ms p95={percentile(values, 95)}ms "
+              f"p99={percentile(values, 99)}ms max={round(max(values), 1)}ms")
+    print(f"   outcomes: {dict(outcomes)}")
+    print(f"   dashboard saw: {fake.state.stats}")
+    print(f"   parked: fallback docs={fallback_db.inserted()} wal records={parked_records}; "
+          f"limiter={forwarding['concurrency']}; hedge_rate={forwarding['hedge_rate']}")
+
+
+async def run(args):
+    for name in args.scenario:
+        config = config_from_arguments(args) if name == "custom" else SCENARIOS[name]()
+        await run_scenario(name, config, args.targets, args.requests, args.concurrency)
+    await server.dashboard_batcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--scenario", nargs="+", default=list(SCENARIOS),
+                        choices=list(SCENARIOS) + ["custom"])
+    parser.add_argument("--targets", nargs="+", default=["contact-sales", "demo-request", "job-application",
+                                                         "newsletter-signup", "roi-calculator", "collect"])
+    add_config_arguments(parser)  # Used by --scenario custom
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)  # Per-request server logging would dominate the run
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
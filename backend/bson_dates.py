@@ -0,0 +1,249 @@
+"""
+BSON Date Handling for SentraTech
+Timestamps are stored as native BSON dates; ISO-8601 strings from older writes are still read, queried and migrated in batches
+
+During the transition a field can hold either type. Every legacy string is older than every
+native date, and BSON orders strings before dates, so sorting on the field stays chronological.
+
+Run the migration once from the shell (it also runs in the background on startup):
+    python bson_dates.py [--batch-size 500]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import logging
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger("bson_dates")
+
+# Top-level timestamp fields that older code wrote as isoformat() strings
+DATE_FIELDS: Dict[str, List[str]] = {
+    'users': ['created_at', 'updated_at', 'last_login'],
+    'chat_sessions': ['started_at', 'last_activity'],
+    'chat_messages': ['timestamp'],
+    'contact_requests': ['created_at'],
+    'demo_requests': ['created_at', 'timestamp', 'sheets_timestamp'],
+    'roi_reports': ['created_at'],
+    'subscriptions': ['created_at'],
+    'job_applications': ['created_at', 'last_updated'],
+    'roi_calculations': ['timestamp'],
+    'metrics_snapshots': ['timestamp'],
+    'performance_metrics': ['timestamp'],
+    'page_views': ['timestamp'],
+    'user_interactions': ['timestamp'],
+    'conversion_events': ['timestamp'],
+    'privacy_requests': ['created_at', 'verified_at'],
+    'audit_log': ['timestamp'],
+    'data_exports': ['created_at', 'expires_at'],
+    'contact_fallback': ['created_at', 'replayed_at'],
+    'demo_fallback': ['created_at', 'replayed_at'],
+    'roi_fallback': ['created_at', 'replayed_at'],
+    'job_application_fallback': ['created_at', 'replayed_at'],
+    'replay_ledger': ['delivered_at'],
+}
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_datetime(value: Any) -> Optional[datetime]:
+    """Timezone-aware UTC datetime from a BSON date or an ISO-8601 string; None if neither"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def as_iso(value: Any) -> Optional[str]:
+    """ISO-8601 string for either storage format (for response fields typed as str)"""
+    parsed = as_datetime(value)
+    return parsed.isoformat() if parsed else value
+
+
+def date_range(field: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """Filter matching start <= field < end whether the field holds a date or a legacy ISO string"""
+    native: Dict[str, Any] = {}
+    legacy: Dict[str, Any] = {}
+    if start is not None:
+        native['$gte'] = start
+        legacy['$gte'] = start.isoformat()
+    if end is not None:
+        native['$lt'] = end
+        legacy['$lt'] = end.isoformat()
+    return {'$or': [{field: native}, {field: legacy}]}
+
+
+async def date_migration_completed(db, name: str) -> bool:
+    """Whether every legacy string timestamp in a collection has been converted (always true for unregistered ones)"""
+    if name not in DATE_FIELDS:
+        return True
+    return await db.schema_migrations.find_one({'_id': f"bson_dates:{name}", 'completed': True}, {'_id': 1}) is not None
+
+
+class DateMigration:
+    """
+    Converts legacy string timestamps to BSON dates, one batch of documents at a time
+
+    Progress (last _id per collection) lives in the schema_migrations collection, so a restart
+    resumes where it stopped. Each update is conditional on the field still holding the
+    original string, so it never overwrites a concurrent write.
+    """
+
+    def __init__(self, db, fields: Optional[Dict[str, List[str]]] = None, batch_size: Optional[int] = None,
+                 pause_ms: Optional[int] = None):
+        self.db = db
+        self.fields = fields or DATE_FIELDS
+        self.batch_size = batch_size or int(os.getenv('DATE_MIGRATION_BATCH', '500'))
+        self.pause = (pause_ms if pause_ms is not None else int(os.getenv('DATE_MIGRATION_PAUSE_MS', '100'))) / 1000  # Convert to seconds
+        self.progress = db.schema_migrations
+        self._task: Optional[asyncio.Task] = None
+
+        # Migration statistics
+        self.converted = 0
+        self.unparseable = 0
+        self.batches = 0
+        self.completed_collections: List[str] = []
+        self.current_collection: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def migrate_collection(self, name: str, fields: List[str]):
+        progress_id = f"bson_dates:{name}"
+        state = await self.progress.find_one({'_id': progress_id}) or {}
+        if state.get('completed'):
+            self.completed_collections.append(name)
+            return
+        last_id = state.get('last_id')
+        self.current_collection = name
+        collection = self.db[name]
+        legacy = {'$or': [{field: {'$type': 'string'}} for field in fields]}
+
+        while True:
+            query = {'$and': [{'_id': {'$gt': last_id}}, legacy]} if last_id is not None else legacy
+            projection = {field: 1 for field in fields}
+            documents = await collection.find(query, projection).sort('_id', 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not documents:
+                break
+
+            operations = []
+            for document in documents:
+                match = {'_id': document['_id']}
+                updates = {}
+                for field in fields:
+                    value = document.get(field)
+                    if isinstance(value, str):
+                        parsed = as_datetime(value)
+                        if parsed is None:
+                            self.unparseable += 1
+                            continue
+                        match[field] = value
+                        updates[field] = parsed
+                if updates:
+                    operations.append(UpdateOne(match, {'$set': updates}))
+            if operations:
+                result = await collection.bulk_write(operations, ordered=False)
+                self.converted += result.modified_count
+
+            last_id = documents[-1]['_id']
+            self.batches += 1
+            await self.progress.update_one(
+                {'_id': progress_id},
+                {'$set': {'last_id': last_id, 'updated_at': utc_now()}, '$inc': {'batches': 1}},
+                upsert=True
+            )
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        await self.progress.update_one(
+            {'_id': progress_id},
+            {'$set': {'completed': True, 'completed_at': utc_now()}},
+            upsert=True
+        )
+        self.completed_collections.append(name)
+        logger.info(f"Date migration finished for {name}")
+
+    async def run(self):
+        """Migrate every registered collection; safe to rerun, resumes after a restart"""
+        self.started_at = time.time()
+        for name, fields in self.fields.items():
+            try:
+                await self.migrate_collection(name, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{name}: {str(e)}"
+                logger.error(f"Date migration failed for {name}: {str(e)}")
+        self.current_collection = None
+        self.finished_at = time.time()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def wait(self):
+        """Until the background migration (if any) has finished"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get migration progress"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'current_collection': self.current_collection,
+            'completed_collections': len(self.completed_collections),
+            'total_collections': len(self.fields),
+            'converted': self.converted,
+            'unparseable': self.unparseable,
+            'batches': self.batches,
+            'duration_seconds': round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+            'last_error': self.last_error
+        }
+
+
+__all__ = ['DATE_FIELDS', 'DateMigration', 'as_datetime', 'as_iso', 'date_migration_completed', 'date_range', 'utc_now']
+
+
+def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Convert legacy ISO-string timestamps to BSON dates")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause-ms", type=int, default=0)
+    args = parser.parse_args()
+
+    mongo_url = os.environ['MONGO_URL']
+    db_name = mongo_url.split('/')[-1] if '/' in mongo_url else os.environ.get('DB_NAME', 'sentratech_forms')
+
+    async def run():
+        client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+        migration = DateMigration(client[db_name], batch_size=args.batch_size, pause_ms=args.pause_ms)
+        await migration.run()
+        client.close()
+        return migration.get_stats()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
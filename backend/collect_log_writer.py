@@ -0,0 +1,184 @@
+"""
+Batched Collect Log Writer for SentraTech
+Buffers collect.log lines in memory and appends them in batches from a worker thread, with size/time rotation and gzip
+"""
+import asyncio
+import gzip
+import os
+import shutil
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+import logging
+
+import fast_json
+
+logger = logging.getLogger("collect_log_writer")
+
+
+class RotatingBatchWriter:
+    """
+    Append-only JSON-lines log written in batches
+
+    write() only encodes and buffers (no syscalls on the event loop). A background task
+    flushes every flush_interval or once flush_bytes are buffered, one write() per batch
+    on a file handle kept open between flushes. The file rotates past max_bytes or
+    rotate_interval; rotated segments are gzipped in a separate thread, so a rotation never
+    holds up the next batch. The buffer is a ring: when the disk cannot keep up, the oldest
+    lines are dropped and counted.
+    """
+
+    def __init__(self, directory: Optional[str] = None, filename: str = 'collect.log',
+                 max_buffer_lines: Optional[int] = None, flush_interval_ms: Optional[int] = None,
+                 flush_bytes: Optional[int] = None, max_bytes: Optional[int] = None,
+                 rotate_interval_seconds: Optional[float] = None, compress: Optional[bool] = None):
+        self.directory = directory or os.getenv('COLLECT_LOG_DIR', '/var/log/sentratech')
+        self.path = os.path.join(self.directory, filename)
+        self.flush_interval = (flush_interval_ms or int(os.getenv('COLLECT_LOG_FLUSH_MS', '1000'))) / 1000  # Convert to seconds
+        self.flush_bytes = flush_bytes or int(os.getenv('COLLECT_LOG_FLUSH_BYTES', '65536'))
+        self.max_bytes = max_bytes or int(os.getenv('COLLECT_LOG_MAX_MB', '50')) * 1024 * 1024
+        self.rotate_interval = rotate_interval_seconds or float(os.getenv('COLLECT_LOG_ROTATE_HOURS', '24')) * 3600
+        self.compress = compress if compress is not None else os.getenv('COLLECT_LOG_COMPRESS', 'true').lower() == 'true'
+
+        self.buffer: deque = deque(maxlen=max_buffer_lines or int(os.getenv('COLLECT_LOG_BUFFER_LINES', '10000')))
+        self.buffered_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._compress_tasks: Set[asyncio.Task] = set()
+        self._rotated: List[str] = []  # Rotated segments waiting for compression (appended by the writer thread)
+        self._closing = False
+        self._file = None
+        self._file_size = 0
+        self._opened_at = 0.0
+
+        # Writer statistics
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.compress_errors = 0
+
+    def write(self, record: Dict[str, Any]):
+        """Buffer one record; never blocks"""
+        line = fast_json.dumps(record) + b'\n'
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+            self.buffered_bytes -= len(self.buffer[0])
+        self.buffer.append(line)
+        self.buffered_bytes += len(line)
+        if (self._task is None or self._task.done()) and not self._closing:
+            self.start()
+        if self.buffered_bytes >= self.flush_bytes:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Hand everything buffered so far to the writer thread as one batch"""
+        async with self._flush_lock:
+            if not self.buffer:
+                return
+            lines = list(self.buffer)
+            self.buffer.clear()
+            self.buffered_bytes = 0
+            try:
+                await asyncio.to_thread(self._write_batch, b''.join(lines))
+                self.lines_written += len(lines)
+            except Exception as e:
+                self.write_errors += 1
+                self.dropped += len(lines)
+                logger.error(f"Collect log flush of {len(lines)} lines failed: {str(e)}")
+            while self._rotated:
+                task = asyncio.create_task(asyncio.to_thread(self._compress_segment, self._rotated.pop(0)))
+                self._compress_tasks.add(task)
+                task.add_done_callback(self._compress_tasks.discard)
+
+    def _write_batch(self, data: bytes):
+        if self._file is not None and (self._file_size + len(data) > self.max_bytes
+                                       or time.time() - self._opened_at >= self.rotate_interval):
+            self._rotate()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._file = open(self.path, 'ab')
+            self._file_size = self._file.tell()
+            self._opened_at = time.time()
+        self._file.write(data)
+        self._file.flush()
+        self._file_size += len(data)
+        self.bytes_written += len(data)
+        self.batches += 1
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        rotated = f"{self.path}.{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S-%f')}"
+        os.replace(self.path, rotated)
+        self.rotations += 1
+        if self.compress:
+            self._rotated.append(rotated)
+
+    def _compress_segment(self, rotated: str):
+        try:
+            with open(rotated, 'rb') as source, gzip.open(f"{rotated}.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+        except Exception as e:
+            # The uncompressed segment stays in place
+            self.compress_errors += 1
+            logger.error(f"Compressing rotated collect log {rotated} failed: {str(e)}")
+
+    async def run_forever(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Keep the loop alive so later lines are still written
+                logger.error(f"Collect log flush loop error: {str(e)}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def close(self):
+        """Stop the flush loop, write out the buffer and fsync (shutdown)"""
+        # Let the loop finish its current flush rather than cancelling a write in progress
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._compress_tasks:
+            await asyncio.gather(*self._compress_tasks)
+        if self._file is not None:
+            def sync_and_close():
+                os.fsync(self._file.fileno())
+                self._file.close()
+            await asyncio.to_thread(sync_and_close)
+            self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get writer statistics"""
+        return {
+            'path': self.path,
+            'buffered_lines': len(self.buffer),
+            'buffered_bytes': self.buffered_bytes,
+            'lines_written': self.lines_written,
+            'bytes_written': self.bytes_written,
+            'batches': self.batches,
+            'dropped': self.dropped,
+            'rotations': self.rotations,
+            'write_errors': self.write_errors,
+            'compress_errors': self.compress_errors
+        }
+
+
+__all__ = ['RotatingBatchWriter']
@@ -0,0 +1,171 @@
+"""
+Adaptive Concurrency Limiter for SentraTech
+AIMD cap on in-flight dashboard requests, driven by measured upstream RTT
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import logging
+
+import request_deadline
+
+logger = logging.getLogger("concurrency_limiter")
+
+
+class LimitExceeded(Exception):
+    """Request shed because the in-flight limit and its queue are full"""
+
+
+class AIMDLimiter:
+    """
+    Additive increase / multiplicative decrease limit on concurrent upstream calls
+
+    Every healthy response grows the limit by 1/limit (about +1 per round trip);
+    a timeout, 5xx/429 or a smoothed RTT well above the baseline shrinks it by backoff_ratio.
+    Comparing single samples against the minimum RTT would read ordinary latency jitter as
+    congestion and pin the limit at its floor.
+
+    The baseline is the median RTT over the last baseline_window_s seconds of uncongested
+    responses. Samples taken while congested are left out, so a sustained slowdown keeps
+    reading as congestion instead of becoming the baseline; only once the window has aged
+    out without a healthy sample is the new latency accepted as normal.
+    Work beyond the limit waits in a bounded queue and is shed when that is full or too slow.
+    """
+
+    BASELINE_SAMPLES = 3000
+    MIN_BASELINE_SAMPLES = 20  # Fewer samples than this give no latency signal yet
+
+    def __init__(self, initial_limit: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, backoff_ratio: Optional[float] = None,
+                 rtt_tolerance: Optional[float] = None, max_queue: Optional[int] = None,
+                 queue_timeout_ms: Optional[int] = None, baseline_window_s: Optional[float] = None):
+        self.limit = float(initial_limit or int(os.getenv('DASHBOARD_CONCURRENCY_INITIAL', '20')))
+        self.min_limit = min_limit or int(os.getenv('DASHBOARD_CONCURRENCY_MIN', '4'))
+        self.max_limit = max_limit or int(os.getenv('DASHBOARD_CONCURRENCY_MAX', '200'))
+        self.backoff_ratio = backoff_ratio or float(os.getenv('DASHBOARD_CONCURRENCY_BACKOFF', '0.9'))
+        self.rtt_tolerance = rtt_tolerance or float(os.getenv('DASHBOARD_RTT_TOLERANCE', '2.0'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('DASHBOARD_CONCURRENCY_QUEUE', '200'))
+        self.queue_timeout = (queue_timeout_ms or int(os.getenv('DASHBOARD_CONCURRENCY_QUEUE_TIMEOUT_MS', '2000'))) / 1000  # Convert to seconds
+        self.baseline_window = baseline_window_s or float(os.getenv('DASHBOARD_RTT_BASELINE_WINDOW_S', '300'))
+
+        self.inflight = 0
+        self.waiters: deque = deque()
+        # (time, RTT) of uncongested responses, thinned to at most BASELINE_SAMPLES per window
+        self.rtt_samples: deque = deque(maxlen=self.BASELINE_SAMPLES)
+        self.sample_spacing = self.baseline_window / self.BASELINE_SAMPLES
+        self.smoothed_rtt: Optional[float] = None  # Short-term EWMA of RTT
+        self._baseline: Optional[float] = None
+        self._baseline_at = 0.0
+        self.last_decrease = 0.0
+
+        # Limiter statistics
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.decreases = 0
+
+    def baseline_rtt(self) -> Optional[float]:
+        """Median RTT over the baseline window, recomputed at most once a second"""
+        now = time.time()
+        if now - self._baseline_at >= 1:
+            cutoff = now - self.baseline_window
+            while self.rtt_samples and self.rtt_samples[0][0] < cutoff:
+                self.rtt_samples.popleft()
+            if len(self.rtt_samples) < self.MIN_BASELINE_SAMPLES:
+                self._baseline = None
+            else:
+                self._baseline = sorted(rtt for _, rtt in self.rtt_samples)[len(self.rtt_samples) // 2]
+            self._baseline_at = now
+        return self._baseline
+
+    async def acquire(self):
+        """Take an in-flight slot, waiting in the queue if needed; raises LimitExceeded when shed"""
+        if self.inflight < int(self.limit) and not self.waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return
+
+        if len(self.waiters) >= self.max_queue:
+            self.shed += 1
+            raise LimitExceeded(f"Dashboard concurrency limit {int(self.limit)} reached and queue is full")
+
+        # Never queue past the caller's own request deadline
+        queue_timeout = request_deadline.cap_timeout(self.queue_timeout)
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():  # Otherwise the slot was handed over right at the deadline
+                future.cancel()
+                self.waiters.remove(future)
+                self.shed += 1
+                if queue_timeout < self.queue_timeout:
+                    raise request_deadline.DeadlineExceeded()
+                raise LimitExceeded(f"Waited {self.queue_timeout}s for a dashboard concurrency slot")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_slot()  # Caller went away after being granted a slot
+            else:
+                future.cancel()
+                if future in self.waiters:
+                    self.waiters.remove(future)
+            raise
+        self.admitted += 1
+
+    def release(self, rtt_ms: Optional[float] = None, dropped: bool = False, feedback: bool = True):
+        """Return a slot and feed the outcome back into the limit (feedback=False: the call never went out)"""
+        if not feedback:
+            self._release_slot()
+            return
+        baseline = self.baseline_rtt()
+        if rtt_ms is not None and not dropped:
+            self.smoothed_rtt = rtt_ms if self.smoothed_rtt is None else 0.8 * self.smoothed_rtt + 0.2 * rtt_ms
+
+        congested = dropped or (self.smoothed_rtt is not None and baseline is not None
+                                and self.smoothed_rtt > baseline * self.rtt_tolerance)
+
+        now = time.time()
+        if congested:
+            # Decrease at most once per baseline RTT so one burst of failures isn't counted many times
+            if now - self.last_decrease >= (baseline or 0) / 1000:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self.last_decrease = now
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            if rtt_ms is not None and (not self.rtt_samples or now - self.rtt_samples[-1][0] >= self.sample_spacing):
+                self.rtt_samples.append((now, rtt_ms))
+
+        self._release_slot()
+
+    def _release_slot(self):
+        self.inflight -= 1
+        while self.waiters and self.inflight < int(self.limit):
+            future = self.waiters.popleft()
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        baseline = self.baseline_rtt()
+        return {
+            'limit': int(self.limit),
+            'inflight': self.inflight,
+            'queue_depth': len(self.waiters),
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed': self.shed,
+            'limit_decreases': self.decreases,
+            'baseline_rtt_ms': round(baseline, 2) if baseline is not None else None,
+            'smoothed_rtt_ms': round(self.smoothed_rtt, 2) if self.smoothed_rtt is not None else None
+        }
+
+
+__all__ = ['AIMDLimiter', 'LimitExceeded']
@@ -0,0 +1,300 @@
+"""
+Shared Outbound Dashboard Client for SentraTech
+One pooled HTTP client and one retry policy for every call to the admin dashboard
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+import httpx
+import logging
+
+from concurrency_limiter import AIMDLimiter
+import fast_json
+import request_deadline
+from upstream_metrics import ConnectionTrace, UpstreamMetrics, status_class, upstream_metrics
+
+logger = logging.getLogger("dashboard_client")
+
+
+class RetryPolicy:
+    """Exponential backoff retry policy shared by all dashboard forwarding paths"""
+
+    def __init__(self, max_attempts: Optional[int] = None, backoff_ms: Optional[int] = None,
+                 backoff_multiplier: Optional[float] = None):
+        self.max_attempts = max_attempts or int(os.getenv('DASHBOARD_RETRIES', '3'))
+        self.backoff_ms = backoff_ms if backoff_ms is not None else int(os.getenv('DASHBOARD_BACKOFF_MS', '500'))
+        self.backoff_multiplier = backoff_multiplier or float(os.getenv('DASHBOARD_BACKOFF_MULTIPLIER', '3'))
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after the given (zero-based) failed attempt"""
+        return self.backoff_ms * (self.backoff_multiplier ** attempt) / 1000
+
+    def should_retry_status(self, status_code: int) -> bool:
+        """Server errors and throttling are retryable, other client errors are not"""
+        return status_code >= 500 or status_code == 429
+
+
+class LatencyWindow:
+    """Rolling window of recent latencies (ms) for percentile estimates"""
+
+    def __init__(self, size: int):
+        self.samples: deque = deque(maxlen=size)
+
+    def add(self, latency_ms: float):
+        self.samples.append(latency_ms)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class HedgePolicy:
+    """When to send a second copy of a slow idempotent request, and how many we can afford"""
+
+    def __init__(self, enabled: Optional[bool] = None, percentile: Optional[float] = None,
+                 budget_percent: Optional[float] = None, min_delay_ms: Optional[float] = None,
+                 min_samples: Optional[int] = None, holdback_percent: Optional[float] = None):
+        self.enabled = enabled if enabled is not None else os.getenv('DASHBOARD_HEDGE_ENABLED', 'false').lower() == 'true'
+        self.percentile = percentile or float(os.getenv('DASHBOARD_HEDGE_PERCENTILE', '95'))
+        self.budget_percent = budget_percent if budget_percent is not None else float(os.getenv('DASHBOARD_HEDGE_BUDGET_PERCENT', '5'))
+        self.min_delay = (min_delay_ms if min_delay_ms is not None else float(os.getenv('DASHBOARD_HEDGE_MIN_DELAY_MS', '50'))) / 1000  # Convert to seconds
+        self.min_samples = min_samples or int(os.getenv('DASHBOARD_HEDGE_MIN_SAMPLES', '20'))
+        # Share of idempotent requests never hedged, kept as the baseline for measuring tail reduction
+        self.holdback_percent = holdback_percent if holdback_percent is not None else float(os.getenv('DASHBOARD_HEDGE_HOLDBACK_PERCENT', '5'))
+
+        # Token bucket: every request earns budget_percent/100 of a hedge; the cap bounds hedge bursts
+        self.max_tokens = max(1.0, self.budget_percent)
+        self.tokens = 0.0
+
+    def earn(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.budget_percent / 100)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class DashboardClient:
+    """Pooled HTTP client for dashboard traffic with the shared retry policy and optional hedging"""
+
+    def __init__(self, timeout: Optional[float] = None, retry_policy: Optional[RetryPolicy] = None,
+                 hedge_policy: Optional[HedgePolicy] = None, limiter: Optional[AIMDLimiter] = None,
+                 metrics: Optional[UpstreamMetrics] = None):
+        self.timeout = timeout or float(os.getenv('DASHBOARD_TIMEOUT', '30'))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_policy = hedge_policy or HedgePolicy()
+        # Caps in-flight upstream calls; shed requests raise LimitExceeded to the caller's fallback
+        if limiter is None and os.getenv('DASHBOARD_CONCURRENCY_LIMITER', 'true').lower() == 'true':
+            limiter = AIMDLimiter()
+        self.limiter = limiter
+        self.metrics = metrics or upstream_metrics
+        self._client: Optional[httpx.AsyncClient] = None
+
+        window_size = int(os.getenv('DASHBOARD_LATENCY_WINDOW', '1000'))
+        self.attempt_latency = LatencyWindow(window_size)  # Single attempts that completed
+        self.request_latency = LatencyWindow(window_size)  # What callers waited, hedges included
+        self.hedged_latency = LatencyWindow(window_size)  # Idempotent requests eligible for hedging
+        self.holdback_latency = LatencyWindow(window_size)  # Idempotent requests held back from hedging
+
+        # Hedging statistics
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.hedges_skipped_budget = 0
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Lazily create the shared client so connections are reused across requests"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=int(os.getenv('DASHBOARD_MAX_CONNECTIONS', '100')),
+                    max_keepalive_connections=int(os.getenv('DASHBOARD_MAX_KEEPALIVE', '20'))
+                )
+            )
+        return self._client
+
+    async def post(self, url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+                   idempotency_key: Optional[str] = None, retry_policy: Optional[RetryPolicy] = None,
+                   timeout: Optional[float] = None, content: Optional[bytes] = None) -> httpx.Response:
+        """POST to the dashboard, retrying network errors and retryable statuses per the policy
+
+        Pass either json (serialized once with orjson) or content (raw bytes sent as-is)
+        """
+        policy = retry_policy or self.retry_policy
+        request_headers = dict(headers or {})
+        if content is None:
+            # Encoded once up front, so retries and hedged copies reuse the same bytes
+            content = fast_json.dumps(json)
+            if not any(name.lower() == 'content-type' for name in request_headers):
+                request_headers['Content-Type'] = 'application/json'
+        body = {'content': content}
+        if idempotency_key:
+            # Same key on every attempt so the dashboard can drop replays it already stored
+            request_headers['Idempotency-Key'] = idempotency_key
+
+        for attempt in range(policy.max_attempts):
+            is_last_attempt = attempt == policy.max_attempts - 1
+            error: Optional[httpx.HTTPError] = None
+            try:
+                response = await self._send(url, body, request_headers, timeout or self.timeout,
+                                            hedge=idempotency_key is not None)
+                if is_last_attempt or not policy.should_retry_status(response.status_code):
+                    response.extensions['attempts'] = attempt + 1
+                    return response
+                logger.warning(f"Dashboard returned {response.status_code} on attempt {attempt + 1}/{policy.max_attempts}: {url}")
+            except httpx.HTTPError as e:
+                if is_last_attempt:
+                    raise
+                error = e
+                logger.warning(f"Dashboard request error on attempt {attempt + 1}/{policy.max_attempts}: {url}: {str(e)}")
+
+            delay = policy.delay(attempt)
+            remaining = request_deadline.remaining()
+            if remaining is not None and remaining <= delay:
+                # The caller's budget ends before the next attempt could start
+                logger.warning(f"Request deadline reached after attempt {attempt + 1}/{policy.max_attempts}: {url}")
+                if error is not None:
+                    raise error
+                response.extensions['attempts'] = attempt + 1
+                return response
+            self.metrics.record_retry(url)
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, url: str, body: Dict[str, Any], headers: Dict[str, str], timeout: float) -> httpx.Response:
+        """One HTTP attempt, recorded in the attempt latency window when it completes"""
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        try:
+            # Queueing for a slot or waiting out a hedge delay spends budget, so cap as late as possible
+            timeout = request_deadline.cap_timeout(timeout)
+        except request_deadline.DeadlineExceeded:
+            if self.limiter is not None:
+                self.limiter.release(feedback=False)
+            raise
+        start_time = time.time()
+        rtt_ms = None
+        dropped = True
+        trace = ConnectionTrace()
+        try:
+            response = await self.get_client().post(url, headers=headers, timeout=timeout,
+                                                    extensions={'trace': trace}, **body)
+            rtt_ms = (time.time() - start_time) * 1000
+            dropped = response.status_code >= 500 or response.status_code == 429
+            self.attempt_latency.add(rtt_ms)
+            self.metrics.record_attempt(url, rtt_ms / 1000, status_class(response.status_code),
+                                        len(body['content']), len(response.content), trace.reused)
+            return response
+        except asyncio.CancelledError:
+            dropped = False  # Cancelled hedge losers say nothing about upstream congestion
+            raise
+        except httpx.HTTPError as e:
+            outcome = 'timeout' if isinstance(e, httpx.TimeoutException) else 'error'
+            self.metrics.record_attempt(url, time.time() - start_time, outcome, len(body['content']), 0, trace.reused)
+            raise
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(rtt_ms, dropped)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while hedging is off or the window is too small"""
+        policy = self.hedge_policy
+        if not policy.enabled or len(self.attempt_latency.samples) < policy.min_samples:
+            return None
+        return max(policy.min_delay, self.attempt_latency.percentile(policy.percentile) / 1000)
+
+    async def _send(self, url: str, body: Dict[str, Any], headers: Dict[str, str], timeout: float, hedge: bool) -> httpx.Response:
+        """Send one logical attempt; idempotent requests get a second copy if the first is slow"""
+        start_time = time.time()
+        self.requests += 1
+        self.hedge_policy.earn()
+
+        delay = self.hedge_delay() if hedge else None
+        if delay is not None and random.random() * 100 < self.hedge_policy.holdback_percent:
+            try:
+                return await self._attempt(url, body, headers, timeout)
+            finally:
+                self._record_request(start_time, self.holdback_latency)
+        if delay is None:
+            try:
+                return await self._attempt(url, body, headers, timeout)
+            finally:
+                self._record_request(start_time)
+
+        primary = asyncio.create_task(self._attempt(url, body, headers, timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if self.hedge_policy.try_spend():
+                    self.hedges_sent += 1
+                    tasks.add(asyncio.create_task(self._attempt(url, body, headers, timeout)))
+                else:
+                    self.hedges_skipped_budget += 1
+
+            # First successful response wins; only fail once every copy has failed
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()  # Loser (or abandoned copy) no longer matters
+            self._record_request(start_time, self.hedged_latency)
+
+    def _record_request(self, start_time: float, window: Optional[LatencyWindow] = None):
+        latency_ms = (time.time() - start_time) * 1000
+        self.request_latency.add(latency_ms)
+        if window is not None:
+            window.add(latency_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get latency and hedging statistics"""
+        hedged_p99 = self.hedged_latency.percentile(99)
+        holdback_p99 = self.holdback_latency.percentile(99)
+        return {
+            'requests': self.requests,
+            'concurrency': self.limiter.get_stats() if self.limiter is not None else None,
+            'hedging_enabled': self.hedge_policy.enabled,
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 2) if self.hedge_delay() else None,
+            'hedges_sent': self.hedges_sent,
+            'hedge_wins': self.hedge_wins,
+            'hedges_skipped_budget': self.hedges_skipped_budget,
+            'hedge_rate': round(self.hedges_sent / self.requests * 100, 2) if self.requests else 0,
+            'hedge_budget_percent': self.hedge_policy.budget_percent,
+            'hedge_holdback_percent': self.hedge_policy.holdback_percent,
+            'attempt_p50_ms': self.attempt_latency.percentile(50),
+            'attempt_p99_ms': self.attempt_latency.percentile(99),
+            'request_p50_ms': self.request_latency.percentile(50),
+            'request_p99_ms': self.request_latency.percentile(99),
+            'hedged_p99_ms': hedged_p99,
+            'holdback_p99_ms': holdback_p99,
+            # Held-back requests show what the tail looks like without hedging
+            'tail_reduction_p99_ms': round(holdback_p99 - hedged_p99, 2) if hedged_p99 and holdback_p99 else None
+        }
+
+    async def aclose(self):
+        """Close pooled connections (used on shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global dashboard client instance
+dashboard_client = DashboardClient()
+
+__all__ = ['RetryPolicy', 'HedgePolicy', 'LatencyWindow', 'DashboardClient', 'dashboard_client']
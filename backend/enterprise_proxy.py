@@ -2,8 +2,7 @@
 Enterprise-Grade Proxy Service for SentraTech
 Handles form submissions with retry logic, idempotency, and real-time sync
 """
-import asyncio
-import aiohttp
+import httpx
 import time
 import uuid
 import json
@@ -14,6 +13,10 @@ from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
 import logging
 
+from dashboard_client import dashboard_client, RetryPolicy
+from concurrency_limiter import LimitExceeded
+from ack_tracker import ack_tracker
+
 # Configure logging
 logger = logging.getLogger("enterprise_proxy")
 
@@ -27,6 +30,12 @@ class EnterpriseProxyService:
         self.max_retries = int(os.getenv('PROXY_RETRIES', '3'))
         self.backoff_ms = int(os.getenv('PROXY_BACKOFF', '500'))
         self.idempotency_window = int(os.getenv('IDEMPOTENCY_WINDOW', '120000')) / 1000  # Convert to seconds
+        # Constant backoff between attempts, as before the move to the shared client
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.max_retries + 1,
+            backoff_ms=self.backoff_ms,
+            backoff_multiplier=1
+        )
         
         # In-memory store for idempotency (use Redis for production scaling)
         self.submission_cache = {}
@@ -70,80 +79,79 @@ class EnterpriseProxyService:
             'X-API-Key': self.api_key,
             'User-Agent': 'SentraTech-Proxy/1.0'
         }
+        attempts = self.max_retries + 1
         
-        for attempt in range(self.max_retries + 1):
+        try:
+            logger.info(f"Forwarding {form_type} to {url} (up to {attempts} attempts)")
+            # submissionId doubles as the idempotency key, so retries and hedges are deduplicated upstream
+            response = await dashboard_client.post(
+                url,
+                json=payload,
+                headers=headers,
+                idempotency_key=payload.get('submissionId'),
+                retry_policy=self.retry_policy,
+                timeout=self.timeout
+            )
+        except LimitExceeded as e:
+            logger.warning(f"Shed {form_type} forward: {str(e)}")
+            raise HTTPException(
+                status_code=503,
+                detail="Dashboard forwarding is overloaded, please retry shortly"
+            )
+        except httpx.TimeoutException:
+            logger.error(f"Timeout after {attempts} attempts")
+            raise HTTPException(
+                status_code=504,
+                detail=f"Timeout after {attempts} attempts"
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Network error after {attempts} attempts: {str(e)}")
+            raise HTTPException(
+                status_code=503,
+                detail=f"Network error after {attempts} attempts: {str(e)}"
+            )
+        
+        if response.status_code == 200:
             try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
-                    logger.info(f"Attempt {attempt + 1}/{self.max_retries + 1}: Forwarding {form_type} to {url}")
-                    
-                    async with session.post(url, json=payload, headers=headers) as response:
-                        response_text = await response.text()
-                        
-                        if response.status == 200:
-                            try:
-                                response_data = await response.json() if response_text else {}
-                                logger.info(f"Successfully forwarded {form_type}: {response.status}")
-                                return {
-                                    'success': True,
-                                    'status_code': response.status,
-                                    'data': response_data,
-                                    'attempt': attempt + 1
-                                }
-                            except json.JSONDecodeError:
-                                logger.warning(f"Invalid JSON response from dashboard: {response_text}")
-                                return {
-                                    'success': True,
-                                    'status_code': response.status,
-                                    'data': {'raw_response': response_text},
-                                    'attempt': attempt + 1
-                                }
-                        
-                        elif response.status >= 500:  # Server errors - retry
-                            logger.warning(f"Server error {response.status} on attempt {attempt + 1}: {response_text}")
-                            if attempt < self.max_retries:
-                                await asyncio.sleep(self.backoff_ms / 1000)
-                                continue
-                            else:
-                                raise HTTPException(
-                                    status_code=502,
-                                    detail=f"Dashboard service unavailable after {self.max_retries + 1} attempts"
-                                )
-                        
-                        else:  # Client errors - don't retry
-                            logger.error(f"Client error {response.status}: {response_text}")
-                            raise HTTPException(
-                                status_code=response.status,
-                                detail=f"Dashboard rejected request: {response_text}"
-                            )
-            
-            except aiohttp.ClientError as e:
-                logger.error(f"Network error on attempt {attempt + 1}: {str(e)}")
-                if attempt < self.max_retries:
-                    await asyncio.sleep(self.backoff_ms / 1000)
-                    continue
-                else:
-                    raise HTTPException(
-                        status_code=503,
-                        detail=f"Network error after {self.max_retries + 1} attempts: {str(e)}"
-                    )
-            
-            except asyncio.TimeoutError:
-                logger.error(f"Timeout on attempt {attempt + 1}")
-                if attempt < self.max_retries:
-                    await asyncio.sleep(self.backoff_ms / 1000)
-                    continue
-                else:
-                    raise HTTPException(
-                        status_code=504,
-                        detail=f"Timeout after {self.max_retries + 1} attempts"
-                    )
+                response_data = response.json() if response.text else {}
+                logger.info(f"Successfully forwarded {form_type}: {response.status_code}")
+                return {
+                    'success': True,
+                    'status_code': response.status_code,
+                    'data': response_data,
+                    'attempt': response.extensions.get('attempts', 1)
+                }
+            except json.JSONDecodeError:
+                logger.warning(f"Invalid JSON response from dashboard: {response.text}")
+                return {
+                    'success': True,
+                    'status_code': response.status_code,
+                    'data': {'raw_response': response.text},
+                    'attempt': response.extensions.get('attempts', 1)
+                }
+        
+        elif response.status_code >= 500:  # Server errors - retried by the policy
+            logger.warning(f"Server error {response.status_code} after {attempts} attempts: {response.text}")
+            raise HTTPException(
+                status_code=502,
+                detail=f"Dashboard service unavailable after {attempts} attempts"
+            )
+        
+        else:  # Client errors - don't retry
+            logger.error(f"Client error {response.status_code}: {response.text}")
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Dashboard rejected request: {response.text}"
+            )
+    
+    async def wait_for_acknowledgment(self, submission_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait until the dashboard acknowledges the submission (HTTP handler or WebSocket ACK)"""
+        return await ack_tracker.wait(submission_id, timeout)
     
-    async def wait_for_acknowledgment(self, submission_id: str, timeout: float = 2.0) -> bool:
-        """Wait for acknowledgment from dashboard (simplified - would use WebSocket in full implementation)"""
-        # In a full implementation, this would listen for WebSocket ACK
-        # For now, we'll simulate the acknowledgment check
-        await asyncio.sleep(0.1)  # Simulate network delay
-        return True  # Assume ACK received for demo
+    def requires_confirmed_ack(self, request: Request, body: Dict[Any, Any]) -> bool:
+        """Callers opt in to waiting for the ACK via X-Require-Ack header or requireAck field"""
+        header = request.headers.get('x-require-ack', '').lower()
+        return header in ('1', 'true', 'yes') or body.pop('requireAck', False) in (True, 'true', '1')
     
     async def process_form_submission(self, form_type: str, request: Request) -> JSONResponse:
         """Process form submission with full enterprise-grade handling"""
@@ -186,12 +194,27 @@ class EnterpriseProxyService:
             # Store for idempotency checking
             await self.store_submission(submission_id, form_type, body)
             
+            # Register before forwarding so an ACK that beats the response is not lost
+            require_ack = self.requires_confirmed_ack(request, body)
+            if require_ack:
+                ack_tracker.register(submission_id)
+            
             # Forward to dashboard
-            result = await self.forward_to_dashboard(form_type, enhanced_payload)
+            try:
+                result = await self.forward_to_dashboard(form_type, enhanced_payload)
+            except Exception:
+                ack_tracker.discard(submission_id)
+                raise
             
             if result['success']:
-                # Wait for acknowledgment
-                ack_received = await self.wait_for_acknowledgment(submission_id)
+                if isinstance(result['data'], dict) and result['data'].get('ack'):
+                    ack_tracker.resolve(submission_id, 'dashboard_response')
+                
+                # Only wait for the ACK when the caller asked for confirmation
+                if require_ack:
+                    ack_received = await self.wait_for_acknowledgment(submission_id)
+                else:
+                    ack_received = isinstance(result['data'], dict) and bool(result['data'].get('ack'))
                 
                 return JSONResponse(
                     status_code=200,
@@ -200,11 +223,13 @@ class EnterpriseProxyService:
                         'message': 'Form submission processed successfully',
                         'submissionId': submission_id,
                         'ackReceived': ack_received,
+                        'ackRequired': require_ack,
                         'forwardingAttempts': result['attempt'],
                         'timestamp': datetime.now(timezone.utc).isoformat()
                     }
                 )
             else:
+                ack_tracker.discard(submission_id)
                 raise HTTPException(status_code=502, detail="Failed to forward to dashboard")
         
         except HTTPException:
@@ -248,6 +273,7 @@ async def proxy_health():
             'dashboard_url': proxy_service.dashboard_base_url,
             'max_retries': proxy_service.max_retries,
             'timeout': proxy_service.timeout,
+            'ack_timeout': ack_tracker.timeout,
             'idempotency_window': proxy_service.idempotency_window
         }
     }
@@ -259,5 +285,6 @@ async def proxy_stats():
     return {
         'cached_submissions': len(proxy_service.submission_cache),
         'cache_entries': list(proxy_service.submission_cache.keys())[-10:],  # Last 10 entries
+        'acknowledgments': ack_tracker.get_stats(),
         'timestamp': datetime.now(timezone.utc).isoformat()
     }
\ No newline at end of file
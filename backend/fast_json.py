@@ -0,0 +1,52 @@
+"""
+Fast JSON Encoding for SentraTech
+orjson-backed response class and encoder shared by API responses, dashboard forwards, WebSocket frames and log lines
+"""
+from decimal import Decimal
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import logging
+
+logger = logging.getLogger("fast_json")
+
+# Dict keys may be ints/enums/datetimes, as with the stdlib encoder
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Types orjson does not handle itself (datetime, date, UUID and dataclasses are native)"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes"""
+    return orjson.dumps(obj, default=_default, option=OPTIONS)
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize to a JSON string (WebSocket text frames)"""
+    return dumps(obj).decode()
+
+
+loads = orjson.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; return it directly to skip FastAPI's jsonable_encoder pass"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+__all__ = ['FastJSONResponse', 'dumps', 'dumps_str', 'loads']
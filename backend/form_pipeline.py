@@ -0,0 +1,257 @@
+"""
+Declarative Form Forwarding Pipeline for SentraTech
+Per-form specs compiled once into single-pass transformers, served by one proxy dispatcher
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import JSONResponse
+import logging
+
+from log_pipeline import log_event, payload_fields
+
+logger = logging.getLogger("proxy_debug")
+
+# What to do when the dashboard forward fails
+FAILURE_FALLBACK = "fallback"  # Park in a Mongo fallback collection (replayed later) and answer success
+FAILURE_ERROR = "error"  # Surface the dashboard error to the caller
+FAILURE_OFFLINE_CHAT = "offline_chat"  # Answer with the offline chat message
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FormSpec:
+    """Declarative description of how one form is cleaned up and forwarded"""
+
+    def __init__(self, form_type: str, label: str, endpoint: Optional[str] = None,
+                 renames: Optional[Dict[str, str]] = None, csv_fields: Tuple[str, ...] = (),
+                 int_fields: Tuple[str, ...] = (), defaults: Optional[Dict[str, Any]] = None,
+                 dedupe: bool = True, duplicate_message: str = "This request was already submitted recently",
+                 failure_mode: str = FAILURE_FALLBACK, fallback_collection: Optional[str] = None,
+                 success_message: str = "", batchable: bool = True, log_fields: Tuple[str, ...] = ()):
+        self.form_type = form_type
+        self.label = label
+        self.endpoint = endpoint or f"/forms/{form_type}"
+        # Source field copied to the dashboard field name when the latter is missing (source is kept)
+        self.renames = renames or {}
+        self.csv_fields = csv_fields  # Lists joined into comma-separated strings
+        self.int_fields = int_fields  # Numbers rounded to integers
+        self.defaults = defaults or {}  # Callables are evaluated per request
+        self.dedupe = dedupe
+        self.duplicate_message = duplicate_message
+        self.failure_mode = failure_mode
+        self.fallback_collection = fallback_collection
+        self.success_message = success_message
+        self.batchable = batchable
+        self.log_fields = log_fields
+
+
+class CompiledForm:
+    """A FormSpec flattened into tuples so each request is transformed in a single pass"""
+
+    def __init__(self, spec: FormSpec):
+        self.spec = spec
+        self._renames = tuple(spec.renames.items())
+        self._csv_fields = tuple(spec.csv_fields)
+        self._int_fields = tuple(spec.int_fields)
+        self._static_defaults = tuple((k, v) for k, v in spec.defaults.items() if not callable(v))
+        self._dynamic_defaults = tuple((k, v) for k, v in spec.defaults.items() if callable(v))
+        self._log_fields = tuple(spec.log_fields)
+
+    def transform(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply renames, coercions and defaults in place"""
+        for source, target in self._renames:
+            if source in data and target not in data:
+                data[target] = data[source]
+        for field in self._csv_fields:
+            value = data.get(field)
+            if isinstance(value, list):
+                data[field] = ','.join(str(item) for item in value)
+        for field in self._int_fields:
+            value = data.get(field)
+            # Dashboard validation expects integers, the frontend sends floats
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                data[field] = int(round(value))
+        for field, default in self._static_defaults:
+            if field not in data:
+                data[field] = default
+        for field, default in self._dynamic_defaults:
+            if field not in data:
+                data[field] = default()
+        return data
+
+    def log_fields(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields for the one structured log record per submission"""
+        fields = {field: data[field] for field in self._log_fields if field in data}
+        return {'form': self.spec.form_type, 'id': data.get('id'), **fields, **payload_fields(data)}
+
+
+# Forms served by /api/proxy/<form_type>
+PROXY_FORM_SPECS: List[FormSpec] = [
+    FormSpec(
+        'newsletter-signup', 'Newsletter',
+        defaults={'timestamp': utc_now_iso, 'source': 'website_newsletter'},
+        duplicate_message="This newsletter subscription was already submitted recently",
+        failure_mode=FAILURE_ERROR,  # Fallback disabled so real dashboard errors are visible
+        log_fields=('email', 'source')
+    ),
+    FormSpec(
+        'contact-sales', 'Contact sales',
+        defaults={'timestamp': utc_now_iso},
+        duplicate_message="This contact sales request was already submitted recently",
+        fallback_collection='contact_fallback',
+        success_message="Contact sales request received successfully",
+        log_fields=('work_email', 'company_name', 'plan_selected')
+    ),
+    FormSpec(
+        'demo-request', 'Demo request',
+        defaults={'timestamp': utc_now_iso, 'source': 'website_cta'},
+        duplicate_message="This demo request was already submitted recently",
+        fallback_collection='demo_fallback',
+        success_message="Demo request submitted successfully",
+        log_fields=('email', 'company', 'source')
+    ),
+    FormSpec(
+        'roi-calculator', 'ROI calculator',
+        int_fields=('bundles',),
+        defaults={'timestamp': utc_now_iso},
+        duplicate_message="This ROI calculation was already submitted recently",
+        fallback_collection='roi_fallback',
+        success_message="ROI report submitted successfully",
+        log_fields=('email', 'country', 'bundles')
+    ),
+    FormSpec(
+        'job-application', 'Job application',
+        renames={'name': 'full_name', 'position': 'position_applied'},
+        csv_fields=('work_shifts', 'preferred_shifts'),
+        defaults={'work_authorization': 'authorized', 'timestamp': utc_now_iso, 'source': 'careers_page'},
+        fallback_collection='job_application_fallback',
+        success_message="Job application submitted successfully",
+        log_fields=('email', 'position_applied')
+    ),
+    FormSpec(
+        'chat-message', 'Chat message',
+        endpoint='/chat/message',
+        defaults={'timestamp': utc_now_iso},
+        dedupe=False,
+        failure_mode=FAILURE_OFFLINE_CHAT,
+        batchable=False
+    ),
+]
+
+# forward(spec, data, original_headers) -> proxy result dict ({"success", "data"/"error", ...})
+Forward = Callable[[FormSpec, Dict[str, Any], Dict[str, str]], Awaitable[Dict[str, Any]]]
+
+
+class FormDispatcher:
+    """Single request path for every proxied form"""
+
+    def __init__(self, specs: List[FormSpec], forward: Forward, db, is_duplicate: Callable[[Optional[str]], bool]):
+        self.forms = {spec.form_type: CompiledForm(spec) for spec in specs}
+        self.forward = forward
+        self.db = db
+        self.is_duplicate = is_duplicate
+        self.stats = {form_type: {'requests': 0, 'duplicates': 0, 'forwarded': 0, 'failed': 0, 'errors': 0, 'total_ms': 0.0}
+                      for form_type in self.forms}
+
+    async def dispatch(self, form_type: str, request: Request):
+        compiled = self.forms[form_type]
+        spec = compiled.spec
+        stats = self.stats[form_type]
+        stats['requests'] += 1
+        start_time = time.time()
+
+        try:
+            data = await request.json()
+
+            request_id = data.get("id")
+            if spec.dedupe and self.is_duplicate(request_id):
+                stats['duplicates'] += 1
+                logger.warning(f"🚫 Duplicate {spec.form_type} request blocked: {request_id}")
+                return JSONResponse(
+                    content={
+                        "success": False,
+                        "error": "Duplicate request",
+                        "message": spec.duplicate_message
+                    },
+                    status_code=429
+                )
+
+            compiled.transform(data)
+            log_event(logger, logging.INFO, "proxy_request", **compiled.log_fields(data))
+
+            result = await self.forward(spec, data, dict(request.headers))
+            if result['success']:
+                stats['forwarded'] += 1
+                return result['data']
+
+            stats['failed'] += 1
+            return await self.handle_failure(spec, data, result)
+
+        except Exception as e:
+            stats['errors'] += 1
+            logging.error(f"{spec.label} proxy error: {str(e)}")
+            return {"success": False, "error": "Internal server error"}
+        finally:
+            stats['total_ms'] += (time.time() - start_time) * 1000
+
+    async def handle_failure(self, spec: FormSpec, data: Dict[str, Any], result: Dict[str, Any]):
+        if spec.failure_mode == FAILURE_OFFLINE_CHAT:
+            return {
+                "success": True,
+                "response": "Thank you for your message! Our AI system will help you find the right solution. Our team will follow up with you soon.",
+                "conversation_id": f"offline_{int(time.time() * 1000)}",
+                "mode": "offline"
+            }
+
+        if spec.failure_mode == FAILURE_ERROR:
+            logging.error(f"{spec.label} proxy failed: {result['error']}")
+            return {
+                "success": False,
+                "error": f"Dashboard integration failed: {result['error']}",
+                "debug_mode": True
+            }
+
+        # Store locally as backup; the replay reuses the key of the failed forward, which may have reached the dashboard
+        fallback_data = {
+            **data,
+            "id": str(uuid.uuid4()),
+            "idempotency_key": data.get("id") or data.get("submissionId"),
+            "created_at": datetime.now(timezone.utc),
+            "status": "proxy_failed",
+            "proxy_error": result['error']
+        }
+        # Shielded: a request deadline expiring now must not cancel the write mid-flight
+        await asyncio.shield(self.db[spec.fallback_collection].insert_one(fallback_data))
+
+        return {
+            "success": True,
+            "message": spec.success_message,
+            "id": fallback_data["id"]
+        }
+
+    def endpoint(self, form_type: str):
+        """Route handler bound to one form type"""
+        async def handler(request: Request):
+            return await self.dispatch(form_type, request)
+        handler.__doc__ = f"Proxy {self.forms[form_type].spec.label.lower()} to the CRM dashboard"
+        return handler
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-form request statistics"""
+        return {
+            form_type: {
+                **{k: v for k, v in stats.items() if k != 'total_ms'},
+                'avg_ms': round(stats['total_ms'] / stats['requests'], 2) if stats['requests'] else 0
+            }
+            for form_type, stats in self.stats.items()
+        }
+
+
+__all__ = ['FormSpec', 'CompiledForm', 'FormDispatcher', 'PROXY_FORM_SPECS',
+           'FAILURE_FALLBACK', 'FAILURE_ERROR', 'FAILURE_OFFLINE_CHAT']
@@ -0,0 +1,164 @@
+"""
+Background Upstream Health Prober for SentraTech
+Probes dependencies on a jittered interval so status endpoints answer from memory
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+import logging
+
+logger = logging.getLogger("health_prober")
+
+# check() -> optional details dict; raising means the dependency is down
+HealthCheck = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class ProbeWindow:
+    """Rolling window of probe results for one dependency"""
+
+    def __init__(self, size: int):
+        self.results: deque = deque(maxlen=size)  # (checked_at, ok, latency_ms)
+        self.last_ok: Optional[bool] = None
+        self.last_checked: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.details: Dict[str, Any] = {}
+
+    def record(self, ok: bool, latency_ms: float, error: Optional[str] = None, details: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        self.results.append((now, ok, latency_ms))
+        self.last_ok = ok
+        self.last_checked = now
+        if ok:
+            self.last_success = now
+            self.last_error = None
+            self.details = details or {}
+        else:
+            self.last_error = error
+
+    def availability(self) -> Optional[float]:
+        if not self.results:
+            return None
+        return round(sum(1 for _, ok, _ in self.results if ok) / len(self.results) * 100, 2)
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        latencies = sorted(latency for _, ok, latency in self.results if ok)
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))], 2)
+
+
+class HealthProber:
+    """Runs registered dependency checks in the background and caches their state"""
+
+    def __init__(self, interval_seconds: Optional[float] = None, jitter: Optional[float] = None,
+                 timeout_seconds: Optional[float] = None, window_size: Optional[int] = None):
+        self.interval = interval_seconds or float(os.getenv('HEALTH_PROBE_INTERVAL_SECONDS', '15'))
+        self.jitter = jitter if jitter is not None else float(os.getenv('HEALTH_PROBE_JITTER', '0.2'))
+        self.timeout = timeout_seconds or float(os.getenv('HEALTH_PROBE_TIMEOUT_SECONDS', '5'))
+        self.window_size = window_size or int(os.getenv('HEALTH_PROBE_WINDOW', '120'))
+
+        self.checks: Dict[str, HealthCheck] = {}
+        self.windows: Dict[str, ProbeWindow] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: HealthCheck):
+        self.checks[name] = check
+        self.windows[name] = ProbeWindow(self.window_size)
+
+    async def probe(self, name: str):
+        """Run one check with the probe timeout and record the outcome"""
+        start_time = time.time()
+        try:
+            details = await asyncio.wait_for(self.checks[name](), timeout=self.timeout)
+            self.windows[name].record(True, (time.time() - start_time) * 1000, details=details)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.windows[name].record(False, (time.time() - start_time) * 1000, error=f"Timed out after {self.timeout}s")
+        except Exception as e:
+            self.windows[name].record(False, (time.time() - start_time) * 1000, error=str(e) or type(e).__name__)
+
+    async def run_once(self):
+        await asyncio.gather(*[self.probe(name) for name in self.checks])
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health probe round failed: {str(e)}")
+            # Jitter keeps replicas from probing shared upstreams in lockstep
+            await asyncio.sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def is_healthy(self, name: str) -> Optional[bool]:
+        """Last known state; None until probed or once the result is stale"""
+        window = self.windows[name]
+        if window.last_checked is None or time.time() - window.last_checked > self.interval * 3:
+            return None
+        return window.last_ok
+
+    def get_status(self, name: str) -> Dict[str, Any]:
+        window = self.windows[name]
+        healthy = self.is_healthy(name)
+        return {
+            'status': 'unknown' if healthy is None else ('healthy' if healthy else 'unavailable'),
+            'availability': window.availability(),
+            'latency_p50_ms': window.latency_percentile(50),
+            'latency_p99_ms': window.latency_percentile(99),
+            'samples': len(window.results),
+            'last_checked': datetime.fromtimestamp(window.last_checked, timezone.utc).isoformat() if window.last_checked else None,
+            'last_success': datetime.fromtimestamp(window.last_success, timezone.utc).isoformat() if window.last_success else None,
+            'last_error': window.last_error
+        }
+
+    def get_details(self, name: str) -> Dict[str, Any]:
+        """Details returned by the last successful check"""
+        return self.windows[name].details
+
+    def get_all_status(self) -> Dict[str, Any]:
+        return {name: self.get_status(name) for name in self.checks}
+
+
+def http_check(get_client: Callable[[], httpx.AsyncClient], url: str, headers: Optional[Dict[str, str]] = None,
+               healthy_below: int = 500) -> HealthCheck:
+    """Check that a URL answers with a status below healthy_below"""
+    async def check():
+        response = await get_client().get(url, headers=headers)
+        if response.status_code >= healthy_below:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return {'status_code': response.status_code}
+    return check
+
+
+def tcp_check(host: str, port: int) -> HealthCheck:
+    """Check that a TCP connection can be opened (used for SMTP)"""
+    async def check():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+        await writer.wait_closed()
+        return {'host': host, 'port': port}
+    return check
+
+
+__all__ = ['HealthProber', 'ProbeWindow', 'http_check', 'tcp_check']
@@ -0,0 +1,343 @@
+"""
+Index Plan for SentraTech
+Declarative index definitions (including the retention TTL indexes) applied idempotently at startup, plus a registry of every request-path query shape and an explain() audit that flags collection scans
+
+Audit a test database (indexes are applied first, so the planner sees the real plan):
+    python index_plan.py --mongo-url mongodb://localhost:27017/sentratech_test [--no-apply]
+Exits non-zero when a shape that is not explicitly allowed to scan plans a COLLSCAN.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from bson_dates import date_migration_completed, date_range
+from pagination import keyset_filter
+from retention import RETENTION_POLICIES
+
+logger = logging.getLogger("index_plan")
+
+FORM_COLLECTIONS = ['demo_requests', 'roi_reports', 'contact_requests', 'subscriptions', 'job_applications']
+FALLBACK_COLLECTIONS = ['contact_fallback', 'demo_fallback', 'roi_fallback', 'job_application_fallback']
+DASHBOARD_FORM_COLLECTIONS = ['newsletter_signup', 'contact_sales', 'demo_request', 'roi_calculator', 'job_application']
+ROLLUP_COLLECTIONS = [f"{prefix}_{granularity}" for prefix in ['analytics', 'analytics_pages', 'performance', 'submissions']
+                      for granularity in ['hourly', 'daily']]
+# Collections searched by email for GDPR export and deletion; most documents there have no email, hence sparse
+EMAIL_LOOKUP_COLLECTIONS = ['roi_calculations', 'chat_sessions', 'chat_messages', 'user_interactions', 'page_views',
+                            'conversion_events', 'subscriptions']
+
+
+class IndexSpec:
+    """One index: key pattern plus options, named the way the server names it by default"""
+
+    def __init__(self, collection: str, keys: List[Tuple[str, Any]], unique: bool = False, sparse: bool = False,
+                 expire_after_seconds: Optional[int] = None, after_date_migration: bool = False, reason: str = ""):
+        self.collection = collection
+        self.keys = keys
+        self.unique = unique
+        self.sparse = sparse
+        self.expire_after_seconds = expire_after_seconds
+        # Deferred until the collection's string timestamps are converted (an archived TTL must not skip any)
+        self.after_date_migration = after_date_migration
+        self.reason = reason
+        self.name = "_".join(f"{field}_{direction}" for field, direction in keys)
+
+    def options(self) -> Dict[str, Any]:
+        options = {'name': self.name, 'background': True}
+        if self.unique:
+            options['unique'] = True
+        if self.sparse:
+            options['sparse'] = True
+        if self.expire_after_seconds is not None:
+            options['expireAfterSeconds'] = self.expire_after_seconds
+        return options
+
+    def matches(self, info: Dict[str, Any]) -> bool:
+        """Whether an existing index (from index_information()) already has these options, TTL aside"""
+        return bool(info.get('unique')) == self.unique and bool(info.get('sparse')) == self.sparse
+
+    def ttl_differs(self, info: Dict[str, Any]) -> bool:
+        """Whether only the TTL needs changing, which collMod does in place"""
+        current = info.get('expireAfterSeconds')
+        return self.expire_after_seconds is not None and (current is None or int(current) != self.expire_after_seconds)
+
+
+class QueryShape:
+    """A filter/sort a request path sends, with representative values for explain()"""
+
+    def __init__(self, name: str, collection: str, filter: Optional[Dict[str, Any]] = None,
+                 sort: Optional[List[Tuple[str, int]]] = None, kind: str = 'find', allow_collscan: bool = False):
+        self.name = name
+        self.collection = collection
+        self.filter = filter or {}
+        self.sort = sort
+        self.kind = kind  # 'find' (also stands in for update/delete with the same filter) or 'count'
+        self.allow_collscan = allow_collscan
+
+
+INDEX_PLAN: List[IndexSpec] = [
+    # Demo requests
+    IndexSpec('demo_requests', [('email', 1)]),
+    IndexSpec('demo_requests', [('created_at', -1)]),
+    IndexSpec('demo_requests', [('company', 'text'), ('name', 'text')]),
+    IndexSpec('demo_requests', [('id', 1)], reason="Sheets fallback status update"),
+
+    # ROI calculations
+    IndexSpec('roi_calculations', [('id', 1)], unique=True),
+    IndexSpec('roi_calculations', [('created_at', -1)]),
+
+    # Chat sessions and messages
+    IndexSpec('chat_sessions', [('session_id', 1)], unique=True),
+    IndexSpec('chat_sessions', [('id', 1)], reason="Session lookup and last_activity update"),
+    IndexSpec('chat_messages', [('session_id', 1), ('timestamp', 1)]),
+
+    # Analytics (page_views.timestamp_-1 is the retention TTL index, declared below)
+    IndexSpec('page_views', [('page_path', 1), ('timestamp', -1)]),
+    IndexSpec('page_views', [('timestamp', -1), ('session_id', 1), ('device_type', 1), ('page_path', 1)],
+              reason="Covers the stats $match/$project"),
+    IndexSpec('user_interactions', [('session_id', 1), ('timestamp', -1)]),
+    IndexSpec('conversion_events', [('timestamp', -1)], reason="Conversions in a window"),
+
+    # Users
+    IndexSpec('users', [('email', 1)], unique=True, reason="Login and registration"),
+    IndexSpec('users', [('id', 1)], unique=True, sparse=True),
+
+    # Privacy requests and exports
+    IndexSpec('privacy_requests', [('id', 1)], unique=True),
+    IndexSpec('privacy_requests', [('email', 1)]),
+    IndexSpec('privacy_requests', [('verification_token', 1)], unique=True, sparse=True),
+    IndexSpec('data_exports', [('request_id', 1)], unique=True),
+
+    # Performance metrics and snapshots
+    IndexSpec('performance_metrics', [('timestamp', -1)]),
+    IndexSpec('performance_metrics', [('metric_name', 1), ('timestamp', -1)]),
+    IndexSpec('metrics_snapshots', [('timestamp', 1)], reason="Metrics history window"),
+
+    # Candidates: lookups by id for status changes and interviews
+    IndexSpec('job_applications', [('id', 1)], unique=True, sparse=True),
+    IndexSpec('contact_requests', [('id', 1)], unique=True, sparse=True),
+    IndexSpec('subscriptions', [('id', 1)], unique=True, sparse=True),
+
+    # Keyset pagination: (sort field, _id) so every page is an index range scan
+    IndexSpec('job_applications', [('created_at', -1), ('_id', -1)]),
+    IndexSpec('job_applications', [('status', 1), ('created_at', -1), ('_id', -1)]),
+    IndexSpec('users', [('created_at', -1), ('_id', -1)]),
+    IndexSpec('roi_calculations', [('timestamp', -1), ('_id', -1)]),
+    IndexSpec('demo_requests', [('timestamp', -1), ('_id', -1)]),
+    *[IndexSpec(name, [('created_at', -1), ('_id', -1)]) for name in ['demo_requests', 'roi_reports', 'contact_requests', 'subscriptions']],
+
+    # Proxy fallback (replay worker scans by status, oldest first)
+    *[IndexSpec(name, [('status', 1), ('created_at', 1)]) for name in FALLBACK_COLLECTIONS],
+
+    # Dashboard form idempotency keys (replayed forwards must not be stored twice)
+    *[IndexSpec(name, [('idempotencyKey', 1)], unique=True, sparse=True) for name in DASHBOARD_FORM_COLLECTIONS],
+
+    # GDPR export and deletion by email
+    *[IndexSpec(name, [('email', 1)], sparse=True) for name in EMAIL_LOOKUP_COLLECTIONS],
+
+    # Rollup buckets are read by bucket start; sessions by last activity (analytics_sessions.last_seen_-1 is the
+    # retention TTL index, declared below)
+    *[IndexSpec(name, [('bucket', 1)]) for name in ROLLUP_COLLECTIONS],
+
+    # Retention: one TTL index per policy in retention.py
+    *[IndexSpec(policy.collection, [(policy.field, policy.direction)], expire_after_seconds=policy.expire_after_seconds,
+                after_date_migration=policy.archive, reason=policy.reason or "Retention TTL")
+      for policy in RETENTION_POLICIES],
+]
+
+
+def _query_shapes() -> List[QueryShape]:
+    now = datetime.now(timezone.utc)
+    day_ago = now - timedelta(hours=24)
+    after = keyset_filter('created_at', -1, day_ago, ObjectId())
+    email = 'audit@example.com'
+
+    shapes = [
+        QueryShape('users by email', 'users', {'email': email}),
+        QueryShape('users by id', 'users', {'id': 'u'}),
+        QueryShape('users page', 'users', {}, [('created_at', -1), ('_id', -1)]),
+        QueryShape('chat session by id', 'chat_sessions', {'id': 's'}),
+        QueryShape('chat history', 'chat_messages', {'session_id': 's'}, [('timestamp', 1)]),
+        QueryShape('demo request by id', 'demo_requests', {'id': 'd'}),
+        QueryShape('demo requests by timestamp', 'demo_requests', {}, [('timestamp', -1), ('_id', -1)]),
+        QueryShape('roi calculations page', 'roi_calculations', {}, [('timestamp', -1), ('_id', -1)]),
+        QueryShape('candidate by id', 'job_applications', {'id': 'c'}),
+        QueryShape('candidates next page', 'job_applications', after, [('created_at', -1), ('_id', -1)]),
+        QueryShape('candidates by status', 'job_applications', {'status': 'submitted'}, [('created_at', -1), ('_id', -1)]),
+        QueryShape('privacy request by id', 'privacy_requests', {'id': 'p'}),
+        QueryShape('privacy request verification', 'privacy_requests', {'id': 'p', 'verification_token': 't'}),
+        QueryShape('data export by request', 'data_exports', {'request_id': 'p'}),
+        QueryShape('metrics history', 'metrics_snapshots', {'timestamp': {'$gte': day_ago}}),
+        QueryShape('performance window', 'performance_metrics',
+                   {'metric_name': {'$in': ['page_load_time', 'api_response_time']}, 'timestamp': {'$gte': day_ago}}),
+        QueryShape('page views window', 'page_views', date_range('timestamp', day_ago)),
+        QueryShape('conversions in window', 'conversion_events', date_range('timestamp', day_ago), kind='count'),
+        QueryShape('demo requests in window', 'demo_requests',
+                   {'$or': [date_range('created_at', day_ago), date_range('timestamp', day_ago)]}, kind='count'),
+        QueryShape('active sessions', 'analytics_sessions', {'last_seen': {'$gte': day_ago}}, kind='count'),
+        QueryShape('status checks', 'status_checks', {}, allow_collscan=True),  # Unfiltered debug listing
+    ]
+    for name in FORM_COLLECTIONS:
+        shapes.append(QueryShape(f"{name} page", name, {}, [('created_at', -1), ('_id', -1)]))
+        if name != 'demo_requests':
+            shapes.append(QueryShape(f"{name} in window", name, date_range('created_at', day_ago), kind='count'))
+    for name in set(EMAIL_LOOKUP_COLLECTIONS) | {'demo_requests'}:
+        shapes.append(QueryShape(f"{name} by email", name, {'email': email}))
+    for name in FALLBACK_COLLECTIONS:
+        shapes.append(QueryShape(f"{name} replay scan", name, {'status': 'proxy_failed'}, [('created_at', 1)]))
+    for name in DASHBOARD_FORM_COLLECTIONS:
+        shapes.append(QueryShape(f"{name} idempotency key", name, {'idempotencyKey': 'k'}))
+    for name in ROLLUP_COLLECTIONS:
+        shapes.append(QueryShape(f"{name} buckets", name, {'bucket': {'$gte': day_ago}}))
+    for policy in RETENTION_POLICIES:
+        if policy.archive:
+            shapes.append(QueryShape(f"{policy.collection} archive window", policy.collection,
+                                     {policy.field: {'$gte': day_ago, '$lt': now}}, [(policy.field, 1)]))
+    return shapes
+
+
+QUERY_SHAPES: List[QueryShape] = _query_shapes()
+
+
+async def apply_index_plan(db, plan: Optional[List[IndexSpec]] = None) -> Dict[str, List[str]]:
+    """
+    Create every index in the plan that does not exist yet
+
+    Safe to run on every startup. An index whose name exists with different options (e.g. a
+    plain index that the plan now wants unique) is reported as a conflict rather than dropped,
+    and a unique index that cannot be built because of duplicate data is reported as failed.
+    A changed retention period is applied to the existing TTL index with collMod (updated).
+    An index waiting for its collection's date migration is reported as deferred; apply the
+    plan again once the migration has finished.
+    """
+    results: Dict[str, List[str]] = {'created': [], 'existing': [], 'updated': [], 'deferred': [], 'conflicts': [],
+                                     'failed': []}
+    existing: Dict[str, Dict[str, Any]] = {}
+    for spec in plan or INDEX_PLAN:
+        label = f"{spec.collection}.{spec.name}"
+        if spec.collection not in existing:
+            try:
+                existing[spec.collection] = await db[spec.collection].index_information()
+            except OperationFailure:
+                existing[spec.collection] = {}  # Collection does not exist yet
+        info = existing[spec.collection].get(spec.name)
+        if info is not None:
+            if spec.matches(info) and spec.ttl_differs(info):
+                try:
+                    await db.command('collMod', spec.collection,
+                                     index={'name': spec.name, 'expireAfterSeconds': spec.expire_after_seconds})
+                    results['updated'].append(label)
+                    logger.info(f"TTL of {label} set to {spec.expire_after_seconds}s")
+                except OperationFailure as e:
+                    results['failed'].append(label)
+                    logger.error(f"Could not set TTL of {label}: {str(e)}")
+            elif spec.matches(info):
+                results['existing'].append(label)
+            else:
+                results['conflicts'].append(label)
+                logger.error(f"Index {label} exists with different options; drop it to apply the planned definition")
+            continue
+        if spec.after_date_migration and not await date_migration_completed(db, spec.collection):
+            results['deferred'].append(label)
+            continue
+        try:
+            await db[spec.collection].create_index(spec.keys, **spec.options())
+            results['created'].append(label)
+        except OperationFailure as e:
+            results['failed'].append(label)
+            logger.error(f"Could not create index {label}: {str(e)}")
+    return results
+
+
+def plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """Stage names of every winning plan in an explain() result (find, count, aggregate or sharded)"""
+    stages: List[str] = []
+
+    def walk_plan(plan):
+        plan = plan.get('queryPlan', plan)
+        stages.append(plan.get('stage', '?'))
+        for child in [plan['inputStage']] if 'inputStage' in plan else plan.get('inputStages', []):
+            walk_plan(child)
+
+    def search(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'winningPlan':
+                    walk_plan(value)
+                else:
+                    search(value)
+        elif isinstance(node, list):
+            for item in node:
+                search(item)
+
+    search(explain)
+    return stages
+
+
+async def explain_shape(db, shape: QueryShape) -> Dict[str, Any]:
+    if shape.kind == 'count':
+        command = {'count': shape.collection, 'query': shape.filter}
+    else:
+        command = {'find': shape.collection, 'filter': shape.filter, 'limit': 50}
+        if shape.sort:
+            command['sort'] = dict(shape.sort)
+    explain = await db.command('explain', command, verbosity='queryPlanner')
+    stages = plan_stages(explain)
+    return {
+        'shape': shape.name,
+        'collection': shape.collection,
+        'stages': stages,
+        'collscan': 'COLLSCAN' in stages,
+        'allowed': shape.allow_collscan
+    }
+
+
+async def audit(db, shapes: Optional[List[QueryShape]] = None) -> List[Dict[str, Any]]:
+    """explain() every registered shape"""
+    return [await explain_shape(db, shape) for shape in shapes or QUERY_SHAPES]
+
+
+__all__ = ['INDEX_PLAN', 'IndexSpec', 'QUERY_SHAPES', 'QueryShape', 'apply_index_plan', 'audit', 'plan_stages']
+
+
+def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Explain every request-path query shape and flag collection scans")
+    parser.add_argument("--mongo-url", default=os.getenv("MONGO_URL", "mongodb://localhost:27017/sentratech_index_audit"))
+    parser.add_argument("--no-apply", action="store_true", help="Audit the indexes as they are instead of applying the plan first")
+    args = parser.parse_args()
+
+    db_name = args.mongo_url.rsplit('/', 1)[-1] if args.mongo_url.count('/') > 2 else 'sentratech_index_audit'
+
+    async def run():
+        client = AsyncIOMotorClient(args.mongo_url, tz_aware=True)
+        db = client[db_name]
+        if not args.no_apply:
+            applied = await apply_index_plan(db)
+            print(", ".join(f"{len(names)} {status}" for status, names in applied.items()))
+        results = await audit(db)
+        client.close()
+        return results
+
+    results = asyncio.run(run())
+    failures = 0
+    for result in results:
+        if result['collscan'] and not result['allowed']:
+            flag = "COLLSCAN"
+            failures += 1
+        else:
+            flag = "allowed" if result['collscan'] else "ok"
+        print(f"{flag:<9} {result['shape']:<40} {' <- '.join(result['stages'])}")
+    print(f"{len(results)} shapes, {failures} unexpected collection scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
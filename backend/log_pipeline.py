@@ -0,0 +1,179 @@
+"""
+Queued Structured Logging for SentraTech
+Log calls only enqueue records; formatting and I/O run on a QueueListener thread, with key=value output and per-logger sampling
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("log_pipeline")
+
+# Full submission payloads in logs are for local debugging only (they contain personal data)
+DEBUG_PAYLOADS = os.getenv('LOG_DEBUG_PAYLOADS', 'false').lower() == 'true'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "logger=rate,..." (e.g. proxy_debug=0.1,httpx=0) into a rate per logger name"""
+    rates = {}
+    for item in spec.split(','):
+        name, _, rate = item.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records per logger (longest name prefix wins); warnings always pass"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self.dropped = 0
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + '.'):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.dropped += 1
+        return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only renders the kv fields on the listener thread
+
+    msg % args and the traceback are resolved here, on the calling thread, because args may be
+    objects the caller goes on mutating; the kv dict is copied (shallowly) for the same reason.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        kv = getattr(record, 'kv', None)
+        if kv:
+            record.kv = dict(kv)
+        return record
+
+
+class KeyValueFormatter(logging.Formatter):
+    """ts=... level=... logger=... msg="..." key=value ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [
+            f"ts={self.formatTime(record)}",
+            f"level={record.levelname}",
+            f"logger={record.name}",
+        ]
+        event = getattr(record, 'event', None)
+        if event:
+            parts.append(f"event={event}")
+        message = record.getMessage()
+        if message and message != event:
+            parts.append(f"msg={_quote(message)}")
+        for key, value in (getattr(record, 'kv', None) or {}).items():
+            parts.append(f"{key}={_format_value(value)}")
+        exc_text = self.formatException(record.exc_info) if record.exc_info else record.exc_text
+        if exc_text:
+            parts.append(f"exc={_quote(exc_text)}")
+        return ' '.join(parts)
+
+
+_exception_formatter = logging.Formatter()
+
+
+def _quote(value: str) -> str:
+    if value and not any(c in value for c in ' "=\n'):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, (dict, list, tuple)):
+        return _quote(json.dumps(value, ensure_ascii=False, default=str))
+    return _quote(str(value))
+
+
+def log_event(log: logging.Logger, level: int, event: str, **fields: Any):
+    """Structured record; fields are formatted on the listener thread, and not at all when the level is off"""
+    if log.isEnabledFor(level):
+        log.log(level, event, extra={'event': event, 'kv': fields})
+
+
+def payload_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields describing a submission: the payload itself in debug-payload mode, otherwise only its shape"""
+    if DEBUG_PAYLOADS:
+        return {'payload': dict(data)}
+    return {'field_count': len(data)}
+
+
+def setup_logging(level: int = logging.INFO, log_format: Optional[str] = None,
+                  sample_rates: Optional[Dict[str, float]] = None) -> SamplingFilter:
+    """
+    Move the root handlers behind a queue; returns the sampling filter for stats
+
+    LOG_FORMAT=kv (default) or text; LOG_SAMPLE_RATES="logger=rate,..." samples INFO/DEBUG records.
+    Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    if _listener is not None:
+        return _queue_handler.filters[0]
+
+    logging.basicConfig(level=level)
+    log_format = log_format or os.getenv('LOG_FORMAT', 'kv')
+    formatter = KeyValueFormatter() if log_format == 'kv' else logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    handlers = list(root.handlers)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+        root.removeHandler(handler)
+
+    sampling = SamplingFilter(sample_rates if sample_rates is not None else parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', '')))
+    log_queue: queue.Queue = queue.Queue(-1)
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _queue_handler.addFilter(sampling)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return sampling
+
+
+def stop_logging():
+    """Drain the queue, stop the listener thread and log synchronously again (shutdown / atexit)"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            root.addHandler(handler)
+        _listener = None
+        _queue_handler = None
+
+
+__all__ = ['DEBUG_PAYLOADS', 'KeyValueFormatter', 'SamplingFilter', 'log_event', 'payload_fields',
+           'setup_logging', 'stop_logging']
@@ -0,0 +1,143 @@
+"""
+Keyset Pagination for SentraTech
+Cursor-based pages ordered by (sort field, _id) with opaque continuation tokens; fetches limit+1 rows instead of counting
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from bson import ObjectId
+
+logger = logging.getLogger("pagination")
+
+DEFAULT_MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    """Continuation token that is malformed or belongs to a different ordering"""
+
+
+def _encode_value(value: Any) -> List[Any]:
+    """Tag a sort key with its type so it round-trips through JSON unchanged"""
+    if value is None:
+        return ['n', None]
+    if isinstance(value, ObjectId):
+        return ['o', str(value)]
+    if isinstance(value, datetime):
+        return ['d', value.isoformat()]
+    if isinstance(value, bool):
+        return ['b', value]
+    if isinstance(value, (int, float)):
+        return ['i', value]
+    return ['s', str(value)]
+
+
+def _decode_value(tagged: Any) -> Any:
+    tag, value = tagged
+    if tag == 'n':
+        return None
+    if tag == 'o':
+        return ObjectId(value)
+    if tag == 'd':
+        return datetime.fromisoformat(value)
+    if tag in ('b', 'i', 's'):
+        return value
+    raise InvalidCursor(f"Unknown cursor value type {tag!r}")
+
+
+def encode_cursor(sort_field: str, direction: int, value: Any, doc_id: Any) -> str:
+    """Opaque token for the position just after a document"""
+    raw = json.dumps([sort_field, direction, _encode_value(value), _encode_value(doc_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str, sort_field: str, direction: int) -> Tuple[Any, Any]:
+    """(sort value, _id) of the last document of the previous page"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        field, token_direction, value, doc_id = json.loads(raw)
+        if field != sort_field or token_direction != direction:
+            raise InvalidCursor("Cursor was issued for a different ordering")
+        return _decode_value(value), _decode_value(doc_id)
+    except InvalidCursor:
+        raise
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {str(e)}")
+
+
+def keyset_filter(sort_field: str, direction: int, value: Any, doc_id: Any) -> Dict[str, Any]:
+    """Documents strictly after (value, doc_id) in (sort_field, _id) order"""
+    op = '$lt' if direction < 0 else '$gt'
+    if value is None:
+        # Documents without the sort field sort as null: last when descending, first when ascending
+        if direction < 0:
+            return {sort_field: None, '_id': {op: doc_id}}
+        return {'$or': [{sort_field: None, '_id': {op: doc_id}}, {sort_field: {'$ne': None}}]}
+
+    branches = [{sort_field: {op: value}}, {sort_field: value, '_id': {op: doc_id}}]
+    if direction < 0:
+        branches.append({sort_field: None})
+        if isinstance(value, datetime):
+            # Legacy ISO-string timestamps sort below every BSON date (see bson_dates)
+            branches.append({sort_field: {'$type': 'string'}})
+    elif isinstance(value, str):
+        branches.append({sort_field: {'$type': 'date'}})
+    return {'$or': branches}
+
+
+async def paginate(collection, query: Dict[str, Any], sort_field: str, direction: int = -1, limit: int = 50,
+                   cursor: Optional[str] = None, include_total: bool = False,
+                   projection: Optional[Dict[str, Any]] = None, max_limit: int = DEFAULT_MAX_LIMIT,
+                   pipeline: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    One page of a collection in (sort_field, _id) order
+
+    Needs a compound index on (sort_field, _id) (plus any equality filter fields first) so each
+    page is an index range scan, however deep. The exact total is a separate count and only
+    runs when include_total is set.
+
+    With pipeline, the page is read with aggregate() instead of find() and those stages run on
+    the limit+1 sorted documents (e.g. a $project computing array sizes); they must keep
+    sort_field and _id.
+    """
+    limit = max(1, min(limit, max_limit))
+    find_filter = query
+    if cursor:
+        after = keyset_filter(sort_field, direction, *decode_cursor(cursor, sort_field, direction))
+        find_filter = {'$and': [query, after]} if query else after
+
+    if projection and any(projection.values()):
+        # The next cursor is built from the sort key, so an inclusion projection must keep it
+        projection = {**projection, sort_field: 1, '_id': 1}
+
+    if pipeline is not None:
+        documents = await collection.aggregate([
+            {'$match': find_filter},
+            {'$sort': {sort_field: direction, '_id': direction}},
+            {'$limit': limit + 1},
+            *pipeline
+        ]).to_list(length=limit + 1)
+    else:
+        documents = await collection.find(find_filter, projection).sort(
+            [(sort_field, direction), ('_id', direction)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = None
+    if has_more:
+        last = documents[-1]
+        next_cursor = encode_cursor(sort_field, direction, last.get(sort_field), last['_id'])
+
+    return {
+        'items': documents,
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+        'total': await collection.count_documents(query) if include_total else None
+    }
+
+
+__all__ = ['InvalidCursor', 'encode_cursor', 'decode_cursor', 'keyset_filter', 'paginate']
@@ -0,0 +1,97 @@
+"""
+Sparse Fieldsets for SentraTech
+Turns a ?fields= query parameter into a Mongo projection, falling back to a per-endpoint default that leaves out unbounded arrays
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger("projections")
+
+MAX_FIELDS = 50
+FIELD_NAME = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+# Default projections for the /api/forms/* lists; the dashboard drawers show the whole record,
+# so only fields that grow without bound (appended on every status change or email) are left out
+DEFAULT_PROJECTIONS: Dict[str, Optional[Dict[str, int]]] = {
+    'demo_requests': None,
+    'roi_reports': None,
+    'contact_requests': None,
+    'subscriptions': None,
+    'job_applications': {'candidate_interactions': 0, 'email_notifications': 0},
+}
+
+
+def _value(field: str, default: Any = None) -> Dict[str, Any]:
+    # $ifNull keeps missing fields in the output as null, like dict.get()
+    return {'$ifNull': [f"${field}", default]}
+
+
+def _length(field: str) -> Dict[str, Any]:
+    return {'$cond': [{'$isArray': f"${field}"}, {'$size': f"${field}"}, 0]}
+
+
+# /api/candidates summary, computed server-side so the interaction and notification arrays never leave Mongo
+CANDIDATE_SUMMARY_FIELDS: Dict[str, Any] = {
+    'id': _value('id'),
+    'name': {'$ifNull': ['$full_name', {'$concat': [{'$ifNull': ['$first_name', '']}, ' ', {'$ifNull': ['$last_name', '']}]}]},
+    'email': _value('email'),
+    'phone': _value('phone'),
+    'location': _value('location'),
+    'position': {'$ifNull': ['$position_applied', _value('position', 'Customer Support Specialist')]},
+    'status': _value('status', 'received'),
+    'experience_years': _value('experience_years'),
+    'created_at': _value('created_at'),
+    'last_updated': _value('last_updated'),
+    'has_interview': {'$and': ['$interview_event']},
+    'interview_date': _value('interview_event.interview_datetime'),
+    'email_notifications_count': _length('email_notifications'),
+    'interactions_count': _length('candidate_interactions'),
+}
+
+
+class InvalidFields(ValueError):
+    """?fields= value that is malformed or names a field the endpoint does not offer"""
+
+
+def parse_fields(fields: Optional[str], allowed: Optional[Iterable[str]] = None) -> Optional[List[str]]:
+    """Field names from a comma-separated ?fields= value; None when the parameter is absent or empty"""
+    if not fields or not fields.strip():
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(',') if name.strip()))
+    if len(names) > MAX_FIELDS:
+        raise InvalidFields(f"At most {MAX_FIELDS} fields can be requested")
+    for name in names:
+        if not FIELD_NAME.match(name):
+            raise InvalidFields(f"Invalid field name {name!r}")
+    if allowed is not None:
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def find_projection(fields: Optional[str], collection_name: str) -> Optional[Dict[str, int]]:
+    """find() projection: the requested fields, or the collection's default"""
+    names = parse_fields(fields)
+    if names is None:
+        default = DEFAULT_PROJECTIONS.get(collection_name)
+        return dict(default) if default else None  # A copy; the shared default must not be modified
+    return {name: 1 for name in names}
+
+
+def computed_projection(names: List[str], expressions: Dict[str, Any], keep: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    $project stage computing the named output fields from their expressions
+
+    Fields in keep are always projected (a keyset cursor needs its sort key), so callers
+    build their response from the requested names only.
+    """
+    stage = {name: expressions[name] for name in names}
+    for name in keep:
+        stage.setdefault(name, f"${name}")
+    return {'$project': stage}
+
+
+__all__ = ['CANDIDATE_SUMMARY_FIELDS', 'DEFAULT_PROJECTIONS', 'InvalidFields', 'computed_projection',
+           'find_projection', 'parse_fields']
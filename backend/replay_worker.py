@@ -0,0 +1,412 @@
+"""
+Submission Replay Worker for SentraTech
+Drains failed dashboard forwards (pending submission files and Mongo fallback collections) back to the dashboard
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from concurrency_limiter import LimitExceeded
+from bson_dates import as_datetime
+from dashboard_client import DashboardClient, RetryPolicy
+from submission_wal import SubmissionWAL
+
+logger = logging.getLogger("replay_worker")
+
+# build_request(payload) -> (url, headers) for the dashboard call
+BuildRequest = Callable[[Dict[str, Any]], Tuple[str, Dict[str, str]]]
+
+# Bookkeeping fields added when a submission was parked; never sent upstream
+FALLBACK_FIELDS = ('_id', 'status', 'proxy_error', 'created_at', 'replay_attempts', 'replay_error', 'replayed_at',
+                   'next_attempt_at', 'idempotency_key')
+
+
+def retry_delay(attempts: int, base_seconds: float, max_seconds: float) -> float:
+    """Seconds until the next attempt after the given number of failures (exponential, capped)"""
+    return min(base_seconds * 2 ** min(attempts - 1, 16), max_seconds)
+
+
+class ReplayItem:
+    """One parked submission waiting to be redelivered"""
+
+    def __init__(self, source: 'ReplaySource', key: str, payload: Dict[str, Any], ref: Any,
+                 parked_at: Optional[datetime] = None):
+        self.source = source
+        self.key = key  # Idempotency key, stable across restarts
+        self.payload = payload
+        self.ref = ref  # File path, (segment id, offset) or Mongo document id
+        self.parked_at = parked_at  # When the forward failed, if the source records it
+
+
+class ReplaySource:
+    """Base class for places where undelivered submissions are parked"""
+
+    name = "source"
+
+    def __init__(self, build_request: BuildRequest):
+        self.build_request = build_request
+
+    async def scan(self, limit: int) -> List[ReplayItem]:
+        raise NotImplementedError
+
+    async def mark_delivered(self, item: ReplayItem):
+        raise NotImplementedError
+
+    async def mark_rejected(self, item: ReplayItem, error: str):
+        raise NotImplementedError
+
+    async def record_failure(self, item: ReplayItem, error: str):
+        """Transient failure; sources that track backoff or give up by age override this"""
+
+    async def backlog_size(self) -> int:
+        raise NotImplementedError
+
+
+class PendingFileSource(ReplaySource):
+    """JSON files written by /api/collect before the submission WAL (drained, no longer written)"""
+
+    name = "pending_files"
+
+    def __init__(self, directory: str, build_request: BuildRequest):
+        super().__init__(build_request)
+        self.directory = directory
+        self.rejected_directory = os.path.join(directory, 'rejected')
+
+    def _list_files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        # File names start with the epoch millis, so a name sort replays oldest first
+        return sorted(entry.name for entry in os.scandir(self.directory)
+                      if entry.is_file() and entry.name.endswith('.json'))
+
+    def _read_items(self, limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+        items = []
+        for name in self._list_files()[:limit]:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    items.append((path, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable pending submission {path}: {str(e)}")
+        return items
+
+    async def scan(self, limit: int) -> List[ReplayItem]:
+        items = []
+        for path, record in await asyncio.to_thread(self._read_items, limit):
+            payload = record.get('payload', {})
+            key = payload.get('trace_id') or os.path.splitext(os.path.basename(path))[0]
+            items.append(ReplayItem(self, key, payload, path))
+        return items
+
+    async def mark_delivered(self, item: ReplayItem):
+        try:
+            await asyncio.to_thread(os.remove, item.ref)
+        except FileNotFoundError:
+            pass
+
+    async def mark_rejected(self, item: ReplayItem, error: str):
+        # Move poison payloads aside so they are kept for inspection but not retried forever
+        def move():
+            os.makedirs(self.rejected_directory, exist_ok=True)
+            os.replace(item.ref, os.path.join(self.rejected_directory, os.path.basename(item.ref)))
+        await asyncio.to_thread(move)
+
+    async def backlog_size(self) -> int:
+        return len(await asyncio.to_thread(self._list_files))
+
+
+class WalSource(ReplaySource):
+    """
+    Segmented write-ahead log written by /api/collect when the dashboard forward failed
+
+    Backoff works as in FallbackCollectionSource, but the state lives in memory keyed by
+    (segment id, offset) and starts over after a restart. scan passes over records that are
+    still backing off, so failing records at the head of the log don't hold back newer ones.
+    A record still failing max_age_hours after its parked_at (or after its first failure in
+    this process, for records written before parked_at) goes to rejected.jsonl.
+    """
+
+    name = "submission_wal"
+
+    def __init__(self, wal: SubmissionWAL, build_request: BuildRequest, max_age_hours: Optional[float] = None,
+                 retry_base_seconds: float = 60, retry_max_seconds: float = 3600):
+        super().__init__(build_request)
+        self.wal = wal
+        self.max_age = timedelta(hours=max_age_hours or float(os.getenv('REPLAY_MAX_AGE_HOURS', '72')))
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.backoff: Dict[Tuple[int, int], Dict[str, Any]] = {}  # (segment id, offset) -> attempts, parked_at, next_attempt_at
+
+    def _backing_off(self, segment_id: int, offset: int) -> bool:
+        state = self.backoff.get((segment_id, offset))
+        return state is not None and state['next_attempt_at'] > time.time()
+
+    async def scan(self, limit: int) -> List[ReplayItem]:
+        items = []
+        for segment_id, offset, record in await asyncio.to_thread(self.wal.scan, limit, self._backing_off):
+            payload = record.get('payload', {})
+            key = payload.get('trace_id') or f"wal-{segment_id}-{offset}"
+            items.append(ReplayItem(self, key, payload, (segment_id, offset), as_datetime(record.get('parked_at'))))
+        return items
+
+    async def mark_delivered(self, item: ReplayItem):
+        self.backoff.pop(item.ref, None)
+        await asyncio.to_thread(self.wal.mark_replayed, *item.ref)
+
+    async def mark_rejected(self, item: ReplayItem, error: str):
+        self.backoff.pop(item.ref, None)
+        await asyncio.to_thread(self.wal.mark_rejected, *item.ref, {'payload': item.payload}, error)
+
+    async def record_failure(self, item: ReplayItem, error: str):
+        """Schedule the next attempt; give up once the record is older than max_age"""
+        now = datetime.now(timezone.utc)
+        state = self.backoff.setdefault(item.ref, {'attempts': 0, 'parked_at': item.parked_at or now})
+        if now - state['parked_at'] > self.max_age:
+            await self.mark_rejected(item, error)
+            return
+        state['attempts'] += 1
+        state['next_attempt_at'] = time.time() + retry_delay(state['attempts'], self.retry_base_seconds, self.retry_max_seconds)
+
+    async def backlog_size(self) -> int:
+        return self.wal.pending
+
+
+class FallbackCollectionSource(ReplaySource):
+    """
+    Mongo fallback collection written by the /api/proxy/* handlers (status: proxy_failed)
+
+    A failed document is not retried before its next_attempt_at (exponential backoff from
+    retry_base_seconds up to retry_max_seconds). Give-up is by age, not attempt count: a
+    document still failing max_age_hours after it was parked is marked replay_rejected, so a
+    dashboard outage shorter than that never loses submissions.
+    """
+
+    def __init__(self, collection, build_request: BuildRequest, max_age_hours: Optional[float] = None,
+                 retry_base_seconds: float = 60, retry_max_seconds: float = 3600):
+        super().__init__(build_request)
+        self.collection = collection
+        self.name = collection.name
+        self.max_age = timedelta(hours=max_age_hours or float(os.getenv('REPLAY_MAX_AGE_HOURS', '72')))
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+
+    async def scan(self, limit: int) -> List[ReplayItem]:
+        # $not/$gt also matches documents that have never failed (no next_attempt_at)
+        query = {'status': 'proxy_failed', 'next_attempt_at': {'$not': {'$gt': datetime.now(timezone.utc)}}}
+        cursor = self.collection.find(query).sort('created_at', 1).limit(limit)
+        items = []
+        async for doc in cursor:
+            payload = {k: v for k, v in doc.items() if k not in FALLBACK_FIELDS}
+            # Same key as the failed forward, so a copy the dashboard already stored is not stored again
+            key = doc.get('idempotency_key') or str(doc['_id'])
+            items.append(ReplayItem(self, key, payload, doc['_id']))
+        return items
+
+    async def mark_delivered(self, item: ReplayItem):
+        await self.collection.update_one(
+            {'_id': item.ref},
+            {'$set': {'status': 'replayed', 'replayed_at': datetime.now(timezone.utc)}}
+        )
+
+    async def mark_rejected(self, item: ReplayItem, error: str):
+        await self.collection.update_one(
+            {'_id': item.ref},
+            {'$set': {'status': 'replay_rejected', 'replay_error': error[:2048]}}
+        )
+
+    async def record_failure(self, item: ReplayItem, error: str):
+        """Record a transient failure and schedule the next attempt; give up once the document is older than max_age"""
+        doc = await self.collection.find_one_and_update(
+            {'_id': item.ref},
+            {'$inc': {'replay_attempts': 1}, '$set': {'replay_error': error[:2048]}},
+            projection={'replay_attempts': 1, 'created_at': 1},
+            return_document=True
+        )
+        if not doc:
+            return
+        now = datetime.now(timezone.utc)
+        created_at = as_datetime(doc.get('created_at'))
+        if created_at is not None and now - created_at > self.max_age:
+            await self.mark_rejected(item, error)
+            return
+        delay = retry_delay(doc.get('replay_attempts', 1), self.retry_base_seconds, self.retry_max_seconds)
+        await self.collection.update_one({'_id': item.ref}, {'$set': {'next_attempt_at': now + timedelta(seconds=delay)}})
+
+    async def backlog_size(self) -> int:
+        return await self.collection.count_documents({'status': 'proxy_failed'})
+
+
+class SubmissionReconciler:
+    """Background worker that replays parked submissions with bounded concurrency"""
+
+    def __init__(self, sources: List[ReplaySource], ledger, client: DashboardClient,
+                 batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                 interval_seconds: Optional[float] = None, max_interval_seconds: Optional[float] = None):
+        self.sources = sources
+        self.ledger = ledger  # Mongo collection of delivered idempotency keys
+        self.client = client
+        self.batch_size = batch_size or int(os.getenv('REPLAY_BATCH_SIZE', '100'))
+        self.concurrency = concurrency or int(os.getenv('REPLAY_CONCURRENCY', '5'))
+        self.interval = interval_seconds or float(os.getenv('REPLAY_INTERVAL_SECONDS', '60'))
+        # Upper bound of the idle backoff while nothing gets delivered (dashboard outage)
+        self.max_interval = max_interval_seconds or float(os.getenv('REPLAY_MAX_INTERVAL_SECONDS', '900'))
+        # Replays already sit behind the worker interval, so keep per-item retries short
+        self.retry_policy = RetryPolicy(max_attempts=2, backoff_ms=1000)
+
+        self._task: Optional[asyncio.Task] = None
+        self._delivered_at: deque = deque(maxlen=10000)
+
+        # Replay statistics
+        self.runs = 0
+        self.delivered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shed = 0
+        self.last_run_at: Optional[str] = None
+        self.last_run_ms = 0.0
+        self.idle_runs = 0
+
+    async def _already_delivered(self, key: str) -> bool:
+        return await self.ledger.find_one({'_id': key}, {'_id': 1}) is not None
+
+    async def _record_delivery(self, item: ReplayItem):
+        # Ledger first: if we crash before cleaning up the source, the next run skips the resend
+        await self.ledger.update_one(
+            {'_id': item.key},
+            {'$setOnInsert': {'source': item.source.name, 'delivered_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        await item.source.mark_delivered(item)
+        self.delivered += 1
+        self._delivered_at.append(time.time())
+
+    async def _replay_item(self, item: ReplayItem, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                if await self._already_delivered(item.key):
+                    await item.source.mark_delivered(item)
+                    return
+
+                url, headers = item.source.build_request(item.payload)
+                response = await self.client.post(
+                    url, json=item.payload, headers=headers,
+                    idempotency_key=item.key, retry_policy=self.retry_policy
+                )
+
+                if response.is_success or response.status_code == 409:  # 409: dashboard already has it
+                    await self._record_delivery(item)
+                elif not self.retry_policy.should_retry_status(response.status_code):
+                    logger.warning(f"Dashboard rejected replay {item.key} from {item.source.name}: {response.status_code}")
+                    self.rejected += 1
+                    await item.source.mark_rejected(item, f"{response.status_code}: {response.text}")
+                else:
+                    await self._record_failure(item, f"Dashboard returned {response.status_code}")
+            except LimitExceeded:
+                self.shed += 1  # Live traffic has priority; the item stays parked for the next run
+            except Exception as e:
+                await self._record_failure(item, str(e))
+
+    async def _record_failure(self, item: ReplayItem, error: str):
+        self.failed += 1
+        logger.warning(f"Replay of {item.key} from {item.source.name} failed: {error}")
+        try:
+            await item.source.record_failure(item, error)
+        except Exception as e:
+            logger.error(f"Could not record replay failure for {item.key}: {str(e)}")
+
+    async def run_once(self) -> int:
+        """Replay one batch from every source; returns the number of items attempted"""
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        attempted = 0
+
+        for source in self.sources:
+            try:
+                items = await source.scan(self.batch_size)
+            except Exception as e:
+                logger.error(f"Replay scan failed for {source.name}: {str(e)}")
+                continue
+            attempted += len(items)
+            await asyncio.gather(*[self._replay_item(item, semaphore) for item in items])
+
+        self.runs += 1
+        self.last_run_at = datetime.now(timezone.utc).isoformat()
+        self.last_run_ms = round((time.time() - start_time) * 1000, 2)
+        if attempted:
+            logger.info(f"Replay run attempted {attempted} submissions in {self.last_run_ms}ms")
+        return attempted
+
+    def next_delay(self) -> float:
+        """Interval after a pass that delivered nothing, doubling per such pass up to max_interval"""
+        return min(self.interval * 2 ** min(self.idle_runs, 16), self.max_interval)
+
+    async def run_forever(self):
+        """Replay loop; goes again right away only while full batches are being delivered"""
+        while True:
+            try:
+                delivered_before = self.delivered
+                attempted = await self.run_once()
+                if self.delivered > delivered_before:
+                    self.idle_runs = 0
+                    if attempted >= self.batch_size:
+                        continue
+                elif attempted:
+                    # Nothing got through (outage, or shed by the limiter): back off instead of spinning
+                    self.idle_runs += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Replay run failed: {str(e)}")
+            await asyncio.sleep(self.next_delay())
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def drain_rate_per_minute(self, window_seconds: int = 300) -> float:
+        """Delivered submissions per minute over the trailing window"""
+        cutoff = time.time() - window_seconds
+        recent = sum(1 for delivered_at in self._delivered_at if delivered_at >= cutoff)
+        return round(recent * 60 / window_seconds, 2)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Get replay backlog and throughput statistics"""
+        backlog = {}
+        for source in self.sources:
+            try:
+                backlog[source.name] = await source.backlog_size()
+            except Exception as e:
+                backlog[source.name] = None
+                logger.error(f"Backlog size unavailable for {source.name}: {str(e)}")
+
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'backlog': backlog,
+            'backlog_total': sum(size for size in backlog.values() if size),
+            'drain_rate_per_minute': self.drain_rate_per_minute(),
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'shed': self.shed,
+            'runs': self.runs,
+            'last_run_at': self.last_run_at,
+            'last_run_ms': self.last_run_ms,
+            'batch_size': self.batch_size,
+            'concurrency': self.concurrency,
+            'interval_seconds': self.interval,
+            'next_interval_seconds': self.next_delay()
+        }
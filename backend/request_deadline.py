@@ -0,0 +1,144 @@
+"""
+Per-Request Deadlines for SentraTech
+Carries the caller's time budget in a contextvar so every downstream timeout and retry sleep is capped by it
+
+The last part of every budget (DEADLINE_FALLBACK_RESERVE_MS, at most a quarter of it) is kept
+back from downstream calls, so a handler whose upstream timed out still has time to persist
+its fallback before the middleware cancels it.
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+import httpx
+import logging
+
+logger = logging.getLogger("request_deadline")
+
+# Absolute deadline (time.monotonic()) of the request being served, if it has one
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# Seconds at the end of the budget that downstream calls may not use
+_reserve: ContextVar[float] = ContextVar("request_deadline_reserve", default=0.0)
+
+FALLBACK_RESERVE = int(os.getenv('DEADLINE_FALLBACK_RESERVE_MS', '1000')) / 1000  # Convert to seconds
+MAX_RESERVE_FRACTION = 0.25
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The request budget ran out before a downstream call could start
+
+    Subclasses httpx.TimeoutException so existing timeout handling (fallbacks, 504s) applies unchanged
+    """
+
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message)
+
+
+def remaining() -> Optional[float]:
+    """Seconds downstream calls may still use (the budget minus the fallback reserve), or None when there is no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - _reserve.get() - time.monotonic()
+
+
+def cap_timeout(timeout: float) -> float:
+    """Shrink a downstream timeout to what is left before the fallback reserve; raises once that is spent"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(timeout, left)
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Run a block under a budget, tightening (never extending) any deadline already set"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    reserve_token = _reserve.set(max(_reserve.get(), min(FALLBACK_RESERVE, seconds * MAX_RESERVE_FRACTION)))
+    try:
+        yield
+    finally:
+        _reserve.reset(reserve_token)
+        _deadline.reset(token)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware that gives HTTP requests a budget and cancels them with 504 once it is spent
+
+    Downstream calls stop at the fallback reserve, before the cancel; writes that must not be
+    interrupted by it (fallback persistence) are run under asyncio.shield by their callers.
+
+    The budget is the X-Request-Deadline-Ms header (capped at max_ms) or the longest
+    matching route prefix in route_budgets_ms; the smaller wins when both apply.
+    Requests with neither run without a deadline, as before.
+    """
+
+    def __init__(self, app, route_budgets_ms: Optional[Dict[str, int]] = None, max_ms: Optional[int] = None):
+        self.app = app
+        # Longest prefix first so "/api/proxy/status" can override "/api/proxy/"
+        self.route_budgets = sorted((route_budgets_ms or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.max_ms = max_ms or int(os.getenv('REQUEST_DEADLINE_MAX_MS', '60000'))
+
+        # Deadline statistics
+        self.requests_with_deadline = 0
+        self.deadline_exceeded = 0
+
+    def budget_ms(self, scope) -> Optional[int]:
+        route_budget = next((budget for prefix, budget in self.route_budgets if scope["path"].startswith(prefix)), None)
+
+        header_budget = None
+        for name, value in scope.get("headers", []):
+            if name == DEADLINE_HEADER.encode():
+                try:
+                    header_budget = min(int(value), self.max_ms)
+                except ValueError:
+                    logger.warning(f"Ignoring invalid {DEADLINE_HEADER} header: {value!r}")
+                break
+
+        budgets = [budget for budget in (route_budget, header_budget) if budget is not None]
+        return min(budgets) if budgets else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget_ms = self.budget_ms(scope)
+        if budget_ms is None:
+            return await self.app(scope, receive, send)
+
+        self.requests_with_deadline += 1
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with deadline_scope(budget_ms / 1000):
+            try:
+                await asyncio.wait_for(self.app(scope, receive, send_wrapper), timeout=budget_ms / 1000)
+            except asyncio.TimeoutError:
+                self.deadline_exceeded += 1
+                logger.warning(f"Request deadline of {budget_ms}ms exceeded: {scope['method']} {scope['path']}")
+                if not response_started:
+                    body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+                    await send({
+                        "type": "http.response.start",
+                        "status": 504,
+                        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                    })
+                    await send({"type": "http.response.body", "body": body})
+
+
+__all__ = ['DeadlineExceeded', 'DeadlineMiddleware', 'cap_timeout', 'deadline_scope', 'remaining']
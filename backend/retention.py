@@ -0,0 +1,232 @@
+"""
+Data Retention for SentraTech
+Per-collection retention periods enforced by TTL indexes, with an optional archive of documents to gzipped NDJSON before they expire
+
+The policies below are the one place retention is configured; index_plan.py turns each into a
+TTL index (expireAfterSeconds is updated in place with collMod when a period changes). Mongo's
+TTL monitor deletes documents whose date field is older than the period, checking about once a
+minute. Only BSON dates expire, so documents still holding ISO strings are kept until the date
+migration converts them. For archived collections both the TTL index and the archiver wait for
+that migration to complete, so no converted document can land below the archive watermark
+after it has passed; the server also runs an archive pass before applying the index plan, as
+a new TTL index removes documents already past retention at once. metrics_snapshots and
+performance_metrics are time-series collections whose retention lives in time_series.py.
+
+Archiving runs ahead of expiry: every RETENTION_ARCHIVE_INTERVAL_S the archiver writes documents
+within RETENTION_ARCHIVE_LEAD_HOURS of expiring to <RETENTION_ARCHIVE_DIR>/<collection>/ as
+extended-JSON lines (restorable with mongoimport) and advances a watermark in
+schema_migrations. If it stays down for longer than the lead, the TTL monitor deletes those
+documents unarchived. A crash between writing a file and saving the watermark archives that
+window twice.
+
+Run one archive pass from the shell:
+    python retention.py --archive-dir /var/backups/sentratech
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from bson import json_util
+
+from bson_dates import date_migration_completed, utc_now
+
+logger = logging.getLogger("retention")
+
+
+class RetentionPolicy:
+    """Documents in a collection expire a number of days after a date field"""
+
+    def __init__(self, collection: str, field: str, days: int, direction: int = 1, archive: bool = False,
+                 reason: str = ""):
+        self.collection = collection
+        self.field = field
+        self.days = days
+        self.direction = direction  # Matches an existing single-field index on the field, if there is one
+        self.archive = archive
+        self.reason = reason
+
+    @property
+    def expire_after_seconds(self) -> int:
+        return self.days * 86400
+
+
+RETENTION_POLICIES: List[RetentionPolicy] = [
+    RetentionPolicy('page_views', 'timestamp', int(os.getenv('PAGE_VIEWS_RETENTION_DAYS', '180')), direction=-1,
+                    reason="Totals older than this are served from the analytics rollups"),
+    RetentionPolicy('user_interactions', 'timestamp', int(os.getenv('USER_INTERACTIONS_RETENTION_DAYS', '90'))),
+    RetentionPolicy('chat_messages', 'timestamp', int(os.getenv('CHAT_MESSAGES_RETENTION_DAYS', '365'))),
+    RetentionPolicy('analytics_sessions', 'last_seen', int(os.getenv('ANALYTICS_SESSIONS_RETENTION_DAYS', '45')), direction=-1,
+                    reason="Unique-session counts look back at most 30 days"),
+    RetentionPolicy('audit_log', 'timestamp', int(os.getenv('AUDIT_LOG_RETENTION_DAYS', '730')), archive=True,
+                    reason="Archived before expiry so the deletion trail outlives the database copy"),
+    RetentionPolicy('replay_ledger', 'delivered_at', int(os.getenv('REPLAY_LEDGER_RETENTION_DAYS', '30')),
+                    reason="Outlives REPLAY_MAX_AGE_HOURS, after which parked submissions are no longer replayed"),
+    # expires_at is the expiry itself; download_data_export still checks it, as the TTL monitor can lag
+    RetentionPolicy('data_exports', 'expires_at', 0, reason="Exports expire 30 days after preparation"),
+]
+
+
+class RetentionArchiver:
+    """Writes documents that are about to expire to gzipped NDJSON files"""
+
+    def __init__(self, db, policies: Optional[List[RetentionPolicy]] = None, archive_dir: Optional[str] = None,
+                 lead_hours: Optional[float] = None, interval_s: Optional[int] = None, batch_size: Optional[int] = None):
+        self.db = db
+        self.policies = [policy for policy in policies or RETENTION_POLICIES if policy.archive]
+        self.archive_dir = archive_dir if archive_dir is not None else os.getenv('RETENTION_ARCHIVE_DIR', '')
+        self.lead = timedelta(hours=lead_hours or float(os.getenv('RETENTION_ARCHIVE_LEAD_HOURS', '72')))
+        self.interval = interval_s or int(os.getenv('RETENTION_ARCHIVE_INTERVAL_S', '3600'))
+        self.batch_size = batch_size or int(os.getenv('RETENTION_ARCHIVE_BATCH', '1000'))
+        self.progress = db.schema_migrations
+        self._task: Optional[asyncio.Task] = None
+
+        # Archive statistics
+        self.runs = 0
+        self.files_written = 0
+        self.documents_archived = 0
+        self.bytes_written = 0
+        self.last_run_at: Optional[str] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.archive_dir) and bool(self.policies)
+
+    def cutoff(self, policy: RetentionPolicy) -> datetime:
+        """Documents dated before this expire within the lead, so they are archived now"""
+        return utc_now() - timedelta(seconds=policy.expire_after_seconds) + self.lead
+
+    async def archive_collection(self, policy: RetentionPolicy):
+        if not await date_migration_completed(self.db, policy.collection):
+            # Its TTL index is deferred too, so nothing expires in the meantime
+            logger.info(f"Archiving {policy.collection} waits for its date migration")
+            return
+        progress_id = f"retention_archive:{policy.collection}"
+        state = await self.progress.find_one({'_id': progress_id}) or {}
+        since: Optional[datetime] = state.get('archived_until')
+        until = self.cutoff(policy)
+        if since is not None and since >= until:
+            return
+
+        window = {'$lt': until} if since is None else {'$gte': since, '$lt': until}
+        cursor = self.db[policy.collection].find({policy.field: window}).sort(policy.field, 1)
+
+        directory = os.path.join(self.archive_dir, policy.collection)
+        started = f"{since:%Y%m%dT%H%M%S}" if since is not None else "start"
+        path = os.path.join(directory, f"{policy.collection}-{started}-{until:%Y%m%dT%H%M%S}.ndjson.gz")
+        handle = None
+        count = 0
+        try:
+            while True:
+                documents = await cursor.to_list(length=self.batch_size)
+                if not documents:
+                    break
+                if handle is None:
+                    await asyncio.to_thread(os.makedirs, directory, exist_ok=True)
+                    handle = await asyncio.to_thread(gzip.open, f"{path}.part", 'wt', encoding='utf-8')
+                lines = "".join(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n"
+                                for document in documents)
+                await asyncio.to_thread(handle.write, lines)
+                count += len(documents)
+        except BaseException:
+            if handle is not None:
+                await asyncio.to_thread(handle.close)
+                await asyncio.to_thread(os.remove, f"{path}.part")
+            raise
+
+        if handle is not None:
+            await asyncio.to_thread(handle.close)
+            await asyncio.to_thread(os.replace, f"{path}.part", path)
+            self.files_written += 1
+            self.documents_archived += count
+            self.bytes_written += os.path.getsize(path)
+            logger.info(f"Archived {count} {policy.collection} documents to {path}")
+        await self.progress.update_one(
+            {'_id': progress_id},
+            {'$set': {'archived_until': until, 'updated_at': utc_now()}},
+            upsert=True
+        )
+
+    async def archive_once(self):
+        """Archive every policy's documents that are within the lead of expiring"""
+        for policy in self.policies:
+            try:
+                await self.archive_collection(policy)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = f"{policy.collection}: {str(e)}"
+                logger.error(f"Archiving {policy.collection} failed: {str(e)}")
+        self.runs += 1
+        self.last_run_at = utc_now().isoformat()
+
+    async def run_forever(self):
+        while True:
+            await self.archive_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retention and archive statistics"""
+        return {
+            'policies': [{
+                'collection': policy.collection,
+                'field': policy.field,
+                'retention_days': policy.days,
+                'archive': policy.archive
+            } for policy in RETENTION_POLICIES],
+            'archive_enabled': self.enabled,
+            'archive_lead_hours': self.lead.total_seconds() / 3600,
+            'runs': self.runs,
+            'files_written': self.files_written,
+            'documents_archived': self.documents_archived,
+            'bytes_written': self.bytes_written,
+            'last_run_at': self.last_run_at,
+            'last_error': self.last_error
+        }
+
+
+__all__ = ['RETENTION_POLICIES', 'RetentionArchiver', 'RetentionPolicy']
+
+
+def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Archive documents that are about to expire to gzipped NDJSON")
+    parser.add_argument("--archive-dir", default=os.getenv('RETENTION_ARCHIVE_DIR', ''), required=not os.getenv('RETENTION_ARCHIVE_DIR'))
+    args = parser.parse_args()
+
+    mongo_url = os.environ['MONGO_URL']
+    db_name = mongo_url.split('/')[-1] if '/' in mongo_url else os.environ.get('DB_NAME', 'sentratech_forms')
+
+    async def run():
+        client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+        archiver = RetentionArchiver(client[db_name], archive_dir=args.archive_dir)
+        started = time.time()
+        await archiver.archive_once()
+        client.close()
+        return {**archiver.get_stats(), 'duration_seconds': round(time.time() - started, 2)}
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""
+Analytics and Submission Rollups for SentraTech
+Hourly and daily bucket collections kept current with $inc upserts as events are written, plus a backfill for history
+
+Collections (each bucket document carries `bucket`, the start of its hour or day):
+    analytics_hourly / analytics_daily              page_views, conversions, devices.<type>
+    analytics_pages_hourly / analytics_pages_daily  views per page
+    performance_hourly / performance_daily          count and sum per metric_name
+    submissions_hourly / submissions_daily          count per form collection
+    analytics_sessions                              first_seen / last_seen per session (exact unique visitors)
+
+Live increments and backfilled history go to separate bucket documents (`src` in the _id), so the
+backfill can be rerun without double counting. Readers sum both. The backfill only covers events
+before live_since, so live increments that fail to write are kept and retried with the next batch
+(up to ROLLUP_RETRY_MAX_BUCKETS buckets; beyond that they are dropped and counted).
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from bson_dates import as_datetime, utc_now
+
+logger = logging.getLogger("rollups")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)  # Bucket for history without a usable timestamp
+STATE_ID = 'rollups'
+
+# Form collections counted by /api/dashboard/stats; documents are timestamped by created_at or timestamp
+SUBMISSION_COLLECTIONS = ['demo_requests', 'roi_reports', 'contact_requests', 'subscriptions', 'job_applications']
+
+GRANULARITIES = {
+    'hourly': lambda ts: ts.replace(minute=0, second=0, microsecond=0),
+    'daily': lambda ts: ts.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+DATE_UNITS = {'hourly': 'hour', 'daily': 'day'}
+
+
+def window_start(hours: Optional[float], daily_after_hours: float) -> Tuple[str, Optional[datetime]]:
+    """(granularity, first bucket) covering the last `hours`; None hours means all time"""
+    if hours is None:
+        return 'daily', None
+    granularity = 'hourly' if hours <= daily_after_hours else 'daily'
+    return granularity, GRANULARITIES[granularity](utc_now() - timedelta(hours=hours))
+
+
+class RollupStore:
+    """
+    Maintains and reads the rollup collections
+
+    apply() takes a batch of freshly written events (the write-behind writer calls it after each
+    flush) and turns it into one coalesced $inc upsert per touched bucket. Windows longer than
+    daily_after_hours are read from the daily buckets, shorter ones from the hourly buckets;
+    either way a window is aligned to whole buckets.
+    """
+
+    def __init__(self, db, daily_after_hours: Optional[float] = None, retry_max_buckets: Optional[int] = None):
+        self.db = db
+        self.daily_after_hours = daily_after_hours or float(os.getenv('ROLLUP_DAILY_AFTER_HOURS', '168'))
+        self.retry_max_buckets = retry_max_buckets or int(os.getenv('ROLLUP_RETRY_MAX_BUCKETS', '10000'))
+        self.state = db.rollup_state
+        self.live_since: Optional[datetime] = None
+        self._ready = False
+        self._ready_checked_at = 0.0
+        self._backfill_task: Optional[asyncio.Task] = None
+        # Increments and session bounds whose write failed, merged into the next batch
+        self._retry_ops: Dict[Tuple, Dict[str, int]] = {}
+        self._retry_sessions: Dict[str, Tuple[datetime, datetime]] = {}
+
+        # Rollup statistics
+        self.batches_applied = 0
+        self.events_applied = 0
+        self.upserts = 0
+        self.errors = 0
+        self.retried_buckets = 0
+        self.dropped_buckets = 0  # Failed increments given up on; these buckets stay low
+        self.backfill_seconds: Optional[float] = None
+
+    async def init(self):
+        """Record when live increments began; backfill covers everything before it (startup)"""
+        await self.state.update_one({'_id': STATE_ID}, {'$setOnInsert': {'live_since': utc_now()}}, upsert=True)
+        state = await self.state.find_one({'_id': STATE_ID})
+        self.live_since = as_datetime(state['live_since'])
+        self._ready = bool(state.get('backfill_completed_at'))
+
+    async def ready(self) -> bool:
+        """True once history is backfilled; until then readers fall back to the raw collections"""
+        if not self._ready and time.time() - self._ready_checked_at > 60:
+            self._ready_checked_at = time.time()
+            state = await self.state.find_one({'_id': STATE_ID}, {'backfill_completed_at': 1}) or {}
+            self._ready = bool(state.get('backfill_completed_at'))
+        return self._ready
+
+    # Live maintenance
+
+    def _increment(self, ops: Dict[Tuple, Dict[str, int]], prefix: str, ts: Any, key: Dict[str, Any], inc: Dict[str, int]):
+        ts = as_datetime(ts) or EPOCH
+        for granularity, floor in GRANULARITIES.items():
+            slot = (f"{prefix}_{granularity}", floor(ts), tuple(key.items()))
+            totals = ops.setdefault(slot, {})
+            for field, amount in inc.items():
+                totals[field] = totals.get(field, 0) + amount
+
+    @staticmethod
+    def _merge(ops: Dict[Tuple, Dict[str, int]], more: Dict[Tuple, Dict[str, int]]):
+        for slot, inc in more.items():
+            totals = ops.setdefault(slot, {})
+            for field, amount in inc.items():
+                totals[field] = totals.get(field, 0) + amount
+
+    @staticmethod
+    def _merge_sessions(sessions: Dict[str, Tuple[datetime, datetime]], more: Dict[str, Tuple[datetime, datetime]]):
+        for session_id, (first, last) in more.items():
+            seen_first, seen_last = sessions.get(session_id, (first, last))
+            sessions[session_id] = (min(first, seen_first), max(last, seen_last))
+
+    async def _write(self, ops: Dict[Tuple, Dict[str, int]], sessions: Dict[str, Tuple[datetime, datetime]]):
+        """Write the increments; returns the (ops, sessions) that were not applied"""
+        by_collection: Dict[str, List[Tuple[Any, UpdateOne]]] = {}
+        for slot, inc in ops.items():
+            collection, bucket, key = slot
+            key = dict(key)
+            by_collection.setdefault(collection, []).append((slot, UpdateOne(
+                {'_id': {'b': bucket, **key, 'src': 'live'}},
+                {'$inc': inc, '$setOnInsert': {'bucket': bucket, **key}},
+                upsert=True
+            )))
+        if sessions:
+            by_collection['analytics_sessions'] = [
+                (session_id, UpdateOne({'_id': session_id}, {'$min': {'first_seen': first}, '$max': {'last_seen': last}},
+                                       upsert=True))
+                for session_id, (first, last) in sessions.items()
+            ]
+
+        failed_ops: Dict[Tuple, Dict[str, int]] = {}
+        failed_sessions: Dict[str, Tuple[datetime, datetime]] = {}
+        for collection, entries in by_collection.items():
+            try:
+                await self.db[collection].bulk_write([request for _, request in entries], ordered=False)
+                failed = []
+            except BulkWriteError as e:
+                failed = [entries[error['index']][0] for error in e.details.get('writeErrors', [])]
+                logger.error(f"Rollup update of {collection} failed for {len(failed)} of {len(entries)} buckets")
+            except Exception as e:
+                # Outcome unknown: retried, so a write the server applied but never acknowledged counts twice
+                failed = [slot for slot, _ in entries]
+                logger.error(f"Rollup update of {collection} failed: {str(e)}")
+            self.upserts += len(entries) - len(failed)
+            for slot in failed:
+                if collection == 'analytics_sessions':
+                    failed_sessions[slot] = sessions[slot]
+                else:
+                    failed_ops[slot] = ops[slot]
+        return failed_ops, failed_sessions
+
+    def _requeue(self, ops: Dict[Tuple, Dict[str, int]], sessions: Dict[str, Tuple[datetime, datetime]]):
+        room = self.retry_max_buckets - len(self._retry_ops) - len(self._retry_sessions)
+        kept_ops = dict(list(ops.items())[:max(room, 0)])
+        room -= len(kept_ops)
+        kept_sessions = dict(list(sessions.items())[:max(room, 0)])
+        dropped = len(ops) - len(kept_ops) + len(sessions) - len(kept_sessions)
+        self._merge(self._retry_ops, kept_ops)
+        self._merge_sessions(self._retry_sessions, kept_sessions)
+        self.retried_buckets += len(kept_ops) + len(kept_sessions)
+        if dropped:
+            self.dropped_buckets += dropped
+            logger.error(f"Rollup retry queue full; dropped {dropped} bucket increments")
+
+    async def apply(self, collection_name: str, documents: List[Dict[str, Any]]):
+        """Roll up a batch of events that were just written to collection_name"""
+        ops: Dict[Tuple, Dict[str, int]] = {}
+        sessions: Dict[str, Tuple[datetime, datetime]] = {}
+        for document in documents:
+            ts = document.get('timestamp')
+            if collection_name == 'page_views':
+                device = document.get('device_type') or 'desktop'
+                self._increment(ops, 'analytics', ts, {}, {'page_views': 1, f"devices.{device}": 1})
+                self._increment(ops, 'analytics_pages', ts, {'page': document.get('page_path') or '/'}, {'views': 1})
+                session_id = document.get('session_id')
+                if session_id:
+                    seen = as_datetime(ts) or EPOCH
+                    first, last = sessions.get(session_id, (seen, seen))
+                    sessions[session_id] = (min(first, seen), max(last, seen))
+            elif collection_name == 'conversion_events':
+                self._increment(ops, 'analytics', ts, {}, {'conversions': 1})
+            elif collection_name == 'performance_metrics':
+                value = document.get('metric_value') or 0
+                self._increment(ops, 'performance', ts, {'metric': document.get('metric_name')}, {'count': 1, 'sum': value})
+            elif collection_name in SUBMISSION_COLLECTIONS:
+                self._increment(ops, 'submissions', document.get('created_at') or ts, {'form': collection_name}, {'count': 1})
+        if not ops:
+            return
+        # Earlier failures go out with this batch
+        self._merge(ops, self._retry_ops)
+        self._merge_sessions(sessions, self._retry_sessions)
+        self._retry_ops, self._retry_sessions = {}, {}
+        try:
+            failed_ops, failed_sessions = await self._write(ops, sessions)
+        except Exception as e:
+            # Rollups must never fail the write that fed them
+            failed_ops, failed_sessions = ops, sessions
+            logger.error(f"Rollup update for {len(documents)} {collection_name} events failed: {str(e)}")
+        if failed_ops or failed_sessions:
+            self.errors += 1
+            self._requeue(failed_ops, failed_sessions)
+            return
+        self.batches_applied += 1
+        self.events_applied += len(documents)
+
+    async def record_submission(self, collection_name: str, document: Dict[str, Any]):
+        await self.apply(collection_name, [document])
+
+    # Reads
+
+    async def _buckets(self, prefix: str, hours: Optional[float]) -> List[Dict[str, Any]]:
+        granularity, start = window_start(hours, self.daily_after_hours)
+        query = {'bucket': {'$gte': start}} if start else {}
+        return await self.db[f"{prefix}_{granularity}"].find(query, {'_id': 0}).to_list(length=None)
+
+    async def analytics_summary(self, hours: float, top_pages: int = 5) -> Dict[str, Any]:
+        """Views, conversions, devices and top pages from buckets; unique sessions from analytics_sessions"""
+        granularity, start = window_start(hours, self.daily_after_hours)
+        buckets, pages, unique = await asyncio.gather(
+            self._buckets('analytics', hours),
+            self.db[f"analytics_pages_{granularity}"].aggregate([
+                {'$match': {'bucket': {'$gte': start}}},
+                {'$group': {'_id': '$page', 'views': {'$sum': '$views'}}},
+                {'$sort': {'views': -1, '_id': 1}},
+                {'$limit': top_pages}
+            ]).to_list(length=top_pages),
+            self.db.analytics_sessions.count_documents({'last_seen': {'$gte': utc_now() - timedelta(hours=hours)}})
+        )
+        devices = {"desktop": 0, "mobile": 0, "tablet": 0}
+        for bucket in buckets:
+            for device, count in (bucket.get('devices') or {}).items():
+                devices[device] = devices.get(device, 0) + count
+        return {
+            'page_views': sum(bucket.get('page_views', 0) for bucket in buckets),
+            'conversions': sum(bucket.get('conversions', 0) for bucket in buckets),
+            'unique_sessions': unique,
+            'devices': devices,
+            'top_pages': [{'page': page['_id'], 'views': page['views']} for page in pages]
+        }
+
+    async def performance_summary(self, hours: float) -> Dict[str, Dict[str, float]]:
+        """count and sum per metric_name"""
+        totals: Dict[str, Dict[str, float]] = {}
+        for bucket in await self._buckets('performance', hours):
+            metric = totals.setdefault(bucket.get('metric'), {'count': 0, 'sum': 0})
+            metric['count'] += bucket.get('count', 0)
+            metric['sum'] += bucket.get('sum', 0)
+        return totals
+
+    async def submission_counts(self, hours: Optional[float] = None) -> Dict[str, int]:
+        """Submissions per form collection in the window (all time when hours is None)"""
+        counts = {collection: 0 for collection in SUBMISSION_COLLECTIONS}
+        for bucket in await self._buckets('submissions', hours):
+            counts[bucket['form']] = counts.get(bucket['form'], 0) + bucket.get('count', 0)
+        return counts
+
+    # Backfill
+
+    def _backfill_pipelines(self, unit: str, granularity: str) -> List[Tuple[str, List[Dict[str, Any]]]]:
+        """(source collection, pipeline) pairs that rebuild history before live_since into `backfill` buckets"""
+
+        def to_date(expression):
+            # Handles BSON dates and legacy ISO strings alike
+            return {'$convert': {'input': expression, 'to': 'date', 'onError': EPOCH, 'onNull': EPOCH}}
+
+        def bucket_of(expression):
+            return {'$dateTrunc': {'date': expression, 'unit': unit}}
+
+        def merge_into(collection):
+            return {'$merge': {'into': collection, 'on': '_id', 'whenMatched': 'merge', 'whenNotMatched': 'insert'}}
+
+        before_live = {'$match': {'ts': {'$lt': self.live_since}}}
+        pipelines = [
+            ('page_views', [
+                {'$project': {'ts': to_date('$timestamp'), 'device': {'$ifNull': ['$device_type', 'desktop']}}},
+                before_live,
+                {'$group': {'_id': {'b': bucket_of('$ts'), 'd': '$device'}, 'n': {'$sum': 1}}},
+                {'$group': {'_id': '$_id.b', 'page_views': {'$sum': '$n'}, 'devices': {'$push': {'k': '$_id.d', 'v': '$n'}}}},
+                {'$project': {'_id': {'b': '$_id', 'src': 'backfill'}, 'bucket': '$_id', 'page_views': 1,
+                              'devices': {'$arrayToObject': '$devices'}}},
+                merge_into(f"analytics_{granularity}")
+            ]),
+            ('page_views', [
+                {'$project': {'ts': to_date('$timestamp'), 'page': {'$ifNull': ['$page_path', '/']}}},
+                before_live,
+                {'$group': {'_id': {'b': bucket_of('$ts'), 'page': '$page'}, 'views': {'$sum': 1}}},
+                {'$project': {'_id': {'b': '$_id.b', 'page': '$_id.page', 'src': 'backfill'}, 'bucket': '$_id.b',
+                              'page': '$_id.page', 'views': 1}},
+                merge_into(f"analytics_pages_{granularity}")
+            ]),
+            ('conversion_events', [
+                {'$project': {'ts': to_date('$timestamp')}},
+                before_live,
+                {'$group': {'_id': bucket_of('$ts'), 'conversions': {'$sum': 1}}},
+                {'$project': {'_id': {'b': '$_id', 'src': 'backfill'}, 'bucket': '$_id', 'conversions': 1}},
+                merge_into(f"analytics_{granularity}")
+            ]),
+            ('performance_metrics', [
+                {'$project': {'ts': to_date('$timestamp'), 'metric_name': 1, 'metric_value': 1}},
+                before_live,
+                {'$group': {'_id': {'b': bucket_of('$ts'), 'metric': '$metric_name'}, 'count': {'$sum': 1},
+                            'sum': {'$sum': {'$ifNull': ['$metric_value', 0]}}}},
+                {'$project': {'_id': {'b': '$_id.b', 'metric': '$_id.metric', 'src': 'backfill'}, 'bucket': '$_id.b',
+                              'metric': '$_id.metric', 'count': 1, 'sum': 1}},
+                merge_into(f"performance_{granularity}")
+            ]),
+        ]
+        for collection in SUBMISSION_COLLECTIONS:
+            pipelines.append((collection, [
+                {'$project': {'ts': to_date({'$ifNull': ['$created_at', '$timestamp']})}},
+                before_live,
+                {'$group': {'_id': bucket_of('$ts'), 'count': {'$sum': 1}}},
+                {'$project': {'_id': {'b': '$_id', 'form': collection, 'src': 'backfill'}, 'bucket': '$_id',
+                              'form': collection, 'count': 1}},
+                merge_into(f"submissions_{granularity}")
+            ]))
+        return pipelines
+
+    async def backfill(self):
+        """Rebuild rollups for events written before live maintenance began; idempotent"""
+        start_time = time.time()
+        pipelines = []
+        for granularity, unit in DATE_UNITS.items():
+            pipelines.extend(self._backfill_pipelines(unit, granularity))
+        pipelines.append(('page_views', [
+            {'$match': {'session_id': {'$type': 'string'}}},
+            {'$project': {'session_id': 1, 'ts': {'$convert': {'input': '$timestamp', 'to': 'date', 'onError': EPOCH, 'onNull': EPOCH}}}},
+            {'$match': {'ts': {'$lt': self.live_since}}},
+            {'$group': {'_id': '$session_id', 'first_seen': {'$min': '$ts'}, 'last_seen': {'$max': '$ts'}}},
+            {'$merge': {'into': 'analytics_sessions', 'on': '_id', 'whenNotMatched': 'insert', 'whenMatched': [
+                {'$set': {'first_seen': {'$min': ['$first_seen', '$$new.first_seen']},
+                          'last_seen': {'$max': ['$last_seen', '$$new.last_seen']}}}
+            ]}}
+        ]))
+
+        for source, pipeline in pipelines:
+            await self.db[source].aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+        await self.state.update_one({'_id': STATE_ID}, {'$set': {'backfill_completed_at': utc_now()}})
+        self._ready = True
+        self.backfill_seconds = round(time.time() - start_time, 2)
+        logger.info(f"Rollup backfill finished in {self.backfill_seconds}s")
+
+    def start_backfill(self):
+        async def run():
+            try:
+                await self.backfill()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Rollup backfill failed: {str(e)}")
+
+        if self._backfill_task is None or self._backfill_task.done():
+            self._backfill_task = asyncio.create_task(run())
+
+    async def stop(self):
+        if self._backfill_task is not None:
+            self._backfill_task.cancel()
+            try:
+                await self._backfill_task
+            except asyncio.CancelledError:
+                pass
+            self._backfill_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rollup statistics"""
+        return {
+            'ready': self._ready,
+            'live_since': self.live_since.isoformat() if self.live_since else None,
+            'backfill_running': self._backfill_task is not None and not self._backfill_task.done(),
+            'backfill_seconds': self.backfill_seconds,
+            'batches_applied': self.batches_applied,
+            'events_applied': self.events_applied,
+            'upserts': self.upserts,
+            'errors': self.errors,
+            'retry_pending_buckets': len(self._retry_ops) + len(self._retry_sessions),
+            'retried_buckets': self.retried_buckets,
+            'dropped_buckets': self.dropped_buckets
+        }
+
+
+__all__ = ['RollupStore', 'SUBMISSION_COLLECTIONS', 'window_start']
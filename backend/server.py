@@ -1,5 +1,5 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect, Request, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
 from fastapi.security.utils import get_authorization_scheme_param
@@ -8,18 +8,16 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 import time
 from pathlib import Path
 from datetime import datetime, timezone
 
-# Configure detailed logging for proxy debugging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-proxy_logger = logging.getLogger("proxy_debug")
+# Queued key=value logging: records are formatted and written on a listener thread, off the event loop
+from log_pipeline import setup_logging, stop_logging, log_event, payload_fields
+setup_logging()
 
 # In-memory store for recent request IDs (use Redis for production scaling)
 recent_requests = {}
@@ -73,6 +71,28 @@ from googleapiclient.discovery import build
 
 # Import performance optimization modules
 from cache_manager import cached, cache_manager, SpecializedCaches, warm_cache, cache_maintenance
+from batch_forwarder import MicroBatchForwarder
+from dashboard_client import dashboard_client, RetryPolicy
+from concurrency_limiter import LimitExceeded
+from replay_worker import SubmissionReconciler, PendingFileSource, FallbackCollectionSource, WalSource
+from submission_wal import SubmissionWAL
+from health_prober import HealthProber, http_check, tcp_check
+from ack_tracker import ack_tracker
+from request_deadline import DeadlineMiddleware
+import fast_json
+from fast_json import FastJSONResponse
+from upstream_metrics import upstream_metrics
+from collect_log_writer import RotatingBatchWriter
+from write_behind import WriteBehindWriter
+from pagination import InvalidCursor, paginate
+from projections import CANDIDATE_SUMMARY_FIELDS, InvalidFields, computed_projection, find_projection, parse_fields
+from bson_dates import DateMigration, as_datetime, as_iso, date_range
+from rollups import SUBMISSION_COLLECTIONS, RollupStore
+from index_plan import apply_index_plan
+from time_series import TimeSeriesMigration
+from retention import RetentionArchiver
+from submission_counters import SubmissionCounters
+from form_pipeline import FormSpec, FormDispatcher, PROXY_FORM_SPECS
 
 # Email Notification System
 class EmailService:
@@ -379,6 +399,9 @@ client = AsyncIOMotorClient(
     # Additional performance optimizations
     maxConnecting=10,               # Max simultaneous connections
     heartbeatFrequencyMS=5000,      # Heartbeat every 5s (reduced)
+    
+    # Timestamps are stored as BSON dates; read them back as UTC-aware datetimes
+    tz_aware=True,
 )
 
 # Use database name from MONGO_URL environment variable (required in production)
@@ -388,6 +411,18 @@ if not mongo_url:
 db_name = mongo_url.split('/')[-1] if '/' in mongo_url else os.environ.get('DB_NAME', 'sentratech_forms')
 db = client[db_name]
 
+# Hourly and daily rollups of analytics events and form submissions
+rollup_store = RollupStore(db)
+# All-time submission totals, kept in the counters collection
+submission_counters = SubmissionCounters(db)
+
+async def record_submission(collection_name: str, document: dict):
+    """Update counters and rollups after a form submission is stored"""
+    await asyncio.gather(
+        submission_counters.increment(collection_name),
+        rollup_store.record_submission(collection_name, document)
+    )
+
 # Database optimization configurations
 DATABASE_CONFIG = {
     'batch_size': 1000,           # Batch operations for better performance
@@ -398,35 +433,15 @@ DATABASE_CONFIG = {
 }
 
 async def ensure_database_indexes():
-    """Create database indexes for optimal query performance"""
+    """Create database indexes for optimal query performance (declared in index_plan.py)"""
     try:
-        # Demo requests indexes
-        await db.demo_requests.create_index([("email", 1)], background=True)
-        await db.demo_requests.create_index([("created_at", -1)], background=True)
-        await db.demo_requests.create_index([("company", "text"), ("name", "text")], background=True)
-        
-        # ROI calculations indexes
-        await db.roi_calculations.create_index([("id", 1)], unique=True, background=True)
-        await db.roi_calculations.create_index([("created_at", -1)], background=True)
-        
-        # Chat sessions and messages indexes
-        await db.chat_sessions.create_index([("session_id", 1)], unique=True, background=True)
-        await db.chat_messages.create_index([("session_id", 1), ("timestamp", 1)], background=True)
-        
-        # Analytics indexes
-        await db.page_views.create_index([("timestamp", -1)], background=True)
-        await db.page_views.create_index([("page_path", 1), ("timestamp", -1)], background=True)
-        await db.user_interactions.create_index([("session_id", 1), ("timestamp", -1)], background=True)
-        
-        # Privacy requests indexes
-        await db.privacy_requests.create_index([("id", 1)], unique=True, background=True)
-        await db.privacy_requests.create_index([("email", 1)], background=True)
-        
-        # Performance metrics indexes
-        await db.performance_metrics.create_index([("timestamp", -1)], background=True)
-        await db.performance_metrics.create_index([("metric_name", 1), ("timestamp", -1)], background=True)
-        
-        logger.info("✅ Database indexes created successfully")
+        results = await apply_index_plan(db)
+        if results['conflicts'] or results['failed']:
+            logger.error(f"❌ Index plan incomplete: conflicts={results['conflicts']} failed={results['failed']}")
+        if results['deferred']:
+            logger.info(f"Indexes waiting for the date migration: {results['deferred']}")
+        logger.info(f"✅ Database indexes ready ({len(results['created'])} created, {len(results['updated'])} TTL updated, "
+                    f"{len(results['existing'])} existing)")
     except Exception as e:
         logger.error(f"❌ Error creating database indexes: {str(e)}")
 
@@ -494,6 +509,20 @@ class DatabaseOptimizer:
             logger.error(f"Paginated find failed for {collection_name}: {str(e)}")
             raise
 
+    @staticmethod
+    async def keyset_find(collection_name: str, query: Dict, sort_field: str = "created_at", sort_order: int = -1,
+                          limit: int = 50, cursor: Optional[str] = None, include_total: bool = False,
+                          projection: Optional[Dict] = None, pipeline: Optional[List[Dict]] = None):
+        """Cursor-paginated query in (sort_field, _id) order; no skip, and a count only on request"""
+        try:
+            return await paginate(db[collection_name], query, sort_field, sort_order, limit=limit, cursor=cursor,
+                                  include_total=include_total, projection=projection, pipeline=pipeline)
+        except InvalidCursor:
+            raise
+        except Exception as e:
+            logger.error(f"Keyset find failed for {collection_name}: {str(e)}")
+            raise
+
     @staticmethod
     async def aggregate_with_optimization(collection_name: str, pipeline: List[Dict], allow_disk_use: bool = True):
         """Optimized aggregation pipeline"""
@@ -509,8 +538,16 @@ class DatabaseOptimizer:
             logger.error(f"Aggregation failed for {collection_name}: {str(e)}")
             raise
 
+def set_page_headers(response: Response, page: Dict[str, Any]):
+    """Cursor metadata for list endpoints whose body is a bare JSON array"""
+    response.headers["X-Has-More"] = "true" if page["has_more"] else "false"
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["total"] is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -691,7 +728,7 @@ class ConnectionManager:
                 "timestamp": datetime.now(timezone.utc).isoformat()
             }
             websocket = self.active_connections[session_id]
-            await websocket.send_text(json.dumps(typing_message))
+            await websocket.send_text(fast_json.dumps_str(typing_message))
 
 # User Management Models
 class UserRole:
@@ -840,10 +877,12 @@ class UserService:
         user = User(**user_dict)
         user_data = user.dict()
         user_data['password_hash'] = hashed_password
-        user_data['created_at'] = user_data['created_at'].isoformat()
-        user_data['updated_at'] = user_data['updated_at'].isoformat()
         
-        await db.users.insert_one(user_data)
+        try:
+            await db.users.insert_one(user_data)
+        except DuplicateKeyError:
+            # Concurrent registration won the unique email index
+            raise HTTPException(status_code=400, detail="Email already registered")
         
         # Return user without password hash
         del user_data['password_hash']
@@ -861,7 +900,7 @@ class UserService:
         # Update last login
         await db.users.update_one(
             {"id": user['id']},
-            {"$set": {"last_login": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"last_login": datetime.now(timezone.utc)}}
         )
         
         return user
@@ -873,7 +912,7 @@ class UserService:
                 update_data[field] = value
         
         if update_data:
-            update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+            update_data['updated_at'] = datetime.now(timezone.utc)
             await db.users.update_one({"id": user_id}, {"$set": update_data})
         
         return await self.get_user_by_id(user_id)
@@ -891,7 +930,7 @@ class UserService:
             {"id": user_id},
             {"$set": {
                 "password_hash": new_hashed_password,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         return True
@@ -914,7 +953,7 @@ class UserService:
             {"email": email},
             {"$set": {
                 "password_hash": new_hashed_password,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }}
         )
         return True
@@ -972,8 +1011,6 @@ class LiveChatService:
         
         # Save to database
         session_dict = session.dict()
-        session_dict['started_at'] = session_dict['started_at'].isoformat()
-        session_dict['last_activity'] = session_dict['last_activity'].isoformat()
         
         await db.chat_sessions.insert_one(session_dict)
         logger.info(f"Created new chat session: {session.id}")
@@ -1002,14 +1039,13 @@ class LiveChatService:
         
         # Save message to database
         message_dict = message.dict()
-        message_dict['timestamp'] = message_dict['timestamp'].isoformat()
         
         await db.chat_messages.insert_one(message_dict)
         
         # Update session last activity
         await db.chat_sessions.update_one(
             {"id": session_id},
-            {"$set": {"last_activity": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"last_activity": datetime.now(timezone.utc)}}
         )
         
         logger.info(f"Saved message from {sender} in session {session_id}")
@@ -1141,15 +1177,12 @@ async def health_check():
     # Check if ingest is configured
     ingest_configured = bool(os.environ.get("INGEST_KEY") and os.environ.get("SVC_EMAIL"))
     
-    # Try database connection but don't fail if it's unavailable
-    database_status = "disconnected"
-    try:
-        # Quick database ping with short timeout
-        await client.admin.command('ping')
-        database_status = "connected"
-    except Exception as e:
-        logger.warning(f"Database connection unavailable: {str(e)}")
-        database_status = "unavailable"
+    # Database state comes from the background prober, so this never waits on MongoDB
+    database_healthy = health_prober.is_healthy("mongodb")
+    if database_healthy is None:
+        database_status = "unknown"
+    else:
+        database_status = "connected" if database_healthy else "unavailable"
     
     # Get cache statistics (this should work even without database)
     try:
@@ -1168,7 +1201,8 @@ async def health_check():
         "version": "1.0.0-optimized",
         "mock": False,
         "ingest_configured": ingest_configured,
-        "integrations": "dashboard_only"  # Using dashboard integration only
+        "integrations": "dashboard_only",  # Using dashboard integration only
+        "dependencies": health_prober.get_all_status()
     }
 
 @api_router.get("/config/validate")
@@ -1277,11 +1311,12 @@ async def ingest_contact_request(
         # Add timestamp and ID
         contact_data = contact.dict()
         contact_data["id"] = str(uuid.uuid4())
-        contact_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        contact_data["created_at"] = datetime.now(timezone.utc)
         contact_data["status"] = "new"
         
         # Store in local database
         await db.contact_requests.insert_one(contact_data)
+        await record_submission("contact_requests", contact_data)
         
         return {
             "success": True,
@@ -1304,11 +1339,12 @@ async def ingest_demo_request(
         # Add timestamp and ID
         demo_data = demo.dict()
         demo_data["id"] = str(uuid.uuid4())
-        demo_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        demo_data["created_at"] = datetime.now(timezone.utc)
         demo_data["status"] = "new"
         
         # Store in local database
         await db.demo_requests.insert_one(demo_data)
+        await record_submission("demo_requests", demo_data)
         
         return {
             "success": True,
@@ -1331,11 +1367,12 @@ async def ingest_roi_report(
         # Add timestamp and ID
         roi_data = roi.dict()
         roi_data["id"] = str(uuid.uuid4())
-        roi_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        roi_data["created_at"] = datetime.now(timezone.utc)
         roi_data["status"] = "new"
         
         # Store in local database
         await db.roi_reports.insert_one(roi_data)
+        await record_submission("roi_reports", roi_data)
         
         return {
             "success": True,
@@ -1358,11 +1395,12 @@ async def ingest_newsletter_subscription(
         # Add timestamp and ID
         newsletter_data = newsletter.dict()
         newsletter_data["id"] = str(uuid.uuid4())
-        newsletter_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        newsletter_data["created_at"] = datetime.now(timezone.utc)
         newsletter_data["status"] = "subscribed"
         
         # Store in local database
         await db.subscriptions.insert_one(newsletter_data)
+        await record_submission("subscriptions", newsletter_data)
         
         return {
             "success": True,
@@ -1385,11 +1423,12 @@ async def ingest_job_application(
         # Add timestamp and ID
         job_data = job_app.dict()
         job_data["id"] = str(uuid.uuid4())
-        job_data["created_at"] = datetime.now(timezone.utc).isoformat()
+        job_data["created_at"] = datetime.now(timezone.utc)
         job_data["status"] = "submitted"
         
         # Store in local database
         await db.job_applications.insert_one(job_data)
+        await record_submission("job_applications", job_data)
         
         return {
             "success": True,
@@ -1406,8 +1445,10 @@ async def ingest_job_application(
 async def get_contact_requests_status():
     """Get contact requests count for debugging"""
     try:
-        count = await db.contact_requests.count_documents({})
-        recent = await db.contact_requests.find().sort("created_at", -1).limit(5).to_list(length=5)
+        count, recent = await asyncio.gather(
+            submission_counters.count("contact_requests"),
+            db.contact_requests.find().sort("created_at", -1).limit(5).to_list(length=5)
+        )
         return {"total_count": count, "recent_submissions": recent}
     except Exception as e:
         return {"error": str(e), "total_count": 0}
@@ -1416,8 +1457,10 @@ async def get_contact_requests_status():
 async def get_demo_requests_status():
     """Get demo requests count for debugging"""
     try:
-        count = await db.demo_requests.count_documents({})
-        recent = await db.demo_requests.find().sort("created_at", -1).limit(5).to_list(length=5)
+        count, recent = await asyncio.gather(
+            submission_counters.count("demo_requests"),
+            db.demo_requests.find().sort("created_at", -1).limit(5).to_list(length=5)
+        )
         return {"total_count": count, "recent_submissions": recent}
     except Exception as e:
         return {"error": str(e), "total_count": 0}
@@ -1426,8 +1469,10 @@ async def get_demo_requests_status():
 async def get_roi_reports_status():
     """Get ROI reports count for debugging"""
     try:
-        count = await db.roi_reports.count_documents({})
-        recent = await db.roi_reports.find().sort("created_at", -1).limit(5).to_list(length=5)
+        count, recent = await asyncio.gather(
+            submission_counters.count("roi_reports"),
+            db.roi_reports.find().sort("created_at", -1).limit(5).to_list(length=5)
+        )
         return {"total_count": count, "recent_submissions": recent}
     except Exception as e:
         return {"error": str(e), "total_count": 0}
@@ -1436,8 +1481,10 @@ async def get_roi_reports_status():
 async def get_subscriptions_status():
     """Get newsletter subscriptions count for debugging"""
     try:
-        count = await db.subscriptions.count_documents({})
-        recent = await db.subscriptions.find().sort("created_at", -1).limit(5).to_list(length=5)
+        count, recent = await asyncio.gather(
+            submission_counters.count("subscriptions"),
+            db.subscriptions.find().sort("created_at", -1).limit(5).to_list(length=5)
+        )
         return {"total_count": count, "recent_submissions": recent}
     except Exception as e:
         return {"error": str(e), "total_count": 0}
@@ -1446,8 +1493,10 @@ async def get_subscriptions_status():
 async def get_job_applications_status():
     """Get job applications count for debugging"""
     try:
-        count = await db.job_applications.count_documents({})
-        recent = await db.job_applications.find().sort("created_at", -1).limit(5).to_list(length=5)
+        count, recent = await asyncio.gather(
+            submission_counters.count("job_applications"),
+            db.job_applications.find().sort("created_at", -1).limit(5).to_list(length=5)
+        )
         return {"total_count": count, "recent_submissions": recent}
     except Exception as e:
         return {"error": str(e), "total_count": 0}
@@ -1459,6 +1508,9 @@ async def get_job_applications_status():
 DASHBOARD_BASE_URL = os.environ.get('ADMIN_DASHBOARD_URL', 'https://admin.sentratech.net/api/forms')
 DASHBOARD_ORIGIN = "https://secure-form-relay.emergent.host"
 
+# Proxy forwards are answered synchronously, so they are not retried (hedging still applies)
+SINGLE_ATTEMPT_POLICY = RetryPolicy(max_attempts=1)
+
 async def proxy_to_dashboard(endpoint: str, data: dict, original_headers: dict = None):
     """Proxy form submission to new CRM dashboard API with cross-domain support"""
     try:
@@ -1486,33 +1538,36 @@ async def proxy_to_dashboard(endpoint: str, data: dict, original_headers: dict =
                 if header_name in original_headers:
                     forward_headers[header_name] = original_headers[header_name]
         
-        logging.info(f"🔑 Dashboard proxy request with API key: {endpoint}")
-        logging.info(f"📋 Headers: {dict(forward_headers)}")  # Log headers (API key will be logged for debugging)
+        # Header names only: values include the ingest key and forwarded cookies
+        log_event(logger, logging.INFO, "dashboard_forward", endpoint=endpoint,
+                  headers=sorted(forward_headers), **payload_fields(data))
+        
+        # Client-supplied ids make the forward idempotent, which is what allows hedging it
+        response = await dashboard_client.post(
+            f"{DASHBOARD_BASE_URL}{endpoint}",
+            json=data,
+            headers=forward_headers,
+            idempotency_key=data.get('id') or data.get('submissionId'),
+            retry_policy=SINGLE_ATTEMPT_POLICY
+        )
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{DASHBOARD_BASE_URL}{endpoint}",
-                json=data,
-                headers=forward_headers
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                logging.info(f"Dashboard proxy success: {endpoint}, ID: {result.get('id', 'unknown')}")
-                return {
-                    "success": True,
-                    "data": result,
-                    "mode": "dashboard_proxy",
-                    "status_code": response.status_code
-                }
-            else:
-                logging.error(f"Dashboard proxy failed: {endpoint}, Status: {response.status_code}, Response: {response.text}")
-                return {
-                    "success": False,
-                    "error": f"Dashboard API returned {response.status_code}: {response.text}",
-                    "mode": "dashboard_proxy_error",
-                    "status_code": response.status_code
-                }
+        if response.status_code == 200:
+            result = response.json()
+            logging.info(f"Dashboard proxy success: {endpoint}, ID: {result.get('id', 'unknown')}")
+            return {
+                "success": True,
+                "data": result,
+                "mode": "dashboard_proxy",
+                "status_code": response.status_code
+            }
+        else:
+            logging.error(f"Dashboard proxy failed: {endpoint}, Status: {response.status_code}, Response: {response.text}")
+            return {
+                "success": False,
+                "error": f"Dashboard API returned {response.status_code}: {response.text}",
+                "mode": "dashboard_proxy_error",
+                "status_code": response.status_code
+            }
                 
     except httpx.TimeoutException:
         logging.error(f"Dashboard proxy timeout: {endpoint}")
@@ -1521,6 +1576,14 @@ async def proxy_to_dashboard(endpoint: str, data: dict, original_headers: dict =
             "error": "Dashboard API timeout",
             "mode": "dashboard_proxy_timeout"
         }
+    except LimitExceeded as e:
+        # Shed under load; callers park the submission in their fallback path
+        logging.warning(f"Dashboard proxy shed: {endpoint}, {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "mode": "dashboard_proxy_shed"
+        }
     except Exception as e:
         logging.error(f"Dashboard proxy error: {endpoint}, Error: {str(e)}")
         return {
@@ -1529,467 +1592,108 @@ async def proxy_to_dashboard(endpoint: str, data: dict, original_headers: dict =
             "mode": "dashboard_proxy_error"
         }
 
-@api_router.options("/proxy/newsletter-signup")
-async def options_newsletter_signup():
-    """Handle preflight OPTIONS request for newsletter signup"""
-    return {"status": "ok"}
+# Micro-batched forwarding for bursty form types (campaign spikes)
+DASHBOARD_BATCH_FORMS = {
+    form_type.strip()
+    for form_type in os.environ.get('DASHBOARD_BATCH_FORMS', 'newsletter-signup,roi-calculator').split(',')
+    if form_type.strip()
+}
 
-# NEW CRM DASHBOARD PROXY ENDPOINTS - Cross-domain integration with admin.sentratech.net
+async def proxy_batch_to_dashboard(form_type: str, items: List[dict]) -> List[dict]:
+    """Send a batch of same-type submissions to the dashboard bulk endpoint, one result per item"""
+    api_key = os.environ.get('DASHBOARD_API_KEY') or os.environ.get('EMERGENT_API_KEY')
+    if not api_key:
+        logging.error("DASHBOARD_API_KEY not found in environment")
+        return [{"success": False, "error": "Dashboard API key not configured"} for _ in items]
+
+    forward_headers = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+        "Origin": DASHBOARD_ORIGIN,
+        "User-Agent": "SentraTech-Backend/1.0",
+        "X-INGEST-KEY": api_key,
+        "X-API-Key": api_key
+    }
 
-@api_router.post("/proxy/newsletter-signup")
-async def proxy_newsletter_signup(request: Request):
-    """Proxy newsletter signup to new CRM dashboard with cross-domain support"""
-    try:
-        data = await request.json()
-        
-        # Check for duplicate requests using idempotency
-        request_id = data.get("id")
-        if is_duplicate_request(request_id):
-            proxy_logger.warning(f"🚫 Duplicate newsletter signup request blocked: {request_id}")
-            return JSONResponse(
-                content={
-                    "success": False, 
-                    "error": "Duplicate request", 
-                    "message": "This newsletter subscription was already submitted recently"
-                }, 
-                status_code=429
-            )
-        
-        # Comprehensive payload logging
-        proxy_logger.info("🔎 PROXY RECEIVED NEWSLETTER SIGNUP PAYLOAD:")
-        proxy_logger.info(f"🆔 Processing unique newsletter request: {request_id}")
-        proxy_logger.info(f"📊 Complete payload: {json.dumps(data, indent=2, default=str)}")
-        proxy_logger.info("📋 Field analysis:")
-        proxy_logger.info(f"  - Total fields: {len(data)}")
-        proxy_logger.info(f"  - Email: '{data.get('email', 'MISSING')}' (type: {type(data.get('email'))})")
-        proxy_logger.info(f"  - Status: '{data.get('status', 'MISSING')}' (type: {type(data.get('status'))})")
-        proxy_logger.info(f"  - Source: '{data.get('source', 'MISSING')}' (type: {type(data.get('source'))})")
-        proxy_logger.info(f"  - ID: '{data.get('id', 'MISSING')}' (type: {type(data.get('id'))})")
-        proxy_logger.info(f"  - Created: '{data.get('created', 'MISSING')}' (type: {type(data.get('created'))})")
-        proxy_logger.info(f"  - Timestamp: '{data.get('timestamp', 'MISSING')}' (type: {type(data.get('timestamp'))})")
-        
-        # Add timestamp if not present
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now(timezone.utc).isoformat()
-        
-        # Add source if not present
-        if 'source' not in data:
-            data['source'] = 'website_newsletter'
-            
-        result = await proxy_to_dashboard('/forms/newsletter-signup', data, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
-        else:
-            # TEMPORARILY DISABLED FALLBACK - Show real dashboard errors
-            logging.error(f"Newsletter proxy failed: {result['error']}")
-            return {
-                "success": False,
-                "error": f"Dashboard integration failed: {result['error']}",
-                "debug_mode": True
-            }
-            
-            # # Store locally as backup (DISABLED for debugging)
-            # newsletter_data = {
-            #     **data,
-            #     "id": str(uuid.uuid4()),
-            #     "created_at": datetime.now(timezone.utc).isoformat(),
-            #     "status": "proxy_failed",
-            #     "proxy_error": result['error']
-            # }
-            # await db.newsletter_fallback.insert_one(newsletter_data)
-            
-            # return {
-            #     "success": True,
-            #     "message": "Newsletter subscription confirmed",
-            #     "id": newsletter_data["id"]
-            # }
-            
-    except Exception as e:
-        logging.error(f"Newsletter proxy endpoint error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
+    # Single attempt: a bulk retry could store the items that already made it twice. Each item
+    # carries the key a single forward would use, so a replay after a timed-out batch is deduped
+    idempotency_keys = [item.get('id') or item.get('submissionId') for item in items]
+    response = await dashboard_client.post(
+        f"{DASHBOARD_BASE_URL}/forms/{form_type}/bulk",
+        json={"items": items, "idempotencyKeys": idempotency_keys},
+        headers=forward_headers,
+        retry_policy=SINGLE_ATTEMPT_POLICY
+    )
 
-@api_router.options("/proxy/contact-sales")
-async def options_contact_sales():
-    """Handle preflight OPTIONS request for contact sales"""
-    return {"status": "ok"}
+    if response.status_code in (404, 405):
+        # Dashboard without bulk support - fall back to one request per item
+        logging.warning(f"Dashboard bulk endpoint unavailable for {form_type}, forwarding {len(items)} items individually")
+        return await asyncio.gather(*[proxy_to_dashboard(f'/forms/{form_type}', item) for item in items])
 
-@api_router.post("/proxy/contact-sales")
-async def proxy_contact_sales(request: Request):
-    """Proxy contact sales to new CRM dashboard with cross-domain support"""
-    try:
-        data = await request.json()
-        
-        # Check for duplicate requests using idempotency
-        request_id = data.get("id")
-        if is_duplicate_request(request_id):
-            proxy_logger.warning(f"🚫 Duplicate contact sales request blocked: {request_id}")
-            return JSONResponse(
-                content={
-                    "success": False, 
-                    "error": "Duplicate request", 
-                    "message": "This contact sales request was already submitted recently"
-                }, 
-                status_code=429
-            )
-        
-        # Comprehensive payload logging
-        proxy_logger.info("🔎 PROXY RECEIVED CONTACT SALES PAYLOAD:")
-        proxy_logger.info(f"🆔 Processing unique contact sales request: {request_id}")
-        proxy_logger.info(f"📊 Complete payload: {json.dumps(data, indent=2, default=str)}")
-        proxy_logger.info("📋 Field analysis:")
-        proxy_logger.info(f"  - Total fields: {len(data)}")
-        proxy_logger.info(f"  - Full Name: '{data.get('full_name', 'MISSING')}' (type: {type(data.get('full_name'))})")
-        proxy_logger.info(f"  - Work Email: '{data.get('work_email', 'MISSING')}' (type: {type(data.get('work_email'))})")
-        proxy_logger.info(f"  - Company Name: '{data.get('company_name', 'MISSING')}' (type: {type(data.get('company_name'))})")
-        proxy_logger.info(f"  - Phone: '{data.get('phone', 'MISSING')}' (type: {type(data.get('phone'))})")
-        proxy_logger.info(f"  - Company Website: '{data.get('company_website', 'MISSING')}' (type: {type(data.get('company_website'))})")
-        proxy_logger.info(f"  - Call Volume: {data.get('call_volume', 'MISSING')} (type: {type(data.get('call_volume'))})")
-        proxy_logger.info(f"  - Interaction Volume: {data.get('interaction_volume', 'MISSING')} (type: {type(data.get('interaction_volume'))})")
-        proxy_logger.info(f"  - Total Volume: {data.get('total_volume', 'MISSING')} (type: {type(data.get('total_volume'))})")
-        proxy_logger.info(f"  - Preferred Contact Method: '{data.get('preferred_contact_method', 'MISSING')}' (type: {type(data.get('preferred_contact_method'))})")
-        proxy_logger.info(f"  - Plan Selected: '{data.get('plan_selected', 'MISSING')}' (type: {type(data.get('plan_selected'))})")
-        proxy_logger.info(f"  - Billing Term: '{data.get('billing_term', 'MISSING')}' (type: {type(data.get('billing_term'))})")
-        proxy_logger.info(f"  - Message: '{data.get('message', 'MISSING')}' (type: {type(data.get('message'))})")
-        
-        # Add timestamp if not present
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now(timezone.utc).isoformat()
-            
-        result = await proxy_to_dashboard('/forms/contact-sales', data, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
-        else:
-            # Store locally as backup
-            contact_data = {
-                **data,
-                "id": str(uuid.uuid4()),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "status": "proxy_failed",
-                "proxy_error": result['error']
-            }
-            await db.contact_fallback.insert_one(contact_data)
-            
-            return {
+    if response.status_code != 200:
+        logging.error(f"Dashboard bulk proxy failed: {form_type}, Status: {response.status_code}, Response: {response.text}")
+        return [{
+            "success": False,
+            "error": f"Dashboard API returned {response.status_code}: {response.text}",
+            "mode": "dashboard_proxy_error",
+            "status_code": response.status_code
+        } for _ in items]
+
+    results = []
+    for item_result in response.json().get('results', []):
+        if item_result.get('ack'):
+            results.append({
                 "success": True,
-                "message": "Contact sales request received successfully",
-                "id": contact_data["id"]
-            }
-            
-    except Exception as e:
-        logging.error(f"Contact sales proxy error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
-
-@api_router.options("/proxy/demo-request")
-async def options_demo_request():
-    """Handle preflight OPTIONS request for demo request"""
-    return {"status": "ok"}
-
-@api_router.post("/proxy/demo-request")
-async def proxy_demo_request(request: Request):
-    """Proxy demo request to new CRM dashboard with cross-domain support"""
-    try:
-        data = await request.json()
-        
-        # Check for duplicate requests using idempotency
-        request_id = data.get("id")
-        if is_duplicate_request(request_id):
-            proxy_logger.warning(f"🚫 Duplicate demo request blocked: {request_id}")
-            return JSONResponse(
-                content={
-                    "success": False, 
-                    "error": "Duplicate request", 
-                    "message": "This demo request was already submitted recently"
-                }, 
-                status_code=429
-            )
-        
-        # Comprehensive payload logging
-        proxy_logger.info("🔎 PROXY RECEIVED DEMO REQUEST PAYLOAD:")
-        proxy_logger.info(f"🆔 Processing unique demo request: {request_id}")
-        proxy_logger.info(f"📊 Complete payload: {json.dumps(data, indent=2, default=str)}")
-        proxy_logger.info("📋 Field analysis:")
-        proxy_logger.info(f"  - Total fields: {len(data)}")
-        proxy_logger.info(f"  - Name/Full Name: '{data.get('name', 'MISSING')}' / '{data.get('full_name', 'MISSING')}'")
-        proxy_logger.info(f"  - Email/Work Email: '{data.get('email', 'MISSING')}' / '{data.get('work_email', 'MISSING')}'")
-        proxy_logger.info(f"  - Company/Company Name: '{data.get('company', 'MISSING')}' / '{data.get('company_name', 'MISSING')}'")
-        proxy_logger.info(f"  - Phone: '{data.get('phone', 'MISSING')}' (type: {type(data.get('phone'))})")
-        proxy_logger.info(f"  - Website: '{data.get('website', 'MISSING')}' (type: {type(data.get('website'))})")
-        proxy_logger.info(f"  - Message: '{data.get('message', 'MISSING')}' (type: {type(data.get('message'))})")
-        proxy_logger.info(f"  - Call Volume: {data.get('call_volume', 'MISSING')} (type: {type(data.get('call_volume'))})")
-        proxy_logger.info(f"  - Interaction Volume: {data.get('interaction_volume', 'MISSING')} (type: {type(data.get('interaction_volume'))})")
-        proxy_logger.info(f"  - Total Volume: {data.get('total_volume', 'MISSING')} (type: {type(data.get('total_volume'))})")
-        proxy_logger.info(f"  - Typical Range: '{data.get('typical_range', 'MISSING')}' (type: {type(data.get('typical_range'))})")
-        proxy_logger.info(f"  - Preferred Method: '{data.get('preferred_method', 'MISSING')}' (type: {type(data.get('preferred_method'))})")
-        
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now(timezone.utc).isoformat()
-        if 'source' not in data:
-            data['source'] = 'website_cta'
-            
-        result = await proxy_to_dashboard('/forms/demo-request', data, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
+                "data": item_result,
+                "mode": "dashboard_batch",
+                "status_code": response.status_code
+            })
         else:
-            # Store locally as backup
-            demo_data = {
-                **data,
-                "id": str(uuid.uuid4()),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "status": "proxy_failed",
-                "proxy_error": result['error']
-            }
-            await db.demo_fallback.insert_one(demo_data)
-            
-            return {
-                "success": True,
-                "message": "Demo request submitted successfully",
-                "id": demo_data["id"]
-            }
-            
-    except Exception as e:
-        logging.error(f"Demo request proxy error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
-
-@api_router.options("/proxy/roi-calculator")
-async def options_roi_calculator():
-    """Handle preflight OPTIONS request for ROI calculator"""
-    return {"status": "ok"}
+            results.append({
+                "success": False,
+                "error": item_result.get('error', 'Rejected by dashboard'),
+                "mode": "dashboard_batch_error",
+                "status_code": response.status_code
+            })
+    return results
 
-@api_router.post("/proxy/roi-calculator")
-async def proxy_roi_calculator(request: Request):
-    """Proxy ROI calculator to new CRM dashboard with cross-domain support"""
-    try:
-        data = await request.json()
-        
-        # Check for duplicate requests using idempotency
-        request_id = data.get("id")
-        if is_duplicate_request(request_id):
-            proxy_logger.warning(f"🚫 Duplicate ROI calculator request blocked: {request_id}")
-            return JSONResponse(
-                content={
-                    "success": False, 
-                    "error": "Duplicate request", 
-                    "message": "This ROI calculation was already submitted recently"
-                }, 
-                status_code=429
-            )
-        
-        # Comprehensive payload logging
-        proxy_logger.info("🔎 PROXY RECEIVED ROI CALCULATOR PAYLOAD:")
-        proxy_logger.info(f"🆔 Processing unique ROI request: {request_id}")
-        proxy_logger.info(f"📊 Complete payload: {json.dumps(data, indent=2, default=str)}")
-        proxy_logger.info("📋 Field analysis:")
-        proxy_logger.info(f"  - Total fields: {len(data)}")
-        proxy_logger.info(f"  - Email: '{data.get('email', 'MISSING')}' (type: {type(data.get('email'))})")
-        proxy_logger.info(f"  - Country: '{data.get('country', 'MISSING')}' (type: {type(data.get('country'))})")
-        proxy_logger.info(f"  - Call Volume: {data.get('call_volume', 'MISSING')} (type: {type(data.get('call_volume'))})")
-        proxy_logger.info(f"  - Interaction Volume: {data.get('interaction_volume', 'MISSING')} (type: {type(data.get('interaction_volume'))})")
-        proxy_logger.info(f"  - Monthly Volume: {data.get('monthly_volume', 'MISSING')} (type: {type(data.get('monthly_volume'))})")
-        proxy_logger.info(f"  - BPO Spending: {data.get('bpo_spending', 'MISSING')} (type: {type(data.get('bpo_spending'))})")
-        proxy_logger.info(f"  - SentraTech Spending: {data.get('sentratech_spending', 'MISSING')} (type: {type(data.get('sentratech_spending'))})")
-        proxy_logger.info(f"  - Monthly Savings: {data.get('monthly_savings', 'MISSING')} (type: {type(data.get('monthly_savings'))})")
-        proxy_logger.info(f"  - ROI Percentage: {data.get('roi_percentage', 'MISSING')} (type: {type(data.get('roi_percentage'))})")
-        proxy_logger.info(f"  - Cost Reduction: {data.get('cost_reduction', 'MISSING')} (type: {type(data.get('cost_reduction'))})")
-        proxy_logger.info(f"  - Bundles: {data.get('bundles', 'MISSING')} (type: {type(data.get('bundles'))})")
-        
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now(timezone.utc).isoformat()
-        
-        # Fix: Convert bundles from float to integer before sending to dashboard
-        # Dashboard validation expects bundles to be an integer, but frontend sends float
-        if 'bundles' in data and data['bundles'] is not None:
-            try:
-                # Convert float bundles to integer using round() for proper rounding
-                bundles_value = data['bundles']
-                if isinstance(bundles_value, (int, float)):
-                    data['bundles'] = int(round(bundles_value))
-                    proxy_logger.info(f"🔧 Converted bundles from {bundles_value} ({type(bundles_value)}) to {data['bundles']} (int)")
-            except (ValueError, TypeError) as e:
-                proxy_logger.warning(f"⚠️ Failed to convert bundles to integer: {e}, keeping original value")
-            
-        result = await proxy_to_dashboard('/forms/roi-calculator', data, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
-        else:
-            # Store locally as backup
-            roi_data = {
-                **data,
-                "id": str(uuid.uuid4()),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "status": "proxy_failed",
-                "proxy_error": result['error']
-            }
-            await db.roi_fallback.insert_one(roi_data)
-            
-            return {
-                "success": True,
-                "message": "ROI report submitted successfully",
-                "id": roi_data["id"]
-            }
-            
-    except Exception as e:
-        logging.error(f"ROI calculator proxy error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
+dashboard_batcher = MicroBatchForwarder(proxy_batch_to_dashboard)
 
-@api_router.options("/proxy/job-application")
-async def options_job_application():
-    """Handle preflight OPTIONS request for job application"""
-    return {"status": "ok"}
+async def forward_form_submission(spec: FormSpec, data: dict, original_headers: dict = None):
+    """Forward a form submission, coalescing bursty form types into bulk dashboard requests"""
+    if spec.batchable and spec.form_type in DASHBOARD_BATCH_FORMS:
+        return await dashboard_batcher.submit(spec.form_type, data)
+    return await proxy_to_dashboard(spec.endpoint, data, original_headers)
 
-@api_router.post("/proxy/job-application")
-async def proxy_job_application(request: Request):
-    """Proxy job application to new CRM dashboard with cross-domain support"""
-    try:
-        body = await request.json()
-        
-        # Check for duplicate requests using idempotency
-        request_id = body.get("id")
-        if is_duplicate_request(request_id):
-            proxy_logger.warning(f"🚫 Duplicate job application request blocked: {request_id}")
-            return JSONResponse(
-                content={
-                    "success": False, 
-                    "error": "Duplicate request", 
-                    "message": "This request was already submitted recently"
-                }, 
-                status_code=429
-            )
-        
-        # Enhanced logging for debugging (as requested)
-        print("🔎 Job Application payload:", body)
-        proxy_logger.info(f"🆔 Processing unique job application request: {request_id}")
-        
-        # Comprehensive payload logging for detailed analysis
-        proxy_logger.info("🔎 PROXY RECEIVED JOB APPLICATION PAYLOAD:")
-        proxy_logger.info(f"📊 Complete payload: {json.dumps(body, indent=2, default=str)}")
-        proxy_logger.info("📋 Field analysis:")
-        proxy_logger.info(f"  - Total fields: {len(body)}")
-        proxy_logger.info(f"  - Full Name: '{body.get('full_name', 'MISSING')}' (type: {type(body.get('full_name'))})")
-        proxy_logger.info(f"  - Email: '{body.get('email', 'MISSING')}' (type: {type(body.get('email'))})")
-        proxy_logger.info(f"  - Phone: '{body.get('phone', 'MISSING')}' (type: {type(body.get('phone'))})")
-        proxy_logger.info(f"  - Position Applied: '{body.get('position_applied', 'MISSING')}' (type: {type(body.get('position_applied'))})")
-        proxy_logger.info(f"  - Location: '{body.get('location', 'MISSING')}' (type: {type(body.get('location'))})")
-        proxy_logger.info(f"  - LinkedIn: '{body.get('linkedin_profile', 'MISSING')}' (type: {type(body.get('linkedin_profile'))})")
-        proxy_logger.info(f"  - Resume URL: '{body.get('resume_url', 'MISSING')}' (type: {type(body.get('resume_url'))})")
-        proxy_logger.info(f"  - Motivation: '{body.get('motivation', 'MISSING')}' (type: {type(body.get('motivation'))})")
-        proxy_logger.info(f"  - Cover Letter: '{body.get('cover_letter', 'MISSING')}' (type: {type(body.get('cover_letter'))})")
-        proxy_logger.info(f"  - Work Authorization: '{body.get('work_authorization', 'MISSING')}' (type: {type(body.get('work_authorization'))})")
-        proxy_logger.info(f"  - Preferred Shifts: '{body.get('preferred_shifts', 'MISSING')}' (type: {type(body.get('preferred_shifts'))})")
-        proxy_logger.info(f"  - Start Date: '{body.get('availability_start_date', 'MISSING')}' (type: {type(body.get('availability_start_date'))})")
-        
-        # Fix field name mappings for dashboard compatibility (similar to ROI calculator bundles fix)
-        if 'name' in body and 'full_name' not in body:
-            body['full_name'] = body['name']
-            proxy_logger.info(f"🔧 Mapped 'name' to 'full_name': {body['name']}")
-        
-        if 'position' in body and 'position_applied' not in body:
-            body['position_applied'] = body['position']
-            proxy_logger.info(f"🔧 Mapped 'position' to 'position_applied': {body['position']}")
-        
-        # Convert array shifts to strings before sending to dashboard (similar to ROI calculator bundles fix)
-        if 'work_shifts' in body and isinstance(body['work_shifts'], list):
-            original_value = body['work_shifts']
-            body['work_shifts'] = ','.join(body['work_shifts']) if body['work_shifts'] else ''
-            proxy_logger.info(f"🔧 Converted work_shifts from {original_value} ({type(original_value)}) to '{body['work_shifts']}' (string)")
-            
-        if 'preferred_shifts' in body and isinstance(body['preferred_shifts'], list):
-            original_value = body['preferred_shifts']
-            body['preferred_shifts'] = ','.join(body['preferred_shifts']) if body['preferred_shifts'] else ''
-            proxy_logger.info(f"🔧 Converted preferred_shifts from {original_value} ({type(original_value)}) to '{body['preferred_shifts']}' (string)")
-        
-        # Add missing required fields with default values
-        if 'work_authorization' not in body:
-            body['work_authorization'] = 'authorized'  # Default value for work authorization
-            proxy_logger.info(f"🔧 Added missing required field 'work_authorization': authorized")
-        
-        # Ensure required fields
-        if 'timestamp' not in body:
-            body['timestamp'] = datetime.now(timezone.utc).isoformat()
-        if 'source' not in body:
-            body['source'] = 'careers_page'
-        
-        # Use the centralized proxy function with proper configuration
-        result = await proxy_to_dashboard('/forms/job-application', body, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
-        else:
-            # Store locally as backup
-            job_data = {
-                **body,
-                "id": str(uuid.uuid4()),
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "status": "proxy_failed", 
-                "proxy_error": result['error']
-            }
-            await db.job_application_fallback.insert_one(job_data)
-            
-            return {
-                "success": True,
-                "message": "Job application submitted successfully",
-                "id": job_data["id"]
-            }
-            
-    except Exception as e:
-        logging.error(f"Job application proxy error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
+# NEW CRM DASHBOARD PROXY ENDPOINTS - Cross-domain integration with admin.sentratech.net
+# Every form is described in form_pipeline.PROXY_FORM_SPECS and served by one dispatcher
+form_dispatcher = FormDispatcher(PROXY_FORM_SPECS, forward=forward_form_submission, db=db, is_duplicate=is_duplicate_request)
 
-@api_router.options("/proxy/chat-message")
-async def options_chat_message():
-    """Handle preflight OPTIONS request for chat message"""
+async def options_proxy_form():
+    """Handle preflight OPTIONS request for proxied forms"""
     return {"status": "ok"}
 
-@api_router.post("/proxy/chat-message")
-async def proxy_chat_message(request: Request):
-    """Proxy chat message to new CRM dashboard with cross-domain support"""
-    try:
-        data = await request.json()
-        
-        if 'timestamp' not in data:
-            data['timestamp'] = datetime.now(timezone.utc).isoformat()
-            
-        result = await proxy_to_dashboard('/chat/message', data, dict(request.headers))
-        
-        if result['success']:
-            return result['data']
-        else:
-            # Return offline chat response as fallback
-            offline_response = {
-                "success": True,
-                "response": "Thank you for your message! Our AI system will help you find the right solution. Our team will follow up with you soon.",
-                "conversation_id": f"offline_{int(time.time() * 1000)}",
-                "mode": "offline"
-            }
-            return offline_response
-            
-    except Exception as e:
-        logging.error(f"Chat message proxy error: {str(e)}")
-        return {"success": False, "error": "Internal server error"}
+for form_spec in PROXY_FORM_SPECS:
+    route_name = form_spec.form_type.replace('-', '_')
+    api_router.add_api_route(f"/proxy/{form_spec.form_type}", options_proxy_form, methods=["OPTIONS"], name=f"options_{route_name}")
+    api_router.add_api_route(f"/proxy/{form_spec.form_type}", form_dispatcher.endpoint(form_spec.form_type), methods=["POST"], name=f"proxy_{route_name}")
 
 # Status endpoint for proxy monitoring
 @api_router.get("/proxy/status")
 async def get_proxy_status():
-    """Get proxy status and health"""
-    try:
-        # Test dashboard connectivity
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{DASHBOARD_BASE_URL}/health", headers={
-                "Origin": DASHBOARD_ORIGIN,
-                "User-Agent": "SentraTech-Backend/1.0"
-            })
-            dashboard_healthy = response.status_code == 200
-    except:
-        dashboard_healthy = False
-        
+    """Get proxy status and health (dashboard state from the background prober)"""
+    dashboard_healthy = health_prober.is_healthy("dashboard")
+    
     return {
         "proxy_service": "operational",
         "dashboard_connectivity": "healthy" if dashboard_healthy else "unavailable",
+        "dashboard_probe": health_prober.get_status("dashboard"),
         "dashboard_url": DASHBOARD_BASE_URL,
         "fallback_mode": "local_storage" if not dashboard_healthy else "none",
+        "forwarding": dashboard_client.get_stats(),
+        "upstream": upstream_metrics.get_stats(),
+        "forms": form_dispatcher.get_stats(),
+        "collect_log": collect_log.get_stats(),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
@@ -2007,7 +1711,7 @@ async def update_candidate_status(request: Request, status_update: CandidateStat
         # Update candidate status
         update_data = {
             "status": status_update.new_status,
-            "last_updated": datetime.now(timezone.utc).isoformat(),
+            "last_updated": datetime.now(timezone.utc),
             "updated_by": status_update.updated_by
         }
         
@@ -2021,7 +1725,7 @@ async def update_candidate_status(request: Request, status_update: CandidateStat
             "to_status": status_update.new_status,
             "notes": status_update.notes,
             "updated_by": status_update.updated_by,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }
         
         await db.job_applications.update_one(
@@ -2054,7 +1758,7 @@ async def update_candidate_status(request: Request, status_update: CandidateStat
                             "$push": {
                                 "email_notifications": {
                                     "status": status_update.new_status,
-                                    "sent_at": datetime.now(timezone.utc).isoformat(),
+                                    "sent_at": datetime.now(timezone.utc),
                                     "email": candidate["email"]
                                 }
                             }
@@ -2101,7 +1805,7 @@ async def schedule_interview(request: Request, interview_data: InterviewSchedule
             "interview_type": interview_data.interview_type,
             "notes": interview_data.notes,
             "calendar_event": calendar_event,
-            "scheduled_at": datetime.now(timezone.utc).isoformat(),
+            "scheduled_at": datetime.now(timezone.utc),
             "status": "scheduled"
         }
         
@@ -2111,7 +1815,7 @@ async def schedule_interview(request: Request, interview_data: InterviewSchedule
             "interview_datetime": interview_data.interview_datetime,
             "interviewer": interview_data.interviewer_email,
             "notes": interview_data.notes,
-            "timestamp": datetime.now(timezone.utc).isoformat()
+            "timestamp": datetime.now(timezone.utc)
         }
         
         await db.job_applications.update_one(
@@ -2120,7 +1824,7 @@ async def schedule_interview(request: Request, interview_data: InterviewSchedule
                 "$set": {
                     "status": "interview_scheduled",
                     "interview_event": interview_record,
-                    "last_updated": datetime.now(timezone.utc).isoformat()
+                    "last_updated": datetime.now(timezone.utc)
                 },
                 "$push": {"candidate_interactions": interaction}
             }
@@ -2157,7 +1861,7 @@ async def schedule_interview(request: Request, interview_data: InterviewSchedule
                         "$push": {
                             "email_notifications": {
                                 "status": "interview_scheduled",
-                                "sent_at": datetime.now(timezone.utc).isoformat(),
+                                "sent_at": datetime.now(timezone.utc),
                                 "email": candidate["email"]
                             }
                         }
@@ -2182,9 +1886,12 @@ async def schedule_interview(request: Request, interview_data: InterviewSchedule
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @api_router.get("/candidates")
-async def get_candidates(request: Request, status: Optional[str] = None, limit: int = 50, offset: int = 0):
+async def get_candidates(request: Request, status: Optional[str] = None, limit: int = 50,
+                         cursor: Optional[str] = None, include_total: bool = False, fields: Optional[str] = None):
     """
-    🔒 PROTECTED - Get candidates with filtering and pagination
+    🔒 PROTECTED - Get candidates with filtering and cursor pagination (pass next_cursor back as cursor)
+    
+    fields: comma-separated subset of the summary fields (all by default)
     """
     try:
         # Build query
@@ -2192,40 +1899,26 @@ async def get_candidates(request: Request, status: Optional[str] = None, limit:
         if status:
             query["status"] = status
         
-        # Get candidates with pagination
-        candidates = await db.job_applications.find(query).sort("created_at", -1).skip(offset).limit(limit).to_list(length=limit)
-        total_count = await db.job_applications.count_documents(query)
+        # Summary fields (including the array lengths) are computed by Mongo; created_at is the cursor key
+        requested = parse_fields(fields, allowed=CANDIDATE_SUMMARY_FIELDS) or list(CANDIDATE_SUMMARY_FIELDS)
+        summary = computed_projection(requested, CANDIDATE_SUMMARY_FIELDS, keep=["created_at"])
+        page = await DatabaseOptimizer.keyset_find("job_applications", query, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total, pipeline=[summary])
         
         # Format response
-        formatted_candidates = []
-        for candidate in candidates:
-            formatted_candidate = {
-                "id": candidate.get("id"),
-                "name": candidate.get("full_name", f"{candidate.get('first_name', '')} {candidate.get('last_name', '')}"),
-                "email": candidate.get("email"),
-                "phone": candidate.get("phone"),
-                "location": candidate.get("location"),
-                "position": candidate.get("position_applied", candidate.get("position", "Customer Support Specialist")),
-                "status": candidate.get("status", "received"),
-                "experience_years": candidate.get("experience_years"),
-                "created_at": candidate.get("created_at"),
-                "last_updated": candidate.get("last_updated"),
-                "has_interview": bool(candidate.get("interview_event")),
-                "interview_date": candidate.get("interview_event", {}).get("interview_datetime") if candidate.get("interview_event") else None,
-                "email_notifications_count": len(candidate.get("email_notifications", [])),
-                "interactions_count": len(candidate.get("candidate_interactions", []))
-            }
-            formatted_candidates.append(formatted_candidate)
+        formatted_candidates = [{name: candidate.get(name) for name in requested} for candidate in page["items"]]
         
         return {
             "status": "success",
             "candidates": formatted_candidates,
-            "total_count": total_count,
-            "offset": offset,
+            "total_count": page["total"],
             "limit": limit,
-            "has_more": (offset + limit) < total_count
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"]
         }
         
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Get candidates error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -2305,9 +1998,10 @@ class GoogleSheetsService:
             # Fallback to database storage
             try:
                 request_data = demo_request.dict()
-                request_data['timestamp'] = datetime.now(timezone.utc).isoformat()
+                request_data['timestamp'] = datetime.now(timezone.utc)
                 request_data['id'] = str(uuid.uuid4())
                 await db.demo_requests.insert_one(request_data)
+                await record_submission("demo_requests", request_data)
                 logger.info(f"Fallback: Saved demo request to MongoDB for {demo_request.email}")
                 return {
                     "success": True,
@@ -2407,10 +2101,11 @@ async def store_demo_request_optimized(demo_request: DemoRequest, reference_id:
             "call_volume": demo_request.call_volume,
             "interaction_volume": demo_request.interaction_volume,
             "message": demo_request.message,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": datetime.now(timezone.utc),
             "source": "website_form_optimized"
         }
         await db.demo_requests.insert_one(demo_record)
+        await record_submission("demo_requests", demo_record)
         return {"success": True}
     except Exception as e:
         logger.error(f"Optimized database storage failed: {str(e)}")
@@ -2425,7 +2120,7 @@ async def fallback_to_sheets(demo_request: DemoRequest, reference_id: str):
             # Update database record with sheets info
             await db.demo_requests.update_one(
                 {"id": reference_id},
-                {"$set": {"sheets_fallback": sheets_result, "sheets_timestamp": datetime.now(timezone.utc).isoformat()}}
+                {"$set": {"sheets_fallback": sheets_result, "sheets_timestamp": datetime.now(timezone.utc)}}
             )
         else:
             logger.warning(f"⚠️ Sheets fallback failed for {reference_id}: {sheets_result.get('message')}")
@@ -2573,7 +2268,6 @@ async def save_roi_calculation(request: ROISaveRequest):
         calculation_dict = calculation.dict()
         
         # Handle datetime serialization
-        calculation_dict['timestamp'] = calculation_dict['timestamp'].isoformat()
         
         # Save to database
         await db.roi_calculations.insert_one(calculation_dict)
@@ -2584,10 +2278,14 @@ async def save_roi_calculation(request: ROISaveRequest):
         raise HTTPException(status_code=400, detail=f"Error saving ROI calculation: {str(e)}")
 
 @api_router.get("/roi/calculations", response_model=List[ROICalculation])
-async def get_roi_calculations(limit: int = 100):
-    """Get recent ROI calculations"""
+async def get_roi_calculations(response: Response, limit: int = 100, cursor: Optional[str] = None,
+                               include_total: bool = False):
+    """Get recent ROI calculations (next page cursor in the X-Next-Cursor header)"""
     try:
-        calculations = await db.roi_calculations.find().sort("timestamp", -1).limit(limit).to_list(limit)
+        page = await DatabaseOptimizer.keyset_find("roi_calculations", {}, "timestamp", limit=limit,
+                                                   cursor=cursor, include_total=include_total)
+        set_page_headers(response, page)
+        calculations = page["items"]
         
         # Handle datetime parsing
         for calc in calculations:
@@ -2595,6 +2293,8 @@ async def get_roi_calculations(limit: int = 100):
                 calc['timestamp'] = datetime.fromisoformat(calc['timestamp'])
         
         return [ROICalculation(**calc) for calc in calculations]
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching ROI calculations: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Error fetching ROI calculations: {str(e)}")
@@ -2661,17 +2361,21 @@ async def create_demo_request(
         raise HTTPException(status_code=500, detail="Failed to process demo request. Please try again.")
 
 @api_router.get("/demo/requests")
-async def get_demo_requests(limit: int = 50):
+async def get_demo_requests(limit: int = 50, cursor: Optional[str] = None, include_total: bool = False):
     """Get recent demo requests for admin/debugging purposes"""
     try:
-        cursor = db.demo_requests.find({}).sort("timestamp", -1).limit(limit)
+        page = await DatabaseOptimizer.keyset_find("demo_requests", {}, "timestamp", limit=limit,
+                                                   cursor=cursor, include_total=include_total)
         demo_requests = []
-        async for doc in cursor:
+        for doc in page["items"]:
             # Convert ObjectId to string for JSON serialization
             if "_id" in doc:
                 doc["_id"] = str(doc["_id"])
             demo_requests.append(doc)
-        return {"success": True, "count": len(demo_requests), "requests": demo_requests}
+        return {"success": True, "count": len(demo_requests), "requests": demo_requests,
+                "next_cursor": page["next_cursor"], "has_more": page["has_more"], "total_count": page["total"]}
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error retrieving demo requests: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve demo requests")
@@ -2792,13 +2496,14 @@ async def submit_demo_request_form(
             "phone": clean_phone,
             "message": clean_message,
             "preferredDate": preferredDate,
-            "timestamp": timestamp.isoformat(),
+            "timestamp": timestamp,
             "client_ip": client_ip,
             "source": "demo_request_form",
             "sheets_status": sheets_result["success"]
         }
         
         await db.demo_requests.insert_one(demo_record)
+        await record_submission("demo_requests", demo_record)
         
         # Schedule email notifications as background tasks
         background_tasks.add_task(
@@ -2932,7 +2637,7 @@ async def websocket_endpoint_disabled(websocket: WebSocket, session_id: str):
             "content": "👋 Hello! I'm Sentra AI, your intelligent assistant for SentraTech. I can help you learn about our AI-powered customer support platform, pricing, features, ROI benefits, and answer any questions about how we can transform your customer support operations. What would you like to know?",
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
-        await websocket.send_text(json.dumps(welcome_message))
+        await websocket.send_text(fast_json.dumps_str(welcome_message))
         
         while True:
             # Receive message from client
@@ -2966,7 +2671,7 @@ async def websocket_endpoint_disabled(websocket: WebSocket, session_id: str):
                         "sender": "assistant",
                         "timestamp": ai_message.timestamp.isoformat()
                     }
-                    await websocket.send_text(json.dumps(response_message))
+                    await websocket.send_text(fast_json.dumps_str(response_message))
                     
             elif message_data.get("type") == "ping":
                 # Respond to ping to keep connection alive
@@ -2974,7 +2679,7 @@ async def websocket_endpoint_disabled(websocket: WebSocket, session_id: str):
                     "type": "pong",
                     "timestamp": datetime.now(timezone.utc).isoformat()
                 }
-                await websocket.send_text(json.dumps(pong_message))
+                await websocket.send_text(fast_json.dumps_str(pong_message))
                 
     except WebSocketDisconnect:
         connection_manager.disconnect(session_id)
@@ -3090,29 +2795,43 @@ class MetricsService:
     async def save_metric_snapshot(self, snapshot: MetricSnapshot):
         """Save metrics snapshot to database for historical analysis"""
         snapshot_dict = snapshot.dict()
-        snapshot_dict['timestamp'] = snapshot_dict['timestamp'].isoformat()
+        snapshot_dict["source"] = "metrics_live"  # Time-series metaField
         await db.metrics_snapshots.insert_one(snapshot_dict)
     
+    @staticmethod
+    def history_pipeline(metric_name: str, start_time: datetime, unit: str, bin_size: int) -> List[Dict]:
+        """Average of one metric per time bucket; metrics_snapshots is a time-series collection on timestamp"""
+        return [
+            {"$match": {"timestamp": {"$gte": start_time}}},
+            {"$group": {
+                "_id": {"$dateTrunc": {"date": "$timestamp", "unit": unit, "binSize": bin_size}},
+                "value": {"$avg": f"${metric_name}"}
+            }},
+            {"$match": {"value": {"$ne": None}}},
+            {"$sort": {"_id": 1}}
+        ]
+    
     async def get_metrics_history(self, metric_name: str, timeframe: str = "24h") -> MetricsHistory:
         """Get historical metrics data"""
         # Calculate time range
         hours_map = {"1h": 1, "24h": 24, "7d": 168, "30d": 720}
         hours = hours_map.get(timeframe, 24)
+        # Bucket width per timeframe keeps every series to at most ~120 points
+        unit, bin_size = {"1h": ("minute", 1), "24h": ("minute", 15), "7d": ("hour", 2), "30d": ("hour", 6)}.get(timeframe, ("minute", 15))
         
         start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
         
-        # Query database for historical data
-        cursor = db.metrics_snapshots.find({
-            "timestamp": {"$gte": start_time.isoformat()},
-        }).sort("timestamp", 1)
-        
         values = []
         timestamps = []
         
-        async for doc in cursor:
-            if metric_name in doc:
-                values.append(doc[metric_name])
-                timestamps.append(doc["timestamp"])
+        # Query database for historical data (only snapshot measurements can be charted)
+        if metric_name in HISTORY_METRICS:
+            buckets = await DatabaseOptimizer.aggregate_with_optimization(
+                "metrics_snapshots", self.history_pipeline(metric_name, start_time, unit, bin_size)
+            )
+            for bucket in buckets:
+                values.append(bucket["value"])
+                timestamps.append(as_iso(bucket["_id"]))
         
         # If no data, generate sample data
         if not values:
@@ -3131,6 +2850,9 @@ class MetricsService:
             timeframe=timeframe
         )
 
+# Numeric MetricSnapshot fields that /api/metrics/history can chart
+HISTORY_METRICS = [name for name in MetricSnapshot.model_fields if name not in ("id", "timestamp")]
+
 # Initialize metrics service
 metrics_service = MetricsService()
 
@@ -3198,7 +2920,7 @@ async def websocket_metrics_endpoint_disabled(websocket: WebSocket):
             metrics_dict = metrics.dict()
             metrics_dict['timestamp'] = metrics_dict['timestamp'].isoformat()
             
-            await websocket.send_text(json.dumps({
+            await websocket.send_text(fast_json.dumps_str({
                 "type": "metrics_update",
                 "data": metrics_dict
             }))
@@ -3282,8 +3004,9 @@ class AnalyticsStats(BaseModel):
 
 # Analytics & Tracking Service
 class AnalyticsService:
-    def __init__(self):
+    def __init__(self, writer: WriteBehindWriter):
         self.session_data = {}  # In-memory session tracking
+        self.writer = writer  # Events are written behind, in batches per collection
         
     def parse_user_agent(self, user_agent: str) -> Dict[str, str]:
         """Parse user agent to extract browser, OS, and device info"""
@@ -3353,8 +3076,8 @@ class AnalyticsService:
             
             # Save to database
             page_view_dict = page_view.dict()
-            page_view_dict['timestamp'] = page_view_dict['timestamp'].isoformat()
-            await db.page_views.insert_one(page_view_dict)
+            if not await self.writer.put('page_views', page_view_dict):
+                return {"success": False, "error": "Analytics buffer full"}
             
             # Update session data
             self.session_data[analytics_data.session_id] = {
@@ -3385,8 +3108,8 @@ class AnalyticsService:
             
             # Save to database
             interaction_dict = interaction.dict()
-            interaction_dict['timestamp'] = interaction_dict['timestamp'].isoformat()
-            await db.user_interactions.insert_one(interaction_dict)
+            if not await self.writer.put('user_interactions', interaction_dict):
+                return {"success": False, "error": "Analytics buffer full"}
             
             logger.info(f"User interaction tracked: {analytics_data.event_type} - Session: {analytics_data.session_id}")
             return {"success": True, "interaction_id": interaction.id}
@@ -3412,8 +3135,8 @@ class AnalyticsService:
             
             # Save to database
             conversion_dict = conversion.dict()
-            conversion_dict['timestamp'] = conversion_dict['timestamp'].isoformat()
-            await db.conversion_events.insert_one(conversion_dict)
+            if not await self.writer.put('conversion_events', conversion_dict):
+                return {"success": False, "error": "Analytics buffer full"}
             
             logger.info(f"Conversion tracked: {event_name} - Session: {session_id}")
             return {"success": True, "conversion_id": conversion.id}
@@ -3422,6 +3145,25 @@ class AnalyticsService:
             logger.error(f"Error tracking conversion: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    @staticmethod
+    def stats_pipeline(start_time: datetime, top_pages: int = 5) -> List[Dict]:
+        """Page-view totals, unique sessions, devices and top pages computed in one server-side pass"""
+        return [
+            {"$match": date_range("timestamp", start_time)},
+            # Only these fields are read, so the (timestamp, session_id, device_type, page_path) index covers the scan
+            {"$project": {"_id": 0, "session_id": 1, "device_type": 1, "page_path": 1}},
+            {"$facet": {
+                "totals": [{"$count": "views"}],
+                "sessions": [{"$group": {"_id": "$session_id"}}, {"$count": "unique"}],
+                "devices": [{"$group": {"_id": {"$ifNull": ["$device_type", "desktop"]}, "count": {"$sum": 1}}}],
+                "top_pages": [
+                    {"$group": {"_id": {"$ifNull": ["$page_path", "/"]}, "views": {"$sum": 1}}},
+                    {"$sort": {"views": -1, "_id": 1}},
+                    {"$limit": top_pages}
+                ]
+            }}
+        ]
+    
     async def get_analytics_stats(self, timeframe: str = "24h") -> AnalyticsStats:
         """Get analytics statistics"""
         try:
@@ -3430,36 +3172,33 @@ class AnalyticsService:
             hours = hours_map.get(timeframe, 24)
             start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
             
-            # Get page views
-            page_views_cursor = db.page_views.find({
-                "timestamp": {"$gte": start_time.isoformat()}
-            })
-            
-            page_views = []
-            unique_sessions = set()
-            device_breakdown = {"desktop": 0, "mobile": 0, "tablet": 0}
-            page_counts = {}
-            
-            async for pv in page_views_cursor:
-                page_views.append(pv)
-                unique_sessions.add(pv["session_id"])
-                device_breakdown[pv.get("device_type", "desktop")] += 1
-                page_counts[pv.get("page_path", "/")] = page_counts.get(pv.get("page_path", "/"), 0) + 1
-            
-            # Calculate top pages
-            top_pages = [
-                {"page": path, "views": count}
-                for path, count in sorted(page_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-            ]
-            
-            # Get conversions
-            conversions_count = await db.conversion_events.count_documents({
-                "timestamp": {"$gte": start_time.isoformat()}
-            })
+            if hours > 1 and await rollup_store.ready():
+                # Longer windows read pre-aggregated hourly/daily buckets instead of the raw events
+                summary = await rollup_store.analytics_summary(hours)
+                total_page_views = summary["page_views"]
+                unique_visitors = summary["unique_sessions"]
+                device_breakdown = summary["devices"]
+                top_pages = summary["top_pages"]
+                conversions_count = summary["conversions"]
+            else:
+                # Aggregate page views on the server; only the summary crosses the wire
+                results = await DatabaseOptimizer.aggregate_with_optimization("page_views", self.stats_pipeline(start_time))
+                facets = results[0] if results else {}
+                totals = facets.get("totals") or [{"views": 0}]
+                sessions = facets.get("sessions") or [{"unique": 0}]
+                
+                device_breakdown = {"desktop": 0, "mobile": 0, "tablet": 0}
+                for device in facets.get("devices", []):
+                    device_breakdown[device["_id"]] = device["count"]
+                
+                top_pages = [{"page": page["_id"], "views": page["views"]} for page in facets.get("top_pages", [])]
+                
+                # Get conversions
+                conversions_count = await db.conversion_events.count_documents(date_range("timestamp", start_time))
+                total_page_views = totals[0]["views"]
+                unique_visitors = sessions[0]["unique"]
             
             # Calculate metrics
-            total_page_views = len(page_views)
-            unique_visitors = len(unique_sessions)
             conversion_rate = (conversions_count / max(unique_visitors, 1)) * 100
             bounce_rate = 45.2  # Simulated for now
             avg_session_duration = 180.5  # Simulated for now
@@ -3490,7 +3229,8 @@ class AnalyticsService:
             )
 
 # Initialize analytics service
-analytics_service = AnalyticsService()
+analytics_writer = WriteBehindWriter(DatabaseOptimizer.bulk_insert, on_written=rollup_store.apply)
+analytics_service = AnalyticsService(analytics_writer)
 
 # Analytics API Endpoints
 @api_router.post("/analytics/track")
@@ -3535,6 +3275,11 @@ async def get_analytics_statistics(timeframe: str = "24h"):
         logger.error(f"Error getting analytics stats: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get analytics stats")
 
+@api_router.get("/analytics/write-behind/status")
+async def get_analytics_write_behind_status():
+    """Buffered analytics writes: flushes, batch sizes and dropped events per collection"""
+    return {**analytics_writer.get_stats(), "timestamp": datetime.now(timezone.utc).isoformat()}
+
 @api_router.get("/analytics/performance")
 async def get_performance_metrics(timeframe: str = "24h"):
     """Get performance metrics"""
@@ -3544,26 +3289,31 @@ async def get_performance_metrics(timeframe: str = "24h"):
         hours = hours_map.get(timeframe, 24)
         start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
         
-        # Get performance data
-        perf_cursor = db.performance_metrics.find({
-            "timestamp": {"$gte": start_time.isoformat()}
-        })
-        
-        metrics_data = {"page_load_times": [], "api_response_times": []}
-        async for metric in perf_cursor:
-            if metric.get("metric_name") == "page_load_time":
-                metrics_data["page_load_times"].append(metric.get("metric_value", 0))
-            elif metric.get("metric_name") == "api_response_time":
-                metrics_data["api_response_times"].append(metric.get("metric_value", 0))
+        metrics_data = {"page_load_time": {"count": 0, "sum": 0}, "api_response_time": {"count": 0, "sum": 0}}
+        if hours > 1 and await rollup_store.ready():
+            # Per-metric count and sum from the hourly/daily buckets
+            for metric_name, totals in (await rollup_store.performance_summary(hours)).items():
+                if metric_name in metrics_data:
+                    metrics_data[metric_name] = totals
+        else:
+            # Count and sum per metric in the time-series collection (metric_name is its metaField)
+            totals = await DatabaseOptimizer.aggregate_with_optimization("performance_metrics", [
+                {"$match": {"metric_name": {"$in": list(metrics_data)}, "timestamp": {"$gte": start_time}}},
+                {"$group": {"_id": "$metric_name", "count": {"$sum": 1}, "sum": {"$sum": {"$ifNull": ["$metric_value", 0]}}}}
+            ])
+            for metric in totals:
+                metrics_data[metric["_id"]] = {"count": metric["count"], "sum": metric["sum"]}
         
         # Calculate averages
-        avg_page_load = sum(metrics_data["page_load_times"]) / len(metrics_data["page_load_times"]) if metrics_data["page_load_times"] else 2.1
-        avg_api_response = sum(metrics_data["api_response_times"]) / len(metrics_data["api_response_times"]) if metrics_data["api_response_times"] else 45.3
+        page_loads = metrics_data["page_load_time"]
+        api_responses = metrics_data["api_response_time"]
+        avg_page_load = page_loads["sum"] / page_loads["count"] if page_loads["count"] else 2.1
+        avg_api_response = api_responses["sum"] / api_responses["count"] if api_responses["count"] else 45.3
         
         return {
             "avg_page_load_time": round(avg_page_load, 2),
             "avg_api_response_time": round(avg_api_response, 2),
-            "total_requests": len(metrics_data["page_load_times"]) + len(metrics_data["api_response_times"]),
+            "total_requests": page_loads["count"] + api_responses["count"],
             "performance_score": min(100, max(0, 100 - (avg_page_load * 10) - (avg_api_response / 2)))
         }
         
@@ -3724,15 +3474,19 @@ async def reset_password(password_reset_confirm: PasswordResetConfirm):
 
 @api_router.get("/users", response_model=List[UserResponse])
 async def get_all_users(
-    skip: int = 0,
+    response: Response,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     admin_user: dict = Depends(get_admin_user)
 ):
-    """Get all users (admin only)"""
+    """Get all users, newest first (admin only; next page cursor in the X-Next-Cursor header)"""
     try:
-        cursor = db.users.find({}).skip(skip).limit(limit)
+        page = await DatabaseOptimizer.keyset_find("users", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total)
+        set_page_headers(response, page)
         users = []
-        async for user_doc in cursor:
+        for user_doc in page["items"]:
             user_data = {k: v for k, v in user_doc.items() if k != 'password_hash'}
             if isinstance(user_data.get('created_at'), str):
                 user_data['created_at'] = datetime.fromisoformat(user_data['created_at'].replace('Z', '+00:00'))
@@ -3741,6 +3495,8 @@ async def get_all_users(
             users.append(UserResponse(**user_data))
         
         return users
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting users: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get users")
@@ -3786,7 +3542,7 @@ async def update_user_role(
         
         await db.users.update_one(
             {"id": user_id},
-            {"$set": {"role": role, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"role": role, "updated_at": datetime.now(timezone.utc)}}
         )
         
         return {"message": f"User role updated to {role}"}
@@ -3810,7 +3566,7 @@ async def update_user_status(
         
         await db.users.update_one(
             {"id": user_id},
-            {"$set": {"is_active": is_active, "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {"$set": {"is_active": is_active, "updated_at": datetime.now(timezone.utc)}}
         )
         
         status_text = "activated" if is_active else "deactivated"
@@ -3852,7 +3608,7 @@ async def request_data_export_or_deletion(request: DataExportRequest):
             "email": request.email,
             "request_type": request.request_type,
             "status": "pending",
-            "created_at": timestamp.isoformat(),
+            "created_at": timestamp,
             "ip_address": "anonymized",  # IP anonymization for privacy
             "verification_token": str(uuid.uuid4())
         }
@@ -3924,7 +3680,7 @@ async def verify_privacy_request(request_id: str, verification_token: str):
             {
                 "$set": {
                     "status": "verified",
-                    "verified_at": datetime.now(timezone.utc).isoformat()
+                    "verified_at": datetime.now(timezone.utc)
                 }
             }
         )
@@ -3975,6 +3731,8 @@ async def perform_data_deletion(email: str):
             try:
                 result = await db[collection].delete_many({"email": email})
                 deletion_results[collection] = result.deleted_count
+                if collection in SUBMISSION_COLLECTIONS:
+                    await submission_counters.increment(collection, -result.deleted_count)
                 logger.info(f"🗑️ Deleted {result.deleted_count} records from {collection} for {email}")
             except Exception as e:
                 logger.warning(f"⚠️ Could not clean collection {collection}: {str(e)}")
@@ -3985,7 +3743,7 @@ async def perform_data_deletion(email: str):
             "id": str(uuid.uuid4()),
             "action": "data_deletion",
             "email_hash": hash(email),  # Store hash instead of actual email
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": datetime.now(timezone.utc),
             "deletion_results": deletion_results
         }
         
@@ -4035,9 +3793,9 @@ async def prepare_data_export(email: str, request_id: str):
             "request_id": request_id,
             "email": email,
             "export_data": user_data,
-            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_at": datetime.now(timezone.utc),
             "status": "ready",
-            "expires_at": (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+            "expires_at": datetime.now(timezone.utc) + timedelta(days=30)
         }
         
         await db.data_exports.insert_one(export_record)
@@ -4058,9 +3816,9 @@ async def download_data_export(request_id: str):
         if not export_data:
             raise HTTPException(status_code=404, detail="Data export not found or expired")
         
-        # Check if export has expired
-        expires_at = datetime.fromisoformat(export_data.get("expires_at"))
-        if datetime.now(timezone.utc) > expires_at:
+        # Check if export has expired (the TTL index removes it, but its monitor only runs once a minute)
+        expires_at = as_datetime(export_data.get("expires_at"))
+        if expires_at is not None and datetime.now(timezone.utc) > expires_at:
             # Clean up expired export
             await db.data_exports.delete_one({"request_id": request_id})
             raise HTTPException(status_code=410, detail="Data export has expired")
@@ -4336,86 +4094,118 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
 
 
 # Dashboard-specific API endpoints
+def forms_list_body(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard list envelope; "total" stays the page size, "total_count" is the exact count when requested"""
+    return {
+        "success": True,
+        "items": page["items"],
+        "total": len(page["items"]),
+        "total_count": page["total"],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"]
+    }
+
 @api_router.get("/forms/demo-requests")
-async def get_dashboard_demo_requests():
-    """Get all demo requests for dashboard"""
+async def get_dashboard_demo_requests(limit: int = 100, cursor: Optional[str] = None, include_total: bool = False,
+                                      fields: Optional[str] = None):
+    """Get demo requests for dashboard, newest first, one cursor page at a time (fields= narrows each item)"""
     try:
-        demo_requests = await db.demo_requests.find().sort("created_at", -1).to_list(length=100)
-        return {
-            "success": True,
-            "items": demo_requests,
-            "total": len(demo_requests)
-        }
+        page = await DatabaseOptimizer.keyset_find("demo_requests", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total,
+                                                   projection=find_projection(fields, "demo_requests"))
+        return FastJSONResponse(forms_list_body(page))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching demo requests: {e}")
         return {"success": False, "error": "Failed to fetch demo requests"}
 
 @api_router.get("/forms/roi-reports")
-async def get_dashboard_roi_reports():
-    """Get all ROI reports for dashboard"""
+async def get_dashboard_roi_reports(limit: int = 100, cursor: Optional[str] = None, include_total: bool = False,
+                                    fields: Optional[str] = None):
+    """Get ROI reports for dashboard, newest first, one cursor page at a time (fields= narrows each item)"""
     try:
-        roi_reports = await db.roi_reports.find().sort("created_at", -1).to_list(length=100)
-        return {
-            "success": True,
-            "items": roi_reports,
-            "total": len(roi_reports)
-        }
+        page = await DatabaseOptimizer.keyset_find("roi_reports", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total,
+                                                   projection=find_projection(fields, "roi_reports"))
+        return FastJSONResponse(forms_list_body(page))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching ROI reports: {e}")
         return {"success": False, "error": "Failed to fetch ROI reports"}
 
 @api_router.get("/forms/contact-sales")
-async def get_dashboard_contact_sales():
-    """Get all contact sales for dashboard"""
+async def get_dashboard_contact_sales(limit: int = 100, cursor: Optional[str] = None, include_total: bool = False,
+                                      fields: Optional[str] = None):
+    """Get contact sales for dashboard, newest first, one cursor page at a time (fields= narrows each item)"""
     try:
-        contact_sales = await db.contact_requests.find().sort("created_at", -1).to_list(length=100)
-        return {
-            "success": True,
-            "items": contact_sales,
-            "total": len(contact_sales)
-        }
+        page = await DatabaseOptimizer.keyset_find("contact_requests", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total,
+                                                   projection=find_projection(fields, "contact_requests"))
+        return FastJSONResponse(forms_list_body(page))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching contact sales: {e}")
         return {"success": False, "error": "Failed to fetch contact sales"}
 
 @api_router.get("/forms/newsletter-subscribers")
-async def get_dashboard_newsletter_subscribers():
-    """Get all newsletter subscribers for dashboard"""
+async def get_dashboard_newsletter_subscribers(limit: int = 100, cursor: Optional[str] = None, include_total: bool = False,
+                                               fields: Optional[str] = None):
+    """Get newsletter subscribers for dashboard, newest first, one cursor page at a time (fields= narrows each item)"""
     try:
-        subscribers = await db.subscriptions.find().sort("created_at", -1).to_list(length=100)
-        return {
-            "success": True,
-            "items": subscribers,
-            "total": len(subscribers)
-        }
+        page = await DatabaseOptimizer.keyset_find("subscriptions", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total,
+                                                   projection=find_projection(fields, "subscriptions"))
+        return FastJSONResponse(forms_list_body(page))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching newsletter subscribers: {e}")
         return {"success": False, "error": "Failed to fetch newsletter subscribers"}
 
 @api_router.get("/forms/job-applications")
-async def get_dashboard_job_applications():
-    """Get all job applications for dashboard"""
+async def get_dashboard_job_applications(limit: int = 100, cursor: Optional[str] = None, include_total: bool = False,
+                                         fields: Optional[str] = None):
+    """Get job applications for dashboard, newest first, one cursor page at a time (fields= narrows each item)"""
     try:
-        applications = await db.job_applications.find().sort("created_at", -1).to_list(length=100)
-        return {
-            "success": True,
-            "items": applications,
-            "total": len(applications)
-        }
+        page = await DatabaseOptimizer.keyset_find("job_applications", {}, "created_at", limit=limit,
+                                                   cursor=cursor, include_total=include_total,
+                                                   projection=find_projection(fields, "job_applications"))
+        return FastJSONResponse(forms_list_body(page))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error fetching job applications: {e}")
         return {"success": False, "error": "Failed to fetch job applications"}
 
 @api_router.get("/dashboard/stats")
-async def get_dashboard_statistics():
-    """Get overall dashboard statistics"""
+async def get_dashboard_statistics(timeframe: Optional[str] = None):
+    """Get overall dashboard statistics (all time, or the last 1h/24h/7d/30d)"""
     try:
+        hours_map = {"1h": 1, "24h": 24, "7d": 168, "30d": 720}
+        hours = hours_map.get(timeframe) if timeframe else None
+        if hours is None:
+            counts = await submission_counters.get_counts()
+        elif hours > 1 and await rollup_store.ready():
+            counts = await rollup_store.submission_counts(hours)
+        else:
+            start_time = datetime.now(timezone.utc) - timedelta(hours=hours)
+            query = date_range("created_at", start_time)
+            # Fallback-path demo requests only carry timestamp
+            demo_query = {"$or": [query, date_range("timestamp", start_time)]}
+            results = await asyncio.gather(*(
+                db[name].count_documents(demo_query if name == "demo_requests" else query) for name in SUBMISSION_COLLECTIONS
+            ))
+            counts = dict(zip(SUBMISSION_COLLECTIONS, results))
+        
         stats = {}
-        stats['demo_requests'] = await db.demo_requests.count_documents({})
-        stats['roi_reports'] = await db.roi_reports.count_documents({})
-        stats['contact_sales'] = await db.contact_requests.count_documents({})
-        stats['newsletter_subscribers'] = await db.subscriptions.count_documents({})
-        stats['job_applications'] = await db.job_applications.count_documents({})
+        stats['demo_requests'] = counts['demo_requests']
+        stats['roi_reports'] = counts['roi_reports']
+        stats['contact_sales'] = counts['contact_requests']
+        stats['newsletter_subscribers'] = counts['subscriptions']
+        stats['job_applications'] = counts['job_applications']
         stats['total_submissions'] = sum(stats.values())
         
         return {
@@ -4490,34 +4280,29 @@ async def root_health_check():
 
 @app.get("/readiness")
 async def readiness_check():
-    """Kubernetes readiness probe endpoint"""
-    try:
-        # More thorough check for readiness
-        await client.admin.command('ping')
-        
-        # Verify key collections exist and are accessible
-        collections_check = {}
-        required_collections = ["demo_requests", "contact_requests", "roi_reports", "subscriptions"]
-        
-        for collection_name in required_collections:
-            try:
-                # Check if collection is accessible (don't create if it doesn't exist)
-                await db[collection_name].count_documents({}, limit=1)
-                collections_check[collection_name] = "accessible"
-            except Exception:
-                # Collection might not exist yet, which is fine for new deployments
-                collections_check[collection_name] = "not_found_but_ok"
-        
-        return {
-            "status": "ready",
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "database": "connected",
-            "collections": collections_check,
-            "service": "sentratech-api"
-        }
-    except Exception as e:
-        logger.error(f"Readiness check failed: {str(e)}")
-        raise HTTPException(status_code=503, detail=f"Service not ready: {str(e)}")
+    """Kubernetes readiness probe endpoint (answers from the background prober)"""
+    database_healthy = health_prober.is_healthy("mongodb")
+    if not database_healthy:
+        database_status = health_prober.get_status("mongodb")
+        detail = database_status["last_error"] or "database not probed yet"
+        logger.error(f"Readiness check failed: {detail}")
+        raise HTTPException(status_code=503, detail=f"Service not ready: {detail}")
+    
+    # Verify key collections exist (missing ones are fine for new deployments)
+    existing_collections = set(health_prober.get_details("mongodb").get("collections", []))
+    required_collections = ["demo_requests", "contact_requests", "roi_reports", "subscriptions"]
+    collections_check = {
+        collection_name: "accessible" if collection_name in existing_collections else "not_found_but_ok"
+        for collection_name in required_collections
+    }
+    
+    return {
+        "status": "ready",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database": "connected",
+        "collections": collections_check,
+        "service": "sentratech-api"
+    }
 
 # Include enterprise proxy router
 # Include enterprise proxy router
@@ -4613,9 +4398,42 @@ async def dashboard_job_application(request: Request):
     """
     return await handle_dashboard_form_submission("job-application", request)
 
-async def handle_dashboard_form_submission(form_type: str, request: Request):
+@app.post("/api/forms/newsletter-signup/bulk")
+async def dashboard_newsletter_signup_bulk(request: Request):
+    """
+    Batched Newsletter Signup submissions: https://admin.sentratech.net/api/forms/newsletter-signup/bulk
+    """
+    return await handle_dashboard_form_submission("newsletter-signup", request, bulk=True)
+
+@app.post("/api/forms/roi-calculator/bulk")
+async def dashboard_roi_calculator_bulk(request: Request):
+    """
+    Batched ROI Calculator submissions: https://admin.sentratech.net/api/forms/roi-calculator/bulk
+    """
+    return await handle_dashboard_form_submission("roi-calculator", request, bulk=True)
+
+def build_dashboard_document(form_type: str, body: dict, idempotency_key: Optional[str] = None) -> dict:
+    """Build the stored document for one dashboard form submission"""
+    document = {
+        'submissionId': body.get('submissionId'),
+        'timestamp': body.get('timestamp'),
+        'formType': form_type,
+        'source': body.get('source', 'unknown'),
+        'userAgent': body.get('userAgent'),
+        'ipAddress': body.get('ipAddress'),
+        'data': body.get('data', {}),
+        'processed': datetime.now(timezone.utc),
+        'status': 'received'
+    }
+    # Only set when present: the unique index is sparse, so documents without a key never collide
+    if idempotency_key:
+        document['idempotencyKey'] = idempotency_key
+    return document
+
+async def handle_dashboard_form_submission(form_type: str, request: Request, bulk: bool = False):
     """
     Enterprise handler for dashboard form submissions with API key validation
+    Bulk requests carry {"items": [...], "idempotencyKeys": [...]} and are stored with a single insert_many
     """
     try:
         # Validate API key
@@ -4623,45 +4441,112 @@ async def handle_dashboard_form_submission(form_type: str, request: Request):
         expected_key = os.getenv('EMERGENT_API_KEY')
         if not expected_key:
             raise ValueError("EMERGENT_API_KEY environment variable is required for production deployment")
-        
+
         if api_key != expected_key:
             logger.warning(f"Invalid API key for {form_type}: {api_key}")
             raise HTTPException(status_code=401, detail="Invalid API key")
-        
+
         # Parse request body
         if request.headers.get('content-type', '').startswith('application/json'):
             body = await request.json()
         else:
             form_data = await request.form()
             body = dict(form_data)
-        
-        # Extract metadata
-        submission_id = body.get('submissionId')
-        timestamp = body.get('timestamp')
-        form_data = body.get('data', {})
-        
-        # Store in database
-        document = {
-            'submissionId': submission_id,
-            'timestamp': timestamp,
-            'formType': form_type,
-            'source': body.get('source', 'unknown'),
-            'userAgent': body.get('userAgent'),
-            'ipAddress': body.get('ipAddress'),
-            'data': form_data,
-            'processed': datetime.now(timezone.utc),
-            'status': 'received'
-        }
-        
-        # Insert into appropriate collection
+
         collection_name = form_type.replace('-', '_')
-        await db[collection_name].insert_one(document)
-        
+
+        if bulk:
+            items = body.get('items')
+            if not isinstance(items, list) or not items:
+                raise HTTPException(status_code=400, detail="Bulk submission requires a non-empty 'items' list")
+
+            idempotency_keys = body.get('idempotencyKeys')
+            if not isinstance(idempotency_keys, list) or len(idempotency_keys) != len(items):
+                idempotency_keys = [None] * len(items)
+            documents = [build_dashboard_document(form_type, item, key) for item, key in zip(items, idempotency_keys)]
+
+            # Unordered insert so one bad document doesn't reject the whole batch
+            failed = {}
+            duplicates = set()
+            try:
+                await db[collection_name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    if write_error.get('code') == 11000:
+                        # Key already stored (replay of a batch that timed out after it was written)
+                        duplicates.add(write_error['index'])
+                    else:
+                        failed[write_error['index']] = write_error.get('errmsg', 'Write failed')
+
+            stored = len(documents) - len(failed) - len(duplicates)
+            logger.info(f"Stored {form_type} bulk submission: {stored}/{len(documents)} items, {len(duplicates)} duplicates")
+
+            results = []
+            for index, document in enumerate(documents):
+                if index in failed:
+                    results.append({'index': index, 'ack': False, 'submissionId': document['submissionId'], 'error': failed[index]})
+                    continue
+                if index in duplicates:
+                    results.append({'index': index, 'ack': True, 'duplicate': True, 'submissionId': document['submissionId']})
+                    continue
+                ack_tracker.resolve(document['submissionId'], 'dashboard_handler')
+                await ws_manager.notify_form_submission(form_type, document)
+                results.append({'index': index, 'ack': True, 'submissionId': document['submissionId']})
+
+            return JSONResponse(
+                status_code=200,
+                content={
+                    'ack': not failed,
+                    'count': len(documents),
+                    'results': results,
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'message': f'{form_type} bulk submission processed'
+                }
+            )
+
+        # Replayed forwards carry the key of the original attempt; store each key only once
+        idempotency_key = request.headers.get('Idempotency-Key')
+        document = build_dashboard_document(form_type, body, idempotency_key)
+        submission_id = document['submissionId']
+
+        if idempotency_key:
+            existing = await db[collection_name].find_one({'idempotencyKey': idempotency_key}, {'submissionId': 1})
+            if existing:
+                logger.info(f"Duplicate {form_type} submission ignored: {idempotency_key}")
+                return JSONResponse(
+                    status_code=200,
+                    content={
+                        'ack': True,
+                        'submissionId': existing.get('submissionId'),
+                        'duplicate': True,
+                        'timestamp': datetime.now(timezone.utc).isoformat(),
+                        'message': f'{form_type} submission already processed'
+                    }
+                )
+
+        # Insert into appropriate collection
+        try:
+            await db[collection_name].insert_one(document)
+        except DuplicateKeyError:
+            # Concurrent replay of the same key won the insert
+            logger.info(f"Duplicate {form_type} submission ignored: {idempotency_key}")
+            return JSONResponse(
+                status_code=200,
+                content={
+                    'ack': True,
+                    'submissionId': submission_id,
+                    'duplicate': True,
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'message': f'{form_type} submission already processed'
+                }
+            )
+
         logger.info(f"Stored {form_type} submission: {submission_id}")
-        
+        ack_tracker.resolve(submission_id, 'dashboard_handler')
+
         # Notify WebSocket clients in real-time
         await ws_manager.notify_form_submission(form_type, document)
-        
+
         # Return acknowledgment
         return JSONResponse(
             status_code=200,
@@ -4672,7 +4557,7 @@ async def handle_dashboard_form_submission(form_type: str, request: Request):
                 'message': f'{form_type} submission processed successfully'
             }
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -4694,6 +4579,7 @@ async def websocket_health():
 
 # In-memory dedupe store for idempotency
 collect_dedupe = {}
+PENDING_SUBMISSIONS_DIR = os.environ.get('PENDING_SUBMISSIONS_DIR', '/var/data/pending_submissions')
 COLLECT_IDEMPOTENCY_TTL_MS = 86400000  # 24 hours
 
 def clean_collect_dedupe():
@@ -4711,15 +4597,12 @@ def generate_trace_id():
     import string
     return 'trace-' + str(int(time.time() * 1000)) + '-' + ''.join(random.choices(string.ascii_lowercase + string.digits, k=9))
 
+# collect.log lines are buffered and appended in batches off the event loop
+collect_log = RotatingBatchWriter()
+
 def log_collect_line(obj):
     """Log collect request to file"""
-    import os
-    import json
-    log_dir = "/var/log/sentratech"
-    os.makedirs(log_dir, exist_ok=True)
-    line = json.dumps(obj)
-    with open(os.path.join(log_dir, 'collect.log'), 'a') as f:
-        f.write(line + '\n')
+    collect_log.write(obj)
 
 # Forward function (direct to ADMIN_DASHBOARD_URL) — use native fetch or node-fetch
 def get_dashboard_endpoint(payload):
@@ -4748,51 +4631,155 @@ def get_dashboard_endpoint(payload):
     # Fallback to newsletter
     return '/forms/newsletter-signup'
 
-async def forward_to_dashboard(payload):
-    """Forward payload directly to dashboard with retry logic"""
-    import httpx
-    import asyncio
-    
-    maxRetries = 3
-    backoff = 500
+def get_collect_forward_url(payload=None, endpoint=None):
+    """Full dashboard URL for a collect payload (or an already resolved endpoint)"""
     DASH_BASE_URL = os.environ.get('ADMIN_DASHBOARD_URL', 'https://admin.sentratech.net/api')
+    endpoint = endpoint or get_dashboard_endpoint(payload)
+    return f"{DASH_BASE_URL.rstrip('/api')}/api{endpoint}"
+
+def get_collect_forward_headers():
+    """Headers for collect forwards to the dashboard"""
     DASH_TOKEN = os.environ.get('DASHBOARD_API_KEY')
+    return {
+        'Content-Type': 'application/json',
+        # keep X-INGEST-KEY for current dashboard compatibility
+        'X-INGEST-KEY': DASH_TOKEN,
+        # add standard Authorization header for transition
+        'Authorization': f'Bearer {DASH_TOKEN}',
+        # add Origin header for CORS compliance
+        'Origin': 'https://sentratech.net'
+    }
+
+async def forward_to_dashboard(payload):
+    """Forward payload directly to dashboard with the shared retry policy"""
+    full_url = get_collect_forward_url(payload)
     
-    # Get the specific endpoint
-    endpoint = get_dashboard_endpoint(payload)
-    full_url = f"{DASH_BASE_URL.rstrip('/api')}/api{endpoint}"
+    try:
+        response = await dashboard_client.post(
+            full_url,
+            json=payload,
+            headers=get_collect_forward_headers(),
+            idempotency_key=payload.get('trace_id')
+        )
+        return {"ok": response.is_success, "status": response.status_code, "body": response.text, "endpoint": full_url}
+    except Exception as err:
+        return {"ok": False, "status": 0, "body": str(err), "endpoint": full_url}
+
+async def forward_raw_to_dashboard(raw_body: bytes, endpoint: str, metadata_headers: dict):
+    """Forward the untouched request bytes; collect metadata travels as headers"""
+    full_url = get_collect_forward_url(endpoint=endpoint)
     
-    for attempt in range(maxRetries):
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    full_url,
-                    json=payload,
-                    headers={
-                        'Content-Type': 'application/json',
-                        # keep X-INGEST-KEY for current dashboard compatibility
-                        'X-INGEST-KEY': DASH_TOKEN,
-                        # add standard Authorization header for transition
-                        'Authorization': f'Bearer {DASH_TOKEN}',
-                        # add Origin header for CORS compliance
-                        'Origin': 'https://sentratech.net'
-                    }
-                )
-                text = await response.aread()
-                return {"ok": response.is_success, "status": response.status_code, "body": text.decode(), "endpoint": full_url}
-        except Exception as err:
-            if attempt == maxRetries - 1:
-                return {"ok": False, "status": 0, "body": str(err), "endpoint": full_url}
-            await asyncio.sleep(backoff / 1000.0)  # Convert ms to seconds
-            backoff *= 3
+    try:
+        response = await dashboard_client.post(
+            full_url,
+            content=raw_body,
+            headers={**get_collect_forward_headers(), **metadata_headers},
+            idempotency_key=metadata_headers['X-Trace-Id']
+        )
+        return {"ok": response.is_success, "status": response.status_code, "body": response.text, "endpoint": full_url}
+    except Exception as err:
+        return {"ok": False, "status": 0, "body": str(err), "endpoint": full_url}
+
+# Failed collect forwards are appended to a segmented write-ahead log (one write, no new inode)
+submission_wal = SubmissionWAL(os.environ.get('SUBMISSION_WAL_DIR', os.path.join(PENDING_SUBMISSIONS_DIR, 'wal')))
+
+async def persist_pending_submission(payload, result, trace_id):
+    """Persist a failed collect payload for the replay worker (off the event loop, and never cancelled mid-write)"""
+    record = {"payload": payload, "forward_result": result, "parked_at": datetime.now(timezone.utc).isoformat()}
+    await asyncio.shield(asyncio.to_thread(submission_wal.append, record))
+
+# Passthrough mode: skip the parse/merge/re-serialize round trip for the request body.
+# Requests must carry X-Trace-Id; without it they take the parsed path, which honors a body trace_id
+COLLECT_PASSTHROUGH = os.environ.get('COLLECT_PASSTHROUGH', 'false').lower() == 'true'
+
+async def collect_passthrough(request: Request):
+    """
+    Forward the raw body to the dashboard without decoding it
+    Routing comes from the X-Form-Type header or ?form_type=; the body is only
+    parsed when neither is present, or when the forward fails and must be persisted.
+    The trace id comes from the X-Trace-Id header (collect_proxy only routes here when it is set)
+    """
+    raw_body = await request.body()
+    
+    trace_id = request.headers["x-trace-id"]
+    client_ip = request.headers.get("x-forwarded-for") or str(request.client.host)
+    user_agent = request.headers.get("user-agent", "")
+    received_at = datetime.now(timezone.utc).isoformat()
+    
+    # Idempotency check
+    clean_collect_dedupe()
+    if trace_id in collect_dedupe:
+        log_collect_line({
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "trace_id": trace_id,
+            "event": "duplicate_received"
+        })
+        return JSONResponse(
+            status_code=200,
+            content={"ok": True, "trace_id": trace_id, "note": "duplicate_ignored"}
+        )
+    collect_dedupe[trace_id] = time.time() * 1000
+    
+    payload = None
+    form_type = request.headers.get("x-form-type") or request.query_params.get("form_type")
+    if form_type:
+        endpoint = f"/forms/{form_type}"
+    else:
+        payload = fast_json.loads(raw_body)
+        endpoint = get_dashboard_endpoint(payload)
+    
+    metadata_headers = {
+        "X-Trace-Id": trace_id,
+        "X-Received-At": received_at,
+        "X-Client-IP": client_ip,
+        "X-Client-User-Agent": user_agent,
+        "X-Src": "site-proxy"
+    }
+    result = await forward_raw_to_dashboard(raw_body, endpoint, metadata_headers)
+    
+    log_collect_line({
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "trace_id": trace_id,
+        "client_ip": client_ip,
+        "endpoint": result.get("endpoint", "unknown"),
+        "mode": "passthrough",
+        "body_bytes": len(raw_body),
+        "upstream_status": result["status"],
+        "upstream_body": result["body"][:2048]
+    })
     
-    return {"ok": False, "status": 0, "body": "Max retries exceeded", "endpoint": full_url}
+    if result["ok"]:
+        return JSONResponse(
+            status_code=200,
+            content={"ok": True, "trace_id": trace_id}
+        )
+    
+    # Replay works on enriched JSON payloads, so only the failure path pays for a parse
+    if payload is None:
+        payload = fast_json.loads(raw_body)
+    await persist_pending_submission({
+        **payload,
+        **({"form_type": form_type} if form_type else {}),
+        "trace_id": trace_id,
+        "received_at": received_at,
+        "client_ip": client_ip,
+        "user_agent": user_agent,
+        "src": "site-proxy"
+    }, result, trace_id)
+    
+    return JSONResponse(
+        status_code=result["status"] if result["status"] > 0 else 502,
+        content={"ok": False, "trace_id": trace_id, "error": "forward_failed"}
+    )
 
 # Collect Proxy Route - Forward directly to dashboard
 @app.post("/api/collect")
 async def collect_proxy(request: Request):
     """Proxy form submissions directly to dashboard with idempotency and logging"""
     try:
+        if COLLECT_PASSTHROUGH and request.headers.get("x-trace-id"):
+            return await collect_passthrough(request)
+        
         # Parse incoming request
         body = await request.json()
         
@@ -4853,13 +4840,7 @@ async def collect_proxy(request: Request):
             )
         else:
             # Persist payload for later replay
-            import os
-            import json
-            pending_dir = "/var/data/pending_submissions"
-            os.makedirs(pending_dir, exist_ok=True)
-            fname = os.path.join(pending_dir, f"{int(time.time() * 1000)}_{trace_id}.json")
-            with open(fname, 'w') as f:
-                json.dump({"payload": payload, "forward_result": result}, f, indent=2)
+            await persist_pending_submission(payload, result, trace_id)
             
             return JSONResponse(
                 status_code=result["status"] if result["status"] > 0 else 502,
@@ -4873,6 +4854,138 @@ async def collect_proxy(request: Request):
             content={"ok": False, "error": "proxy_error", "trace_id": "unknown"}
         )
 
+# Replay of failed forwards (pending collect files + proxy fallback collections)
+def fallback_replay_request(endpoint: str):
+    """Build (url, headers) for replaying a fallback document to a dashboard form endpoint"""
+    def build_request(payload):
+        api_key = os.environ.get('DASHBOARD_API_KEY') or os.environ.get('EMERGENT_API_KEY')
+        return f"{DASHBOARD_BASE_URL}{endpoint}", {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Origin": DASHBOARD_ORIGIN,
+            "User-Agent": "SentraTech-Backend/1.0",
+            "X-INGEST-KEY": api_key
+        }
+    return build_request
+
+submission_reconciler = SubmissionReconciler(
+    sources=[
+        WalSource(
+            submission_wal,
+            lambda payload: (get_collect_forward_url(payload), get_collect_forward_headers())
+        ),
+        # Files written before the WAL existed
+        PendingFileSource(
+            PENDING_SUBMISSIONS_DIR,
+            lambda payload: (get_collect_forward_url(payload), get_collect_forward_headers())
+        ),
+        FallbackCollectionSource(db.contact_fallback, fallback_replay_request('/forms/contact-sales')),
+        FallbackCollectionSource(db.demo_fallback, fallback_replay_request('/forms/demo-request')),
+        FallbackCollectionSource(db.roi_fallback, fallback_replay_request('/forms/roi-calculator')),
+        FallbackCollectionSource(db.job_application_fallback, fallback_replay_request('/forms/job-application'))
+    ],
+    ledger=db.replay_ledger,
+    client=dashboard_client
+)
+
+# Background dependency probes; status endpoints read the cached state
+async def check_mongodb_health():
+    """Ping MongoDB and list collections for the readiness probe"""
+    await client.admin.command('ping')
+    return {"collections": await db.list_collection_names()}
+
+health_prober = HealthProber()
+health_prober.register("mongodb", check_mongodb_health)
+health_prober.register("dashboard", http_check(
+    dashboard_client.get_client,
+    f"{DASHBOARD_BASE_URL}/health",
+    headers={"Origin": DASHBOARD_ORIGIN, "User-Agent": "SentraTech-Backend/1.0"},
+    healthy_below=300
+))
+health_prober.register("smtp", tcp_check(email_service.smtp_host, email_service.smtp_port))
+# Any HTTP answer (even 401 without a key) means the LLM provider is reachable
+health_prober.register("llm_provider", http_check(
+    dashboard_client.get_client,
+    os.environ.get('LLM_HEALTH_URL', 'https://api.openai.com/v1/models')
+))
+
+@app.get("/api/proxy/replay/status")
+async def get_replay_status():
+    """Replay backlog size and drain rate for failed dashboard forwards"""
+    try:
+        stats = await submission_reconciler.get_stats()
+        return {**stats, "timestamp": datetime.now(timezone.utc).isoformat()}
+    except Exception as e:
+        logger.error(f"Error getting replay status: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get replay status")
+
+# Converts ISO-string timestamps from older writes to BSON dates in the background
+date_migration = DateMigration(db)
+# metrics_snapshots and performance_metrics as time-series collections with retention
+time_series_migration = TimeSeriesMigration(db)
+# Writes documents that are about to hit their TTL to gzipped NDJSON (when RETENTION_ARCHIVE_DIR is set)
+retention_archiver = RetentionArchiver(db)
+
+async def backfill_rollups_after_time_series():
+    """Rollups read performance_metrics history, so the time-series copy has to finish first"""
+    await time_series_migration.wait()
+    rollup_store.start_backfill()
+
+async def archive_then_apply_indexes():
+    """Archive first: a new TTL index deletes documents already past retention within a minute"""
+    if retention_archiver.enabled:
+        await retention_archiver.archive_once()
+    await ensure_database_indexes()
+
+async def apply_indexes_after_date_migration():
+    """TTL indexes of archived collections are deferred until their timestamps are all BSON dates"""
+    await date_migration.wait()
+    await archive_then_apply_indexes()
+
+@app.get("/api/migrations/dates/status")
+async def get_date_migration_status():
+    """Progress of the ISO-string to BSON date migration"""
+    return {**date_migration.get_stats(), "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@app.get("/api/migrations/time-series/status")
+async def get_time_series_migration_status():
+    """Time-series collection settings and progress of the legacy data copy"""
+    return {**time_series_migration.get_stats(), "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@app.get("/api/retention/status")
+async def get_retention_status():
+    """Retention periods per collection and archive progress"""
+    return {**retention_archiver.get_stats(), "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@app.get("/api/counters/status")
+async def get_counter_status():
+    """Submission counters: current totals and reconciliation corrections"""
+    return {
+        **submission_counters.get_stats(),
+        "counts": await submission_counters.get_counts(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@app.get("/api/rollups/status")
+async def get_rollup_status():
+    """Rollup maintenance: backfill state and live increments applied"""
+    return {**rollup_store.get_stats(), "timestamp": datetime.now(timezone.utc).isoformat()}
+
+@app.get("/internal/metrics")
+async def get_internal_metrics():
+    """Outbound upstream metrics in Prometheus text format (outside /api, so not routed publicly)"""
+    return PlainTextResponse(upstream_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# Per-request deadlines: innermost, so 504s still pass through the security and CORS headers
+app.add_middleware(
+    DeadlineMiddleware,
+    route_budgets_ms={
+        "/api/collect": int(os.getenv('COLLECT_DEADLINE_MS', '15000')),
+        "/api/proxy/": int(os.getenv('PROXY_DEADLINE_MS', '15000')),
+        "/api/proxy/status": int(os.getenv('PROXY_STATUS_DEADLINE_MS', '5000')),
+    }
+)
+
 # Add security middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
@@ -4882,6 +4995,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],  # Allow all headers for maximum compatibility
+    expose_headers=["X-Next-Cursor", "X-Has-More", "X-Total-Count"],  # Cursor pagination on array responses
 )
 
 @app.on_event("startup")
@@ -4898,8 +5012,15 @@ async def startup_db_client():
     else:
         logger.error(f"❌ Database connection failed: {health_status.get('error')}")
     
+    # Time-series collections have to exist before their indexes are applied
+    try:
+        await time_series_migration.prepare()
+        time_series_migration.start()
+    except Exception as e:
+        logger.error(f"❌ Time-series collection setup failed: {str(e)}")
+    
     # Create database indexes for optimal performance
-    await ensure_database_indexes()
+    await archive_then_apply_indexes()
     
     # Initialize cache warming for improved performance
     await warm_cache()
@@ -4907,11 +5028,48 @@ async def startup_db_client():
     # Start background cache maintenance
     asyncio.create_task(cache_maintenance())
     
+    # Start replaying submissions that failed to reach the dashboard
+    submission_reconciler.start()
+    collect_log.start()
+    
+    # Live rollup increments start before the analytics writer; history before this point is backfilled once
+    try:
+        await rollup_store.init()
+        if not await rollup_store.ready():
+            asyncio.create_task(backfill_rollups_after_time_series())
+    except Exception as e:
+        logger.error(f"❌ Rollup initialization failed: {str(e)}")
+    analytics_writer.start()
+    submission_counters.start()  # First reconciliation seeds the counters on a new deployment
+    if os.getenv('DATE_MIGRATION_ENABLED', 'true').lower() == 'true':
+        date_migration.start()
+        asyncio.create_task(apply_indexes_after_date_migration())
+    retention_archiver.start()
+    
+    # Start background dependency probes (first round runs immediately)
+    health_prober.start()
+    
     logger.info("🎯 SentraTech API server started successfully with performance optimizations")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Clean up database connections on shutdown"""
     logger.info("🔄 Shutting down SentraTech API server...")
+    
+    # Deliver any submissions still waiting in a batch window
+    await dashboard_batcher.close()
+    await submission_reconciler.stop()
+    await date_migration.stop()
+    await time_series_migration.stop()
+    await retention_archiver.stop()
+    await rollup_store.stop()
+    await submission_counters.stop()
+    await health_prober.stop()
+    await dashboard_client.aclose()
+    await collect_log.close()
+    submission_wal.close()
+    await analytics_writer.close()  # Before the Mongo client closes
+    
     client.close()
     logger.info("✅ Database connections closed")
+    stop_logging()  # Flush queued log records before the process exits
@@ -0,0 +1,149 @@
+"""
+Submission Counters for SentraTech
+Per-collection totals in a single counters document, updated with $inc on insert and delete and reconciled periodically
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+from bson_dates import utc_now
+from rollups import SUBMISSION_COLLECTIONS
+
+logger = logging.getLogger("submission_counters")
+
+COUNTERS_ID = 'submissions'
+
+
+class SubmissionCounters:
+    """
+    Exact submission totals without counting the collections
+
+    The counters document is read at most once per cache_ttl. A total only exists once
+    reconciliation has seeded it; until then $inc is a no-op and reads fall back to
+    estimated_document_count (collection metadata, no scan). Reconciliation recounts one
+    collection at a time and applies the difference as an $inc, so it never overwrites a
+    concurrent one. An insert counted just before its own $inc lands can leave a total off by
+    one until the next round.
+    """
+
+    def __init__(self, db, collections: Optional[List[str]] = None, reconcile_interval_s: Optional[int] = None,
+                 cache_ttl_ms: Optional[int] = None):
+        self.db = db
+        self.collections = collections or SUBMISSION_COLLECTIONS
+        self.reconcile_interval = reconcile_interval_s or int(os.getenv('COUNTERS_RECONCILE_INTERVAL_S', '3600'))
+        self.cache_ttl = (cache_ttl_ms if cache_ttl_ms is not None else int(os.getenv('COUNTERS_CACHE_MS', '1000'))) / 1000  # Convert to seconds
+        self.counters = db.counters
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+        # Counter statistics
+        self.increments = 0
+        self.increment_errors = 0
+        self.reconciliations = 0
+        self.corrections = 0
+        self.seeded = 0
+        self.estimated_reads = 0
+        self.last_reconciled_at: Optional[str] = None
+
+    async def increment(self, collection_name: str, amount: int = 1):
+        """Adjust a total after an insert (or a delete, with a negative amount); never raises"""
+        if not amount:
+            return
+        try:
+            # Only totals reconciliation has seeded; an unseeded one is still read as an estimate
+            result = await self.counters.update_one(
+                {'_id': COUNTERS_ID, collection_name: {'$exists': True}},
+                {'$inc': {collection_name: amount}}
+            )
+            if not result.matched_count:
+                return
+            self.increments += 1
+            if self._cached is not None and collection_name in self._cached:
+                self._cached[collection_name] += amount
+        except Exception as e:
+            # The next reconciliation corrects the total
+            self.increment_errors += 1
+            logger.error(f"Counter update for {collection_name} failed: {str(e)}")
+
+    async def get_counts(self) -> Dict[str, int]:
+        """Total documents per submission collection"""
+        if self._cached is None or time.time() - self._cached_at > self.cache_ttl:
+            self._cached = await self.counters.find_one({'_id': COUNTERS_ID}) or {}
+            self._cached_at = time.time()
+
+        missing = [name for name in self.collections if name not in self._cached]
+        estimates = {}
+        if missing:
+            self.estimated_reads += 1
+            results = await asyncio.gather(*(self.db[name].estimated_document_count() for name in missing))
+            estimates = dict(zip(missing, results))
+        return {name: self._cached.get(name, estimates.get(name, 0)) for name in self.collections}
+
+    async def count(self, collection_name: str) -> int:
+        return (await self.get_counts())[collection_name]
+
+    async def reconcile_collection(self, collection_name: str):
+        actual = await self.db[collection_name].count_documents({})
+        # Read after counting, so increments for documents the count already saw are included
+        before = (await self.counters.find_one({'_id': COUNTERS_ID}, {collection_name: 1}) or {}).get(collection_name)
+        if before is None:
+            await self.counters.update_one(
+                {'_id': COUNTERS_ID, collection_name: {'$exists': False}},
+                {'$set': {collection_name: actual}}
+            )
+            self.seeded += 1
+            logger.info(f"Counter for {collection_name} seeded at {actual}")
+        elif before != actual:
+            await self.counters.update_one({'_id': COUNTERS_ID}, {'$inc': {collection_name: actual - before}})
+            self.corrections += 1
+            logger.info(f"Counter for {collection_name} corrected by {actual - before:+d} to {actual}")
+
+    async def reconcile(self):
+        """Recount every collection and correct drifted totals"""
+        await self.counters.update_one({'_id': COUNTERS_ID}, {'$setOnInsert': {'created_at': utc_now()}}, upsert=True)
+        for collection_name in self.collections:
+            await self.reconcile_collection(collection_name)
+        self.reconciliations += 1
+        self.last_reconciled_at = utc_now().isoformat()
+        self._cached = None
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Counter reconciliation failed: {str(e)}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counter statistics"""
+        return {
+            'increments': self.increments,
+            'increment_errors': self.increment_errors,
+            'reconciliations': self.reconciliations,
+            'corrections': self.corrections,
+            'seeded': self.seeded,
+            'estimated_reads': self.estimated_reads,
+            'last_reconciled_at': self.last_reconciled_at
+        }
+
+
+__all__ = ['SubmissionCounters']
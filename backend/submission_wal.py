@@ -0,0 +1,293 @@
+"""
+Submission Write-Ahead Log for SentraTech
+Segmented append-only log of failed dashboard forwards, with per-record CRC32 and an index of replayed offsets
+
+Record layout: 4-byte big-endian length, 4-byte CRC32 of the body, then the JSON body.
+Index layout (replayed.idx): fixed 16-byte entries of (segment id, record offset).
+
+Inspect from the shell:
+    python submission_wal.py /var/data/pending_submissions/wal [--all]
+"""
+import argparse
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import logging
+
+import fast_json
+
+logger = logging.getLogger("submission_wal")
+
+RECORD_HEADER = struct.Struct('>II')  # Body length, CRC32 of body
+INDEX_ENTRY = struct.Struct('>QQ')  # Segment id, record offset
+SEGMENT_SUFFIX = '.wal'
+
+
+class SubmissionWAL:
+    """
+    Append-only segmented log; appends are one buffered write on an open handle
+
+    Segments roll over at max_segment_bytes. A sealed segment whose records have all been
+    replayed is deleted and its index entries compacted away. Reads stop at the first
+    torn or corrupt record of a segment (a crash mid-append), which is counted and skipped.
+
+    Methods block on disk I/O; call them from a worker thread (asyncio.to_thread). Appends and
+    index updates take separate locks, so an append never waits for an index compaction.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: Optional[int] = None, fsync: Optional[bool] = None):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes or int(os.getenv('SUBMISSION_WAL_SEGMENT_MB', '16')) * 1024 * 1024
+        # Flushing hands each record to the OS, which survives a process crash; fsync also survives a host crash
+        self.fsync = fsync if fsync is not None else os.getenv('SUBMISSION_WAL_FSYNC', 'false').lower() == 'true'
+        self.index_path = os.path.join(directory, 'replayed.idx')
+        self.rejected_path = os.path.join(directory, 'rejected.jsonl')
+
+        self._lock = threading.RLock()  # Active segment: appends and rolls
+        self._index_lock = threading.RLock()  # Replayed index: marks and compaction; taken after _lock, never before
+        self._opened = False
+        self._active = None
+        self._active_id = 0
+        self._active_size = 0
+        self._index = None
+        self.segments: List[int] = []
+        self.record_counts: Dict[int, int] = {}
+        self.replayed: Dict[int, Set[int]] = {}
+
+        # WAL statistics
+        self.appended = 0
+        self.replayed_total = 0
+        self.corrupt_records = 0
+        self.segments_deleted = 0
+        self.pending = 0
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{segment_id:020d}{SEGMENT_SUFFIX}")
+
+    def _load(self) -> int:
+        """Read segments and the replayed index without writing anything; returns the last segment's valid end"""
+        self.segments = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                               if name.endswith(SEGMENT_SUFFIX))
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            for start in range(0, len(data) - len(data) % INDEX_ENTRY.size, INDEX_ENTRY.size):
+                segment_id, offset = INDEX_ENTRY.unpack_from(data, start)
+                self.replayed.setdefault(segment_id, set()).add(offset)
+
+        valid_end = 0
+        for segment_id in self.segments:
+            done = self.replayed.get(segment_id, set())
+            count = 0
+            valid_end = 0
+            for offset, valid_end, _ in self._frames(segment_id):
+                count += 1
+                if offset not in done:
+                    self.pending += 1
+            self.record_counts[segment_id] = count
+        return valid_end
+
+    def _open(self):
+        """Load segments and the replayed index on first use"""
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        valid_end = self._load()
+
+        if self.segments:
+            self._active_id = self.segments[-1]
+            self._active = open(self._segment_path(self._active_id), 'ab')
+            if self._active.tell() > valid_end:
+                # Torn append from a crash: cut it off so new records stay readable
+                logger.warning(f"Truncating torn tail of WAL segment {self._active_id} at {valid_end}")
+                self._active.truncate(valid_end)
+                self._active.seek(valid_end)
+            self._active_size = valid_end
+        else:
+            self._start_segment(1)
+        self._index = open(self.index_path, 'ab')
+        self._opened = True
+
+    def _ensure_open(self):
+        if not self._opened:
+            with self._lock, self._index_lock:
+                self._open()
+
+    def _start_segment(self, segment_id: int):
+        self._active_id = segment_id
+        self._active = open(self._segment_path(segment_id), 'ab')
+        self._active_size = 0
+        self.segments.append(segment_id)
+        self.record_counts[segment_id] = 0
+
+    def _roll(self):
+        if self.fsync:
+            os.fsync(self._active.fileno())
+        self._active.close()
+        sealed_id = self._active_id
+        self._start_segment(sealed_id + 1)
+        with self._index_lock:
+            if len(self.replayed.get(sealed_id, ())) >= self.record_counts[sealed_id]:
+                self._delete_segment(sealed_id)
+
+    def append(self, record: Dict[str, Any]) -> Tuple[int, int]:
+        """Append one record; returns its (segment id, offset)"""
+        body = fast_json.dumps(record)
+        frame = RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+        self._ensure_open()
+        with self._lock:
+            if self._active_size and self._active_size + len(frame) > self.max_segment_bytes:
+                self._roll()
+            offset = self._active_size
+            self._active.write(frame)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+            self._active_size += len(frame)
+            self.record_counts[self._active_id] += 1
+            self.appended += 1
+            self.pending += 1
+            return self._active_id, offset
+
+    def _frames(self, segment_id: int, size: Optional[int] = None) -> Iterator[Tuple[int, int, bytes]]:
+        """Valid (offset, end offset, body) frames of a segment, reading at most size bytes"""
+        try:
+            with open(self._segment_path(segment_id), 'rb') as f:
+                data = f.read() if size is None else f.read(size)
+        except FileNotFoundError:
+            return
+        offset = 0
+        while offset < len(data):
+            if offset + RECORD_HEADER.size > len(data):
+                body, length, crc = b'', 1, 0
+            else:
+                length, crc = RECORD_HEADER.unpack_from(data, offset)
+                body = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+            if len(body) < length or zlib.crc32(body) != crc:
+                self.corrupt_records += 1
+                logger.error(f"Corrupt or torn WAL record at segment {segment_id} offset {offset}; skipping rest of segment")
+                return
+            end = offset + RECORD_HEADER.size + length
+            yield offset, end, body
+            offset = end
+
+    def _read_segment(self, segment_id: int, size: Optional[int] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for offset, _, body in self._frames(segment_id, size):
+            yield offset, fast_json.loads(body)
+
+    def scan(self, limit: int, skip: Optional[Callable[[int, int], bool]] = None) -> List[Tuple[int, int, Dict[str, Any]]]:
+        """Oldest records not yet replayed, as (segment id, offset, record); skip(segment id, offset) passes over a record"""
+        self._ensure_open()
+        with self._lock:
+            segments = list(self.segments)
+            # Appends may land while we read; only look at what was complete when the scan began
+            active_id, active_size = self._active_id, self._active_size
+        entries = []
+        for segment_id in segments:
+            done = self.replayed.get(segment_id, set())
+            size = active_size if segment_id == active_id else None
+            for offset, record in self._read_segment(segment_id, size):
+                if offset not in done and not (skip and skip(segment_id, offset)):
+                    entries.append((segment_id, offset, record))
+                    if len(entries) >= limit:
+                        return entries
+        return entries
+
+    def mark_replayed(self, segment_id: int, offset: int):
+        """Record a delivered (or rejected) record; deletes its segment once fully replayed"""
+        self._ensure_open()
+        with self._index_lock:
+            if segment_id not in self.record_counts:
+                return  # Segment already fully replayed and deleted
+            done = self.replayed.setdefault(segment_id, set())
+            if offset in done:
+                return
+            self._index.write(INDEX_ENTRY.pack(segment_id, offset))
+            self._index.flush()
+            done.add(offset)
+            self.replayed_total += 1
+            self.pending -= 1
+            if segment_id != self._active_id and len(done) >= self.record_counts.get(segment_id, 0):
+                self._delete_segment(segment_id)
+
+    def mark_rejected(self, segment_id: int, offset: int, record: Dict[str, Any], error: str):
+        """Keep a poison record for inspection in rejected.jsonl, then stop replaying it"""
+        with self._index_lock:
+            with open(self.rejected_path, 'ab') as f:
+                f.write(fast_json.dumps({**record, "replay_error": error[:2048]}) + b'\n')
+            self.mark_replayed(segment_id, offset)
+
+    def _delete_segment(self, segment_id: int):
+        os.remove(self._segment_path(segment_id))
+        self.segments.remove(segment_id)
+        self.record_counts.pop(segment_id, None)
+        self.replayed.pop(segment_id, None)
+        self.segments_deleted += 1
+
+        # Compact the index down to segments that still exist
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, 'wb') as f:
+            for remaining_id, offsets in self.replayed.items():
+                f.write(b''.join(INDEX_ENTRY.pack(remaining_id, offset) for offset in sorted(offsets)))
+            f.flush()
+            os.fsync(f.fileno())
+        self._index.close()
+        os.replace(temp_path, self.index_path)
+        self._index = open(self.index_path, 'ab')
+
+    def close(self):
+        """Flush and fsync the active segment and the index (shutdown)"""
+        with self._lock, self._index_lock:
+            if not self._opened:
+                return
+            for f in (self._active, self._index):
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+            self._opened = False
+            self.segments = []
+            self.record_counts = {}
+            self.replayed = {}
+            self.pending = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get WAL statistics"""
+        return {
+            'directory': self.directory,
+            'segments': len(self.segments),
+            'active_segment_bytes': self._active_size,
+            'pending': self.pending,
+            'appended': self.appended,
+            'replayed': self.replayed_total,
+            'corrupt_records': self.corrupt_records,
+            'segments_deleted': self.segments_deleted
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print pending records of a submission WAL as JSON lines")
+    parser.add_argument("directory")
+    parser.add_argument("--all", action="store_true", help="Include records that were already replayed")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        sys.exit(f"No WAL directory at {args.directory}")
+    # Read-only: a running server may own the directory, so nothing is created or truncated
+    wal = SubmissionWAL(args.directory)
+    wal._load()
+    for segment_id in wal.segments:
+        done = wal.replayed.get(segment_id, set())
+        for offset, record in wal._read_segment(segment_id):
+            replayed = offset in done
+            if args.all or not replayed:
+                line = {"segment": segment_id, "offset": offset, "replayed": replayed, **record}
+                sys.stdout.write(fast_json.dumps_str(line) + "\n")
+    print(fast_json.dumps_str(wal.get_stats()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
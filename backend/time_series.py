@@ -0,0 +1,270 @@
+"""
+Time-Series Collections for SentraTech
+metrics_snapshots and performance_metrics as MongoDB time-series collections with retention; existing regular collections are converted in place
+
+Conversion renames the regular collection to <name>_legacy_<timestamp>_<random>, creates the
+time-series collection under the original name (new writes land there immediately) and copies
+the legacy documents across in batches, skipping ones already past retention. Progress lives in
+schema_migrations, so a restart resumes the copy. Only one instance converts or copies at a time
+(a lease document in schema_migrations, renewed per batch); the others wait for the conversion
+and then find time-series collections, and leave the copy to the lease holder.
+Requires MongoDB 5.0+.
+
+Run from the shell (it also runs on startup):
+    python time_series.py [--drop-legacy]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+import logging
+
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from bson_dates import as_datetime, utc_now
+
+logger = logging.getLogger("time_series")
+
+LOCK_ID = 'time_series:lock'
+NAMESPACE_NOT_FOUND = 26
+MAX_PREPARE_ATTEMPTS = 5
+
+TIME_SERIES_COLLECTIONS: Dict[str, Dict[str, Any]] = {
+    'metrics_snapshots': {
+        'timeseries': {'timeField': 'timestamp', 'metaField': 'source', 'granularity': 'seconds'},
+        'retention_days': int(os.getenv('METRICS_SNAPSHOT_RETENTION_DAYS', '30')),
+    },
+    'performance_metrics': {
+        'timeseries': {'timeField': 'timestamp', 'metaField': 'metric_name', 'granularity': 'seconds'},
+        'retention_days': int(os.getenv('PERFORMANCE_METRICS_RETENTION_DAYS', '90')),
+    },
+}
+
+
+class TimeSeriesMigration:
+    """Creates the time-series collections, keeps their retention current and copies legacy data"""
+
+    def __init__(self, db, collections: Optional[Dict[str, Dict[str, Any]]] = None, batch_size: Optional[int] = None,
+                 pause_ms: Optional[int] = None, drop_legacy: Optional[bool] = None):
+        self.db = db
+        self.collections = collections or TIME_SERIES_COLLECTIONS
+        self.batch_size = batch_size or int(os.getenv('TIME_SERIES_COPY_BATCH', '1000'))
+        self.pause = (pause_ms if pause_ms is not None else int(os.getenv('TIME_SERIES_COPY_PAUSE_MS', '50'))) / 1000  # Convert to seconds
+        self.drop_legacy = drop_legacy if drop_legacy is not None else os.getenv('TIME_SERIES_DROP_LEGACY', 'false').lower() == 'true'
+        self.progress = db.schema_migrations
+        self.lock_lease = timedelta(seconds=int(os.getenv('TIME_SERIES_LOCK_LEASE_S', '300')))
+        self.lock_wait = int(os.getenv('TIME_SERIES_LOCK_WAIT_S', '120'))
+        self.owner = uuid.uuid4().hex
+        self._task: Optional[asyncio.Task] = None
+
+        # Migration statistics
+        self.converted_collections: List[str] = []
+        self.copied = 0
+        self.expired = 0
+        self.unparseable = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @staticmethod
+    def retention_seconds(spec: Dict[str, Any]) -> int:
+        return spec['retention_days'] * 86400
+
+    async def _collection_info(self, name: str) -> Optional[Dict[str, Any]]:
+        cursor = await self.db.list_collections(filter={'name': name})
+        found = await cursor.to_list(length=1)
+        return found[0] if found else None
+
+    async def _try_lock(self) -> bool:
+        """Take or renew the conversion lease; False while another instance holds an unexpired one"""
+        now = utc_now()
+        try:
+            await self.progress.update_one(
+                {'_id': LOCK_ID, '$or': [{'expires_at': {'$lt': now}}, {'owner': self.owner}]},
+                {'$set': {'owner': self.owner, 'expires_at': now + self.lock_lease}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False  # The upsert collided with the other instance's lock document
+
+    async def _acquire_lock(self):
+        """Take the conversion lease, waiting while another instance holds it"""
+        deadline = time.monotonic() + self.lock_wait
+        while not await self._try_lock():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Time-series conversion lock still held after {self.lock_wait}s")
+            await asyncio.sleep(1)
+
+    async def _release_lock(self):
+        await self.progress.delete_one({'_id': LOCK_ID, 'owner': self.owner})
+
+    async def prepare_collection(self, name: str, spec: Dict[str, Any], attempt: int = 1):
+        if attempt > MAX_PREPARE_ATTEMPTS:
+            raise RuntimeError(f"Could not convert {name}: it kept being recreated as a regular collection")
+        expire = self.retention_seconds(spec)
+        info = await self._collection_info(name)
+        if info is not None and info.get('type') == 'timeseries':
+            if info.get('options', {}).get('expireAfterSeconds') != expire:
+                await self.db.command('collMod', name, expireAfterSeconds=expire)
+                logger.info(f"Retention for {name} set to {spec['retention_days']} days")
+            return
+
+        if info is not None:
+            # A regular collection from before the switch: keep its data aside for the copy
+            legacy = f"{name}_legacy_{utc_now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+            try:
+                await self.db[name].rename(legacy)
+            except OperationFailure as e:
+                if e.code != NAMESPACE_NOT_FOUND:
+                    raise
+                # Gone since we looked (dropped, or converted elsewhere): check again
+                return await self.prepare_collection(name, spec, attempt + 1)
+            await self.progress.update_one(
+                {'_id': f"time_series:{name}"},
+                {'$addToSet': {'pending': legacy}},
+                upsert=True
+            )
+            self.converted_collections.append(name)
+            logger.info(f"Renamed {name} to {legacy} for conversion to a time-series collection")
+
+        try:
+            await self.db.create_collection(name, timeseries=spec['timeseries'], expireAfterSeconds=expire)
+        except CollectionInvalid:
+            # A write that arrived right after the rename implicitly created a regular collection
+            await self.prepare_collection(name, spec, attempt + 1)
+
+    async def prepare(self):
+        """Make sure every collection is time-series (startup, before indexes are applied)"""
+        await self._acquire_lock()
+        try:
+            for name, spec in self.collections.items():
+                await self.prepare_collection(name, spec)
+        finally:
+            await self._release_lock()
+
+    async def copy_legacy(self, name: str, legacy: str, spec: Dict[str, Any]):
+        progress_id = f"time_series:{name}:{legacy}"
+        state = await self.progress.find_one({'_id': progress_id}) or {}
+        last_id = state.get('last_id')
+        time_field = spec['timeseries']['timeField']
+        cutoff = utc_now() - timedelta(seconds=self.retention_seconds(spec))
+
+        while True:
+            query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+            documents = await self.db[legacy].find(query).sort('_id', 1).limit(self.batch_size).to_list(length=self.batch_size)
+            if not documents:
+                break
+            batch = []
+            for document in documents:
+                timestamp = as_datetime(document.get(time_field))
+                if timestamp is None:
+                    self.unparseable += 1
+                elif timestamp < cutoff:
+                    self.expired += 1
+                else:
+                    document[time_field] = timestamp
+                    batch.append(document)
+            if batch:
+                await self.db[name].insert_many(batch, ordered=False)
+                self.copied += len(batch)
+            last_id = documents[-1]['_id']
+            await self.progress.update_one({'_id': progress_id}, {'$set': {'last_id': last_id}}, upsert=True)
+            if not await self._try_lock():
+                raise RuntimeError("Lost the conversion lease to another instance")
+            if self.pause:
+                await asyncio.sleep(self.pause)
+
+        await self.progress.update_one({'_id': f"time_series:{name}"}, {'$pull': {'pending': legacy}})
+        await self.progress.update_one({'_id': progress_id}, {'$set': {'completed_at': utc_now()}}, upsert=True)
+        if self.drop_legacy:
+            await self.db[legacy].drop()
+        logger.info(f"Copied {legacy} into {name}")
+
+    async def run(self):
+        """Copy every pending legacy collection; safe to rerun, resumes after a restart"""
+        self.started_at = time.time()
+        if not await self._try_lock():
+            logger.info("Another instance holds the time-series lease; leaving the copy to it")
+            self.finished_at = time.time()
+            return
+        try:
+            for name, spec in self.collections.items():
+                state = await self.progress.find_one({'_id': f"time_series:{name}"}) or {}
+                for legacy in state.get('pending', []):
+                    try:
+                        await self.copy_legacy(name, legacy, spec)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self.last_error = f"{legacy}: {str(e)}"
+                        logger.error(f"Time-series copy failed for {legacy}: {str(e)}")
+        finally:
+            await self._release_lock()
+        self.finished_at = time.time()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def wait(self):
+        """Until the background copy (if any) has finished"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get time-series migration statistics"""
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'collections': {name: {**spec['timeseries'], 'retention_days': spec['retention_days']}
+                            for name, spec in self.collections.items()},
+            'converted_collections': self.converted_collections,
+            'copied': self.copied,
+            'expired': self.expired,
+            'unparseable': self.unparseable,
+            'duration_seconds': round((self.finished_at or time.time()) - self.started_at, 2) if self.started_at else None,
+            'last_error': self.last_error
+        }
+
+
+__all__ = ['TIME_SERIES_COLLECTIONS', 'TimeSeriesMigration']
+
+
+def main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Convert metrics collections to time-series collections")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-legacy", action="store_true", help="Drop each legacy collection once it is copied")
+    args = parser.parse_args()
+
+    mongo_url = os.environ['MONGO_URL']
+    db_name = mongo_url.split('/')[-1] if '/' in mongo_url else os.environ.get('DB_NAME', 'sentratech_forms')
+
+    async def run():
+        client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+        migration = TimeSeriesMigration(client[db_name], batch_size=args.batch_size, pause_ms=0,
+                                        drop_legacy=args.drop_legacy)
+        await migration.prepare()
+        await migration.run()
+        client.close()
+        return migration.get_stats()
+
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Outbound Upstream Metrics for SentraTech
+Per-endpoint latency histograms, status classes, retries, timeouts, bytes and connection reuse, rendered as Prometheus text
+"""
+import bisect
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import logging
+
+logger = logging.getLogger("upstream_metrics")
+
+# Seconds; spans a warm keep-alive POST up to the 30s dashboard timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Dashboard form types; any other /forms/<type> (the collect form_type is client supplied) is labelled {other}
+FORM_TYPES = frozenset({'newsletter-signup', 'contact-sales', 'demo-request', 'roi-calculator', 'job-application'})
+KNOWN_FORM_PATHS = frozenset(FORM_TYPES | {f"{form_type}/bulk" for form_type in FORM_TYPES})
+OTHER = '{other}'
+# Hard cap on label sets; anything past it is counted under (other, other)
+MAX_ENDPOINTS = 100
+
+# httpcore trace events that only happen when a request had to open a new connection
+NEW_CONNECTION_EVENTS = ('connection.connect_tcp.started', 'connection.connect_unix_socket.started')
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        running = 0
+        rows = []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            rows.append((repr(bound), running))
+        rows.append(("+Inf", self.count))
+        return rows
+
+
+class ConnectionTrace:
+    """httpx "trace" extension callback that notes whether the request opened a new connection"""
+
+    def __init__(self):
+        self.events = 0
+        self.new_connection = False
+
+    async def __call__(self, event_name: str, info: dict):
+        self.events += 1
+        if event_name in NEW_CONNECTION_EVENTS:
+            self.new_connection = True
+
+    @property
+    def reused(self) -> Optional[bool]:
+        # No events means the transport does not trace (ASGI/mock transports): unknown
+        return None if self.events == 0 else not self.new_connection
+
+
+class EndpointMetrics:
+    """Counters for one (upstream host, endpoint path) pair"""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.responses: Dict[str, int] = {}  # Status class ("2xx", "5xx", "timeout", "error") -> count
+        self.retries = 0
+        self.timeouts = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connections_new = 0
+        self.connections_reused = 0
+
+
+class UpstreamMetrics:
+    """Outbound call metrics keyed by upstream host and endpoint path"""
+
+    def __init__(self):
+        self.endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+
+    @staticmethod
+    def endpoint_key(url: str) -> Tuple[str, str]:
+        """(host, path template) label pair; query strings and unknown form types stay out of the label set"""
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        prefix, forms, rest = path.partition('/forms/')
+        if forms and rest not in KNOWN_FORM_PATHS:
+            path = f"{prefix}{forms}{OTHER}"
+        return parts.netloc, path
+
+    def _endpoint(self, url: str) -> EndpointMetrics:
+        key = self.endpoint_key(url)
+        metrics = self.endpoints.get(key)
+        if metrics is None:
+            if len(self.endpoints) >= MAX_ENDPOINTS:
+                key = (OTHER, OTHER)
+                metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics()
+        return metrics
+
+    def record_attempt(self, url: str, seconds: float, status_class: str, bytes_sent: int = 0,
+                       bytes_received: int = 0, reused: Optional[bool] = None):
+        """Record one HTTP attempt; status_class is 2xx..5xx, timeout or error"""
+        metrics = self._endpoint(url)
+        metrics.latency.observe(seconds)
+        metrics.responses[status_class] = metrics.responses.get(status_class, 0) + 1
+        if status_class == 'timeout':
+            metrics.timeouts += 1
+        metrics.bytes_sent += bytes_sent
+        metrics.bytes_received += bytes_received
+        if reused is True:
+            metrics.connections_reused += 1
+        elif reused is False:
+            metrics.connections_new += 1
+
+    def record_retry(self, url: str):
+        self._endpoint(url).retries += 1
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Summary per endpoint for JSON status pages"""
+        stats = {}
+        for (upstream, path), metrics in self.endpoints.items():
+            traced = metrics.connections_new + metrics.connections_reused
+            stats[f"{upstream}{path}"] = {
+                'attempts': metrics.latency.count,
+                'responses': dict(metrics.responses),
+                'retries': metrics.retries,
+                'timeouts': metrics.timeouts,
+                'bytes_sent': metrics.bytes_sent,
+                'bytes_received': metrics.bytes_received,
+                'connection_reuse_ratio': round(metrics.connections_reused / traced, 3) if traced else None
+            }
+        return stats
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        endpoints = sorted(self.endpoints.items())
+        labelled = [(f'upstream="{_escape(upstream)}",endpoint="{_escape(path)}"', metrics)
+                    for (upstream, path), metrics in endpoints]
+
+        family("upstream_request_duration_seconds", "histogram", "Latency of individual upstream HTTP attempts")
+        for labels, metrics in labelled:
+            for bound, count in metrics.latency.cumulative():
+                lines.append(f'upstream_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"upstream_request_duration_seconds_sum{{{labels}}} {metrics.latency.total}")
+            lines.append(f"upstream_request_duration_seconds_count{{{labels}}} {metrics.latency.count}")
+
+        family("upstream_responses_total", "counter", "Upstream attempts by status class (timeout and error for failed calls)")
+        for labels, metrics in labelled:
+            for outcome, count in sorted(metrics.responses.items()):
+                lines.append(f'upstream_responses_total{{{labels},status_class="{outcome}"}} {count}')
+
+        counters = (
+            ("upstream_retries_total", "Retries issued after a failed or retryable upstream attempt", "retries"),
+            ("upstream_timeouts_total", "Upstream attempts that timed out", "timeouts"),
+            ("upstream_bytes_sent_total", "Request body bytes sent upstream", "bytes_sent"),
+            ("upstream_bytes_received_total", "Response body bytes received from upstream", "bytes_received"),
+        )
+        for name, help_text, attribute in counters:
+            family(name, "counter", help_text)
+            for labels, metrics in labelled:
+                lines.append(f"{name}{{{labels}}} {getattr(metrics, attribute)}")
+
+        family("upstream_connections_total", "counter", "Traced upstream attempts by whether a pooled connection was reused")
+        for labels, metrics in labelled:
+            lines.append(f'upstream_connections_total{{{labels},reused="true"}} {metrics.connections_reused}')
+            lines.append(f'upstream_connections_total{{{labels},reused="false"}} {metrics.connections_new}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx"
+
+
+# Global metrics instance shared by every DashboardClient
+upstream_metrics = UpstreamMetrics()
+
+__all__ = ['ConnectionTrace', 'Histogram', 'UpstreamMetrics', 'status_class', 'upstream_metrics']
@@ -3,7 +3,6 @@ LEGACY Enterprise WebSocket Service - DISABLED FOR NEW CRM INTEGRATION
 OLD dashboard WebSocket service removed to prevent conflicts
 """
 import asyncio
-import json
 import os
 import time
 import uuid
@@ -12,6 +11,9 @@ from typing import Dict, List, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
 import logging
 
+from ack_tracker import ack_tracker
+import fast_json
+
 logger = logging.getLogger("websocket_service")
 
 class WebSocketConnectionManager:
@@ -96,7 +98,7 @@ class WebSocketConnectionManager:
         }
         
         try:
-            await websocket.send_text(json.dumps(enhanced_message))
+            await websocket.send_text(fast_json.dumps_str(enhanced_message))
             logger.debug(f"Sent message {message_id} to {connection_id}")
             
             if require_ack:
@@ -170,8 +172,10 @@ class WebSocketConnectionManager:
     async def handle_acknowledgment(self, connection_id: str, message_id: str):
         """Handle message acknowledgment from client"""
         if connection_id in self.pending_acks and message_id in self.pending_acks[connection_id]:
-            del self.pending_acks[connection_id][message_id]
+            pending_info = self.pending_acks[connection_id].pop(message_id)
             logger.debug(f"Received ACK for message {message_id} from {connection_id}")
+            # Form notifications carry the submissionId, which releases any proxy waiting on it
+            ack_tracker.resolve(pending_info['message'].get('submissionId'), 'websocket')
             return True
         return False
     
@@ -201,7 +205,7 @@ class WebSocketConnectionManager:
                     'isRetry': True,
                     'retryAttempt': attempt + 1
                 }
-                await websocket.send_text(json.dumps(retry_msg))
+                await websocket.send_text(fast_json.dumps_str(retry_msg))
                 
             except Exception as e:
                 logger.error(f"Failed to retry message {message_id}: {e}")
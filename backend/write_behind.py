@@ -0,0 +1,211 @@
+"""
+Write-Behind Batching for SentraTech
+Buffers analytics documents per collection and writes them with insert_many(ordered=False) on size or time thresholds
+"""
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger("write_behind")
+
+# insert_many(collection_name, documents) -> inserted ids; DatabaseOptimizer.bulk_insert fits
+InsertMany = Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]
+# on_written(collection_name, documents) runs after each flush with the documents that were inserted
+OnWritten = Callable[[str, List[Dict[str, Any]]], Awaitable[Any]]
+
+
+class WriteBehindBuffer:
+    """
+    Buffer for one collection, flushed by a background task
+
+    A flush runs every flush_interval, or as soon as max_batch documents are waiting. When
+    max_buffer documents are already queued (the database is slow or down), put() waits up to
+    put_timeout for a flush to make room and then drops the document, counting it.
+    """
+
+    def __init__(self, name: str, insert_many: InsertMany, max_batch: int, flush_interval: float,
+                 max_buffer: int, put_timeout: float, on_written: Optional[OnWritten] = None):
+        self.name = name
+        self.insert_many = insert_many
+        self.on_written = on_written
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.put_timeout = put_timeout
+
+        self.buffer: List[Dict[str, Any]] = []
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Write-behind statistics
+        self.enqueued = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.docs_written = 0
+        self.write_errors = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.largest_batch = 0
+        self.last_flush_ms = 0.0
+
+    async def put(self, document: Dict[str, Any]) -> bool:
+        """Queue a document; False if it was dropped because the buffer stayed full"""
+        if self._task is None:
+            self.start()
+        if len(self.buffer) >= self.max_buffer:
+            self.backpressure_waits += 1
+            deadline = time.monotonic() + self.put_timeout
+            while len(self.buffer) >= self.max_buffer:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += 1
+                    return False
+                self._space.clear()
+                self._wakeup.set()
+                try:
+                    await asyncio.wait_for(self._space.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        self.buffer.append(document)
+        self.enqueued += 1
+        if len(self.buffer) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    async def flush(self):
+        """Write out everything buffered, max_batch documents per insert_many"""
+        async with self._flush_lock:
+            while self.buffer:
+                batch = self.buffer[:self.max_batch]
+                del self.buffer[:self.max_batch]
+                self._space.set()
+                if not await self._write(batch):
+                    break  # Database unavailable; retry on the next interval
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> bool:
+        start_time = time.time()
+        written = batch
+        try:
+            await self.insert_many(self.name, batch)
+            self.docs_written += len(batch)
+        except BulkWriteError as e:
+            # ordered=False: everything except the failing documents (e.g. duplicate keys) was inserted
+            inserted = e.details.get('nInserted', 0)
+            self.docs_written += inserted
+            self.write_errors += len(batch) - inserted
+            failed = {error.get('index') for error in e.details.get('writeErrors', [])}
+            written = [document for index, document in enumerate(batch) if index not in failed]
+        except Exception as e:
+            self.failed_flushes += 1
+            room = max(0, self.max_buffer - len(self.buffer))
+            self.buffer[:0] = batch[:room]
+            self.dropped += len(batch) - room
+            logger.error(f"Write-behind flush of {len(batch)} {self.name} documents failed: {str(e)}")
+            return False
+
+        self.flushes += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.last_flush_ms = (time.time() - start_time) * 1000
+        if self.on_written is not None and written:
+            await self.on_written(self.name, written)
+        return True
+
+    async def run_forever(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def close(self):
+        """Stop the flush loop and write out the buffer (shutdown)"""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+        if self.buffer:
+            logger.error(f"Dropping {len(self.buffer)} unwritten {self.name} documents on shutdown")
+            self.dropped += len(self.buffer)
+            self.buffer.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write-behind statistics"""
+        return {
+            'buffered': len(self.buffer),
+            'enqueued': self.enqueued,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'docs_written': self.docs_written,
+            'write_errors': self.write_errors,
+            'dropped': self.dropped,
+            'backpressure_waits': self.backpressure_waits,
+            'largest_batch': self.largest_batch,
+            'avg_batch_size': round(self.docs_written / self.flushes, 2) if self.flushes else 0,
+            'last_flush_ms': round(self.last_flush_ms, 2)
+        }
+
+
+class WriteBehindWriter:
+    """One WriteBehindBuffer per collection, created on first use"""
+
+    def __init__(self, insert_many: InsertMany, max_batch: Optional[int] = None, flush_interval_ms: Optional[int] = None,
+                 max_buffer: Optional[int] = None, put_timeout_ms: Optional[int] = None,
+                 on_written: Optional[OnWritten] = None):
+        self.insert_many = insert_many
+        self.on_written = on_written
+        self.max_batch = max_batch or int(os.getenv('ANALYTICS_WRITE_BATCH', '500'))
+        self.flush_interval = (flush_interval_ms or int(os.getenv('ANALYTICS_WRITE_FLUSH_MS', '500'))) / 1000  # Convert to seconds
+        self.max_buffer = max_buffer or int(os.getenv('ANALYTICS_WRITE_BUFFER', '10000'))
+        self.put_timeout = (put_timeout_ms or int(os.getenv('ANALYTICS_WRITE_PUT_TIMEOUT_MS', '50'))) / 1000  # Convert to seconds
+        self.buffers: Dict[str, WriteBehindBuffer] = {}
+
+    def collection(self, name: str) -> WriteBehindBuffer:
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            buffer = WriteBehindBuffer(name, self.insert_many, self.max_batch, self.flush_interval,
+                                       self.max_buffer, self.put_timeout, self.on_written)
+            self.buffers[name] = buffer
+        return buffer
+
+    async def put(self, collection_name: str, document: Dict[str, Any]) -> bool:
+        return await self.collection(collection_name).put(document)
+
+    def start(self):
+        for buffer in self.buffers.values():
+            buffer.start()
+
+    async def flush(self):
+        await asyncio.gather(*(buffer.flush() for buffer in self.buffers.values()))
+
+    async def close(self):
+        """Flush every collection's buffer (shutdown)"""
+        await asyncio.gather(*(buffer.close() for buffer in self.buffers.values()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get write-behind statistics per collection"""
+        return {
+            'max_batch': self.max_batch,
+            'flush_interval_ms': self.flush_interval * 1000,
+            'max_buffer': self.max_buffer,
+            'collections': {name: buffer.get_stats() for name, buffer in self.buffers.items()}
+        }
+
+
+__all__ = ['WriteBehindBuffer', 'WriteBehindWriter']
@@ -0,0 +1,121 @@
+"""
+Keyset pagination: cursor tokens and the filter that resumes after a page boundary
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+# BSON comparison/sort order of the types used below: null < numbers < string < ObjectId < bool < date
+TYPE_ORDER = {type(None): 0, int: 1, float: 1, str: 2, ObjectId: 3, bool: 4, datetime: 5}
+
+
+def sort_key(value):
+    return (TYPE_ORDER[type(value)], value if value is not None else 0)
+
+
+def matches(document, query):
+    """The subset of Mongo query semantics keyset_filter uses ($or/$and, $lt/$gt within one type, $ne, $type)"""
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(matches(document, branch) for branch in condition):
+                return False
+            continue
+        if field == '$and':
+            if not all(matches(document, branch) for branch in condition):
+                return False
+            continue
+        value = document.get(field)
+        if not isinstance(condition, dict):
+            if value != condition or type(value) is not type(condition):
+                return False
+            continue
+        for op, operand in condition.items():
+            same_type = value is not None and TYPE_ORDER[type(value)] == TYPE_ORDER[type(operand)]
+            if op == '$lt' and not (same_type and value < operand):
+                return False
+            if op == '$gt' and not (same_type and value > operand):
+                return False
+            if op == '$ne' and value == operand:
+                return False
+            if op == '$type' and type(value) is not {'string': str, 'date': datetime}[operand]:
+                return False
+    return True
+
+
+def read_all_pages(documents, sort_field, direction, limit):
+    """Page through documents the way paginate() does, with each cursor going through a token"""
+    ordered = sorted(documents, key=lambda d: (sort_key(d.get(sort_field)), d['_id']), reverse=direction < 0)
+    seen, token = [], None
+    while True:
+        candidates = ordered
+        if token:
+            after = keyset_filter(sort_field, direction, *decode_cursor(token, sort_field, direction))
+            candidates = [document for document in ordered if matches(document, after)]
+        page = candidates[:limit]
+        seen.extend(document['_id'] for document in page)
+        if len(candidates) <= limit:
+            return ordered, seen
+        token = encode_cursor(sort_field, direction, page[-1].get(sort_field), page[-1]['_id'])
+
+
+@pytest.mark.parametrize('value', [
+    ObjectId(),
+    datetime(2025, 3, 1, 12, 30, 15, 123000, tzinfo=timezone.utc),
+    None,
+    'pending',
+    42,
+])
+def test_cursor_round_trip(value):
+    doc_id = ObjectId()
+    token = encode_cursor('created_at', -1, value, doc_id)
+
+    decoded_value, decoded_id = decode_cursor(token, 'created_at', -1)
+
+    assert decoded_value == value and type(decoded_value) is type(value)
+    assert decoded_id == doc_id
+
+
+def test_cursor_token_is_url_safe():
+    token = encode_cursor('created_at', -1, 'a/b+c?d', ObjectId())
+    assert '=' not in token and '+' not in token and '/' not in token
+
+
+@pytest.mark.parametrize('sort_field, direction', [('timestamp', -1), ('created_at', 1)])
+def test_cursor_for_other_ordering_is_rejected(sort_field, direction):
+    token = encode_cursor('created_at', -1, datetime.now(timezone.utc), ObjectId())
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, sort_field, direction)
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', 'W10', '!!!'])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, 'created_at', -1)
+
+
+@pytest.mark.parametrize('direction', [-1, 1])
+def test_mixed_date_and_string_pages_visit_every_document_once(direction):
+    # Documents not yet migrated still hold ISO strings; some have no timestamp at all
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    documents = [{'_id': ObjectId(), 'created_at': start + timedelta(hours=i)} for i in range(7)]
+    documents += [{'_id': ObjectId(), 'created_at': (start + timedelta(hours=i)).isoformat()} for i in range(5)]
+    documents += [{'_id': ObjectId(), 'created_at': start} for _ in range(3)]  # Ties broken by _id
+    documents += [{'_id': ObjectId()} for _ in range(2)]
+
+    ordered, seen = read_all_pages(documents, 'created_at', direction, limit=4)
+
+    assert seen == [document['_id'] for document in ordered]
+
+
+def test_descending_page_boundary_from_last_date_reaches_strings():
+    newest = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    last_date = {'_id': ObjectId(), 'created_at': newest}
+    legacy = {'_id': ObjectId(), 'created_at': '2025-06-01T00:00:00+00:00'}  # Newer as text, but sorts below dates
+
+    after = keyset_filter('created_at', -1, last_date['created_at'], last_date['_id'])
+
+    assert matches(legacy, after)
+    assert not matches(last_date, after)
@@ -0,0 +1,110 @@
+"""
+Submission WAL: record framing, recovery from torn or corrupt tails, and the replayed index across compaction
+"""
+import os
+
+from submission_wal import RECORD_HEADER, SubmissionWAL
+
+
+def trace_ids(entries):
+    return [record['payload']['trace_id'] for _, _, record in entries]
+
+
+def append_records(wal, count, start=0):
+    return [wal.append({'payload': {'trace_id': f"t{i}"}}) for i in range(start, start + count)]
+
+
+def test_records_round_trip_in_order(tmp_path):
+    wal = SubmissionWAL(str(tmp_path))
+    refs = append_records(wal, 3)
+
+    entries = wal.scan(10)
+
+    assert trace_ids(entries) == ['t0', 't1', 't2']
+    assert [(segment_id, offset) for segment_id, offset, _ in entries] == refs
+    assert wal.pending == 3
+    wal.close()
+
+
+def test_torn_tail_is_skipped_and_truncated_on_reopen(tmp_path):
+    wal = SubmissionWAL(str(tmp_path))
+    (segment_id, _), *_ = append_records(wal, 3)
+    wal.close()
+    # Crash mid-append: a header promising 100 bytes followed by only part of the body
+    with open(wal._segment_path(segment_id), 'ab') as f:
+        f.write(RECORD_HEADER.pack(100, 0) + b'{"payl')
+
+    reopened = SubmissionWAL(str(tmp_path))
+    assert trace_ids(reopened.scan(10)) == ['t0', 't1', 't2']
+    assert reopened.corrupt_records == 1
+
+    # The torn bytes were cut off, so records appended after recovery stay readable
+    append_records(reopened, 1, start=3)
+    assert trace_ids(reopened.scan(10)) == ['t0', 't1', 't2', 't3']
+    reopened.close()
+
+
+def test_corrupt_record_stops_the_segment_read(tmp_path):
+    wal = SubmissionWAL(str(tmp_path))
+    (segment_id, _), (_, second_offset), _ = append_records(wal, 3)
+    wal.close()
+    path = wal._segment_path(segment_id)
+    with open(path, 'r+b') as f:
+        f.seek(second_offset + RECORD_HEADER.size + 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    reopened = SubmissionWAL(str(tmp_path))
+
+    assert trace_ids(reopened.scan(10)) == ['t0']
+    assert reopened.corrupt_records >= 1
+    reopened.close()
+
+
+def test_replayed_records_stay_hidden_after_compaction_and_reopen(tmp_path):
+    # Small segments so the log rolls every few records
+    wal = SubmissionWAL(str(tmp_path), max_segment_bytes=120)
+    refs = append_records(wal, 9)
+    first_segment = refs[0][0]
+    assert len(wal.segments) > 2
+
+    # A replay in a later segment must survive the compaction that follows deleting the first one
+    wal.mark_replayed(*refs[-2])
+    for ref in refs:
+        if ref[0] == first_segment:
+            wal.mark_replayed(*ref)
+    assert first_segment not in wal.segments
+    assert wal.segments_deleted == 1
+
+    expected = [f"t{i}" for i, ref in enumerate(refs) if ref[0] != first_segment and ref != refs[-2]]
+    assert trace_ids(wal.scan(20)) == expected
+    wal.close()
+
+    reopened = SubmissionWAL(str(tmp_path), max_segment_bytes=120)
+    assert trace_ids(reopened.scan(20)) == expected
+    assert reopened.pending == len(expected)
+    reopened.close()
+
+
+def test_rejected_record_is_kept_and_not_replayed(tmp_path):
+    wal = SubmissionWAL(str(tmp_path))
+    refs = append_records(wal, 2)
+
+    wal.mark_rejected(*refs[0], {'payload': {'trace_id': 't0'}}, "422: invalid")
+
+    assert trace_ids(wal.scan(10)) == ['t1']
+    with open(wal.rejected_path) as f:
+        assert '"replay_error":"422: invalid"' in f.read()
+    wal.close()
+
+
+def test_scan_skips_records_that_are_backing_off(tmp_path):
+    wal = SubmissionWAL(str(tmp_path))
+    refs = append_records(wal, 4)
+    backing_off = set(refs[:2])
+
+    entries = wal.scan(2, skip=lambda segment_id, offset: (segment_id, offset) in backing_off)
+
+    assert trace_ids(entries) == ['t2', 't3']
+    wal.close()